@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, has_request_context
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, has_request_context, Response, stream_with_context
 from flask_bootstrap import Bootstrap4
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_wtf.csrf import CSRFProtect
@@ -15,12 +15,20 @@ import sys
 import signal
 import threading
 import time
+from queue import Empty
 import psutil
 from bulk_apply import register_bulk_apply_routes, init_bulk_apply
 from supabase import create_client, Client
 import logging
 import re
-from openai import OpenAI
+from refilter import get_refilter_manager
+from job_store import get_job_store, run_key_from_path
+import config_cache
+from check_store import get_check_store, flush_all as flush_check_stores
+from auth_cache import TokenVerifier
+from crawl_jobs import get_crawl_manager
+from browser_pool import close_all as close_browser_pools
+from crawl_progress import get_progress_file, read_latest as read_latest_progress, follow as follow_progress, FINAL_PHASES
 from updater import check_for_updates, perform_update, get_update_status
 import atexit
 from fix_settings_patch import get_app_paths, get_data_dir_from_env
@@ -188,6 +196,12 @@ def initialize_app_environment():
         with open(prompt_file, 'w', encoding='utf-8') as f:
             json.dump(prompt_config, f, ensure_ascii=False, indent=2)
     
+    # 既存のJSONファイルを案件データストアに取り込む（初回のみ）
+    try:
+        get_job_store(data_dir).import_json_files(data_dir / 'crawled_data', checks_file=checks_file)
+    except Exception as e:
+        logger.error(f"案件データの取り込みに失敗: {str(e)}")
+    
     logger.info("アプリケーション環境の初期化が完了しました")
 
 # ChromeDriver自動管理モジュールをインポート
@@ -273,6 +287,14 @@ supabase: Client = create_client(
     os.getenv('SUPABASE_ANON_KEY')
 )
 
+# アクセストークンの検証結果キャッシュ
+# SUPABASE_JWT_SECRETが設定されている場合はSupabaseに問い合わせずにローカルで検証する
+token_verifier = TokenVerifier(
+    lambda token: supabase.auth.get_user(token).user,
+    jwt_secret=os.getenv('SUPABASE_JWT_SECRET') or None,
+    max_ttl=int(os.getenv('AUTH_CACHE_TTL', '300'))
+)
+
 # ログイン管理の初期化
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -312,8 +334,8 @@ class User(UserMixin):
 def load_user(user_id):
     try:
         if 'access_token' in session:
-            # セッションに保存されているトークンを使用
-            user = supabase.auth.get_user(session['access_token']).user
+            # セッションに保存されているトークンを使用（検証結果はキャッシュされる）
+            user = token_verifier.verify(session['access_token'])
             if user:
                 # Get user metadata which includes avatar_url
                 user_metadata = user.user_metadata
@@ -348,10 +370,8 @@ def auth_required(f):
         
         # アクセストークンの検証
         try:
-            # セッションのアクセストークンを検証
-            user_data = supabase.auth.get_user(session['access_token'])
-            if not user_data:
-                raise Exception("無効なセッションです")
+            # セッションのアクセストークンを検証（load_userと同じキャッシュを使用）
+            token_verifier.verify(session['access_token'])
         except Exception as e:
             logger.warning(f"セッション検証エラー: {str(e)}")
             
@@ -375,71 +395,26 @@ def auth_required(f):
     
     return decorated_function
 
-# 最新のフィルタリング済みJSONファイルを取得する関数
+# 最新のフィルタリング済み案件を取得する関数
 def get_latest_filtered_json():
-    data_dir = app_paths['data_dir']
-    json_files = glob.glob(str(data_dir / 'crawled_data' / '*_filtered.json'))
-    if not json_files:
-        return []
-    latest_file = max(json_files, key=os.path.getctime)
-    with open(latest_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return get_job_store(app_paths['data_dir']).latest_filtered_jobs()
 
-# 全てのフィルタリング済みJSONファイルの一覧を取得する関数
-def get_all_filtered_json_files():
-    data_dir = app_paths['data_dir']
-    crawled_data_dir = data_dir / 'crawled_data'
-    json_files = glob.glob(str(crawled_data_dir / '*_filtered.json'))
-    if not json_files:
-        return []
-    
-    # ファイル情報を取得
-    file_info = []
-    for file_path in json_files:
-        file_name = os.path.basename(file_path)
-        # ファイル名からタイムスタンプを抽出（jobs_YYYYMMDD_HHMMSS_filtered.json）
-        match = re.search(r'jobs_(\d{8})_(\d{6})_filtered\.json', file_name)
-        if match:
-            date_str = match.group(1)
-            time_str = match.group(2)
-            # 日付フォーマットを変換
-            formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]} {time_str[:2]}:{time_str[2:4]}:{time_str[4:6]}"
-            
-            # 案件数を取得
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    jobs = json.load(f)
-                    job_count = len(jobs)
-            except:
-                job_count = 0
-            
-            file_info.append({
-                'path': file_path,
-                'name': file_name,
-                'date': formatted_date,
-                'timestamp': f"{date_str}_{time_str}",
-                'job_count': job_count
-            })
-    
-    # 日付の降順でソート
-    file_info.sort(key=lambda x: x['timestamp'], reverse=True)
-    return file_info
+# 全てのフィルタリング済みクロール結果の一覧を取得する関数（新しい順）
+# validate が False の場合はファイルを確認せずにデータストアの記録を返す（ページの表示時のみ確認する）
+def get_all_filtered_json_files(validate=False):
+    return get_job_store(app_paths['data_dir']).list_runs(validate=validate)
 
-# 特定のフィルタリング済みJSONファイルを読み込む関数
+# 特定のクロール結果のフィルタリング済み案件を読み込む関数
 def load_filtered_json(file_path):
-    if not os.path.exists(file_path):
-        return []
-    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            jobs = json.load(f)
-            # 詳細テキストの改行をHTMLの<br>タグに変換
-            for job in jobs:
-                if 'detail_description' in job:
-                    job['detail_description'] = job['detail_description'].replace('\n', '<br>')
-            return jobs
+        jobs = get_job_store(app_paths['data_dir']).filtered_jobs(run_key_from_path(file_path))
+        # 詳細テキストの改行をHTMLの<br>タグに変換
+        for job in jobs:
+            if 'detail_description' in job:
+                job['detail_description'] = job['detail_description'].replace('\n', '<br>')
+        return jobs
     except Exception as e:
-        logger.error(f"ファイルの読み込みに失敗: {str(e)}")
+        logger.error(f"案件データの読み込みに失敗: {str(e)}")
         return []
 
 # 案件データをクリアする関数
@@ -457,14 +432,20 @@ def clear_job_data(file_path=None):
         data_dir = app_paths['data_dir']
         crawled_data_dir = data_dir / 'crawled_data'
         
+        store = get_job_store(data_dir)
         if file_path:
             # 特定のファイルのみ削除
+            store.delete_run(run_key_from_path(file_path))
             if os.path.exists(file_path):
                 os.remove(file_path)
                 # 対応する非フィルタリングファイルも削除
                 raw_file = file_path.replace('_filtered.json', '.json')
                 if os.path.exists(raw_file):
                     os.remove(raw_file)
+                # 事前ランキングの埋め込みベクトルも削除
+                embeddings_file = raw_file.replace('.json', '_embeddings.npy')
+                if os.path.exists(embeddings_file):
+                    os.remove(embeddings_file)
                 return 1
             return 0
         else:
@@ -474,6 +455,9 @@ def clear_job_data(file_path=None):
                 if not file_path.endswith('settings.json') and not file_path.endswith('checked_jobs.json'):
                     os.remove(file_path)
                     count += 1
+            for file_path in glob.glob(str(crawled_data_dir / '*_embeddings.npy')):
+                os.remove(file_path)
+            store.delete_all_runs()
             return count
     except Exception as e:
         logger.error(f"案件データのクリアに失敗: {str(e)}")
@@ -498,10 +482,12 @@ def clear_old_job_data(days=14):
         # 現在の日時から指定日数前の日時を計算
         cutoff_date = datetime.now() - timedelta(days=days)
         logger.info(f"{days}日以前（{cutoff_date.strftime('%Y-%m-%d')}より前）の案件データを削除します")
+        get_job_store(data_dir).delete_runs_before(cutoff_date.strftime('%Y-%m-%d %H:%M:%S'))
         
         # 削除対象のファイルを検索
         count = 0
-        for file_path in glob.glob(str(crawled_data_dir / 'jobs_*.json')):
+        old_files = glob.glob(str(crawled_data_dir / 'jobs_*.json')) + glob.glob(str(crawled_data_dir / 'jobs_*_embeddings.npy'))
+        for file_path in old_files:
             # ファイル名からタイムスタンプを抽出（jobs_YYYYMMDD_HHMMSS.json または jobs_YYYYMMDD_HHMMSS_filtered.json）
             file_name = os.path.basename(file_path)
             match = re.search(r'jobs_(\d{8})_(\d{6})', file_name)
@@ -530,126 +516,15 @@ def clear_old_job_data(days=14):
         logger.error(f"古い案件データの削除に失敗: {str(e)}\n{traceback.format_exc()}")
         return 0
 
-# 過去の案件を再フィルタリングする関数
-def refilter_jobs(filter_prompt, model="gpt-4o-mini"):
-    """
-    保存されている全ての案件データに対して再フィルタリングを実行
-    
-    Args:
-        filter_prompt: フィルタリング条件
-        model: 使用するAIモデル
-    
-    Returns:
-        再フィルタリングされた案件数
-    """
-    try:
-        # アプリケーションパスを取得
-        data_dir = app_paths['data_dir']
-        crawled_data_dir = data_dir / 'crawled_data'
-        
-        # 全ての非フィルタリングJSONファイルを取得
-        raw_files = glob.glob(str(crawled_data_dir / 'jobs_*.json'))
-        raw_files = [f for f in raw_files if not f.endswith('_filtered.json')]
-        
-        if not raw_files:
-            return 0
-            
-        # OpenAI クライアントの初期化
-        settings = load_settings()
-        client = OpenAI(
-            api_key=settings.get('api_key', '')
-        )
-        
-        # 各ファイルに対して再フィルタリングを実行
-        total_filtered = 0
-        
-        for raw_file in raw_files:
-            try:
-                # 元データを読み込み
-                with open(raw_file, 'r', encoding='utf-8') as f:
-                    jobs = json.load(f)
-                
-                # フィルタリング設定
-                config = {
-                    'model': model,
-                    'prompt': filter_prompt,
-                    'temperature': 0,
-                    'max_tokens': 100
-                }
-                
-                # フィルタリング実行
-                filtered_jobs = []
-                for job in jobs:
-                    try:
-                        # 案件情報をテキスト形式に変換
-                        job_text = f"""
-                        タイトル: {job.get('title', 'N/A')}
-                        予算: {job.get('budget', 'N/A')}
-                        クライアント: {job.get('client', 'N/A')}
-                        投稿日: {job.get('posted_date', 'N/A')}
-                        説明: {job.get('description', 'N/A')}
-                        """
-                        
-                        # GPTにフィルタリングを依頼
-                        response = client.chat.completions.create(
-                            model=config['model'],
-                            messages=[
-                                {"role": "system", "content": "あなたは案件フィルタリングを行うアシスタントです。与えられた条件に基づいて案件を評価し、条件に合致するかどうかを判断してください。"},
-                                {"role": "user", "content": f"以下の案件が条件「{config['prompt']}」に合致するか判断してください。\n\n{job_text}\n\nJSON形式で回答してください: {{\"match\": true/false, \"reason\": \"理由\"}}"}
-                            ],
-                            temperature=config['temperature'],
-                            max_tokens=config['max_tokens']
-                        )
-                        
-                        # レスポンスからJSONを抽出
-                        result_text = response.choices[0].message.content
-                        result_json = re.search(r'\{.*\}', result_text, re.DOTALL)
-                        if result_json:
-                            result = json.loads(result_json.group(0))
-                        else:
-                            result = {"match": True, "reason": "フォーマットエラー（安全のため含める）"}
-                        
-                        # 条件に合致する場合のみ追加
-                        if result.get('match', True):
-                            job['gpt_reason'] = result.get('reason', '')
-                            filtered_jobs.append(job)
-                    except Exception as e:
-                        logger.error(f"案件フィルタリング中にエラー: {str(e)}")
-                        # エラーの場合は安全のため含める
-                        filtered_jobs.append(job)
-                
-                # フィルタリング結果を保存
-                filtered_file = raw_file.replace('.json', '_filtered.json')
-                with open(filtered_file, 'w', encoding='utf-8') as f:
-                    json.dump(filtered_jobs, f, ensure_ascii=False, indent=2)
-                
-                total_filtered += len(filtered_jobs)
-                
-            except Exception as e:
-                logger.error(f"ファイル {raw_file} の再フィルタリング中にエラー: {str(e)}")
-                continue
-        
-        return total_filtered
-        
-    except Exception as e:
-        logger.error(f"再フィルタリング処理中にエラー: {str(e)}")
-        raise
-
-# チェック状態を保存するファイル
-CHECKS_FILE = 'crawled_data/checked_jobs.json'
-
-# チェック状態を読み込む
+# チェック状態を読み込む（メモリ上のチェック状態ストアから取得）
 def load_checks():
-    if os.path.exists(CHECKS_FILE):
-        with open(CHECKS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return get_check_store(app_paths['data_dir']).get_all()
 
-# チェック状態を保存
+# チェック状態を保存（書き込みはまとめてバックグラウンドで行う）
 def save_checks(checks):
-    os.makedirs(os.path.dirname(CHECKS_FILE), exist_ok=True)
-    with open(CHECKS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(checks, f, ensure_ascii=False, indent=2)
+    get_check_store(app_paths['data_dir']).set_many(
+        {url: value.get('checked') for url, value in checks.items()}
+    )
 
 # 設定ファイルのパス
 SETTINGS_FILE = 'crawled_data/settings.json'
@@ -677,61 +552,62 @@ def save_settings(settings):
     
     # プロンプトが更新された場合、prompt.txtも更新
     if 'filter_prompt' in settings:
-        prompt_config = {
+        # batch_sizeなど手動で追加された設定は保持する
+        prompt_config = load_prompt_config()
+        prompt_config.update({
             'model': settings.get('model', '4o-mini'),
             'prompt': settings['filter_prompt'],
             'temperature': 0,
             'max_tokens': 100
-        }
-        with open(PROMPT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(prompt_config, f, ensure_ascii=False, indent=2)
+        })
+        config_cache.write_json(PROMPT_FILE, prompt_config)
     
     # デバッグ情報を追加
     logger.info(f"設定を保存します: {SETTINGS_FILE}")
     logger.debug(f"保存する設定: {settings}")
     
-    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(settings, f, ensure_ascii=False, indent=2)
+    config_cache.write_json(SETTINGS_FILE, settings)
     
     logger.info("設定を保存しました")
 
+# prompt.txtのフィルタリング設定を読み込む
+def load_prompt_config():
+    try:
+        prompt_config = config_cache.load_json(PROMPT_FILE)
+        if isinstance(prompt_config, dict):
+            return prompt_config
+    except Exception as e:
+        logger.error(f"prompt.txtの読み込みに失敗: {str(e)}")
+    return {}
+
 # 設定を読み込む
 def load_settings():
     settings = DEFAULT_SETTINGS.copy()
     
-    # 設定ファイルから読み込み
-    if os.path.exists(SETTINGS_FILE):
-        logger.info(f"設定ファイルを読み込みます: {SETTINGS_FILE}")
-        try:
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-                loaded_settings = json.load(f)
-                settings.update(loaded_settings)
-                logger.debug(f"読み込んだ設定: {settings}")
-        except Exception as e:
-            logger.error(f"設定ファイルの読み込みに失敗: {str(e)}")
-    else:
-        logger.warning(f"設定ファイルが見つかりません: {SETTINGS_FILE}")
+    # 設定ファイルから読み込み（変更がなければメモリ上のキャッシュを使用）
+    try:
+        loaded_settings = config_cache.load_json(SETTINGS_FILE)
+        if loaded_settings is None:
+            logger.warning(f"設定ファイルが見つかりません: {SETTINGS_FILE}")
+        else:
+            settings.update(loaded_settings)
+    except Exception as e:
+        logger.error(f"設定ファイルの読み込みに失敗: {str(e)}")
     
     # prompt.txtからフィルター設定を読み込み
-    if os.path.exists(PROMPT_FILE):
-        try:
-            with open(PROMPT_FILE, 'r', encoding='utf-8') as f:
-                prompt_config = json.load(f)
-                settings['filter_prompt'] = prompt_config.get('prompt', '')
-        except Exception as e:
-            logger.error(f"prompt.txtの読み込みに失敗: {str(e)}")
+    try:
+        prompt_config = config_cache.load_json(PROMPT_FILE)
+        if prompt_config is not None:
+            settings['filter_prompt'] = prompt_config.get('prompt', '')
+    except Exception as e:
+        logger.error(f"prompt.txtの読み込みに失敗: {str(e)}")
     
-    # SelfIntroduction.txtから自己紹介文を読み込み
+    # SelfIntroduction.txtから自己紹介文を読み込み（ない場合は空文字）
     self_intro_file = app_paths['data_dir'] / 'crawled_data' / 'SelfIntroduction.txt'
-    if os.path.exists(self_intro_file):
-        try:
-            with open(self_intro_file, 'r', encoding='utf-8') as f:
-                settings['self_introduction'] = f.read()
-        except Exception as e:
-            logger.error(f"自己紹介文の読み込みに失敗: {str(e)}")
-            settings['self_introduction'] = ''
-    else:
-        # SelfIntroduction.txtがない場合はデフォルトの自己紹介文を設定
+    try:
+        settings['self_introduction'] = config_cache.load_text(self_intro_file)
+    except Exception as e:
+        logger.error(f"自己紹介文の読み込みに失敗: {str(e)}")
         settings['self_introduction'] = ''
     
     return settings
@@ -795,6 +671,7 @@ def logout():
     try:
         # Supabaseのセッションを終了
         if 'access_token' in session:
+            token_verifier.invalidate(session['access_token'])
             try:
                 supabase.auth.sign_out(session['access_token'])
             except:
@@ -864,12 +741,8 @@ def update_check():
         
         logger.info(f"チェック状態の更新リクエスト: URL={job_url}, checked={is_checked}")
         
-        checks = load_checks()
-        checks[job_url] = {
-            'checked': is_checked,
-            'updated_at': datetime.now().isoformat()
-        }
-        save_checks(checks)
+        # 変更された案件のみ保存する
+        get_check_store(app_paths['data_dir']).set(job_url, is_checked)
         
         logger.info(f"チェック状態を更新しました: URL={job_url}, checked={is_checked}")
         
@@ -878,6 +751,27 @@ def update_check():
         logger.error(f"チェック状態の更新に失敗: {str(e)}\n{traceback.format_exc()}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/update_checks', methods=['POST'])
+@auth_required
+def update_checks():
+    """
+    複数の案件のチェック状態をまとめて更新するAPI
+    
+    リクエスト: {"urls": [...], "checked": true} または {"checks": {"<url>": true, ...}}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            count = get_check_store(app_paths['data_dir']).apply_update(data)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        
+        logger.info(f"チェック状態をまとめて更新しました: {count}件")
+        return jsonify({'status': 'success', 'count': count})
+    except Exception as e:
+        logger.error(f"チェック状態の一括更新に失敗: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/update_settings', methods=['POST'])
 @auth_required
 def update_settings():
@@ -928,8 +822,7 @@ def update_settings():
                 # SelfIntroduction.txtファイルに保存
                 try:
                     self_intro_file = app_paths['data_dir'] / 'crawled_data' / 'SelfIntroduction.txt'
-                    with open(self_intro_file, 'w', encoding='utf-8') as f:
-                        f.write(data['self_introduction'])
+                    config_cache.write_text(self_intro_file, data['self_introduction'])
                 except Exception as e:
                     logger.error(f"自己紹介文の保存に失敗: {str(e)}")
                     return jsonify({'status': 'error', 'message': '自己紹介文の保存に失敗しました'}), 500
@@ -1008,91 +901,54 @@ def fetch_new_data():
                 status_code=500
             )
         
-        # Pythonインタープリタのパスを取得
-        python_executable = sys.executable
+        # クローラーはジョブとしてバックグラウンドで実行する（同時実行は1つ、実行中は待ち行列に追加）
+        manager = get_crawl_manager(app_paths['data_dir'])
+        job = manager.start([sys.executable, crawler_path], queue_if_busy=bool(data.get('queue', True)))
+        if job is None:
+            running = manager.current()
+            return jsonify({
+                'status': 'error',
+                'message': 'クロールが実行中です。',
+                'job_id': running.job_id if running else None
+            }), 409
         
-        # サブプロセスとしてクローラーを実行
-        try:
-            logger.info(f"クローラーを実行: {python_executable} {crawler_path}")
-            process = subprocess.Popen(
-                [python_executable, crawler_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # 実行結果を取得
-            stdout, stderr = process.communicate()
-            
-            # 出力内容をログに記録
-            logger.info(f"クローラー標準出力: {stdout}")
-            if stderr:
-                logger.warning(f"クローラー標準エラー出力: {stderr}")
-            
-            if process.returncode != 0:
-                logger.error(f"クローラーの実行に失敗: 戻り値={process.returncode}, エラー={stderr}")
-                return handle_error(
-                    Exception(f"クローラーの実行に失敗しました: {stderr}"),
-                    error_type="クローラーエラー",
-                    user_message=f"データの取得に失敗しました: {stderr}",
-                    status_code=500
-                )
-        except subprocess.SubprocessError as e:
+        # ジョブIDをすぐに返す（進捗は /api/crawl/<job_id>/progress、結果は /api/crawl/<job_id> で取得）
+        if not data.get('wait'):
+            return jsonify({
+                'status': 'accepted',
+                'message': 'データの取得を開始しました。',
+                'job_id': job.job_id,
+                'queued': job.status == 'queued'
+            }), 202
+        
+        # wait指定時のみ、完了まで待って結果を返す
+        manager.wait(job.job_id)
+        output = '\n'.join(job.output)
+        if job.status != 'completed':
             return handle_error(
-                e,
-                error_type="プロセスエラー",
-                user_message="クローラープロセスの実行に失敗しました。",
+                Exception(f"クローラーの実行に失敗しました: {job.error or job.status}"),
+                error_type="クローラーエラー",
+                user_message=f"データの取得に失敗しました: {job.error or job.status}",
                 status_code=500
             )
         
         # 最新のデータを読み込む
         try:
-            data_dir = app_paths['data_dir']
-            crawled_data_dir = data_dir / 'crawled_data'
-            os.makedirs(crawled_data_dir, exist_ok=True)
-            
-            json_files = glob.glob(str(crawled_data_dir / '*_filtered.json'))
-            if not json_files:
-                logger.warning("フィルタリング済みJSONファイルが見つかりません")
+            jobs = get_crawl_result(job)
+            if jobs is None:
+                logger.warning("フィルタリング済みのクロール結果が見つかりません")
                 return jsonify({
                     'status': 'error',
                     'message': '新規データが見つかりませんでした。ログインエラーや設定の問題が考えられます。',
-                    'crawler_output': stdout,
-                    'crawler_error': stderr
+                    'crawler_output': output
                 }), 404
                 
-            # 最新のファイルを選択
-            latest_file = max(json_files, key=os.path.getctime)
-            logger.info(f"最新のフィルタリング済みJSONファイル: {latest_file}")
-            
-            # ファイルが存在するか確認
-            if not os.path.exists(latest_file) or os.path.getsize(latest_file) == 0:
-                logger.error(f"ファイルが存在しないか空です: {latest_file}")
-                return jsonify({
-                    'status': 'error',
-                    'message': 'データファイルが存在しないか空です。',
-                    'crawler_output': stdout,
-                    'crawler_error': stderr
-                }), 500
-            
-            # ファイルを読み込む
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                jobs = json.load(f)
-                
             logger.info(f"新規データの取得が完了: {len(jobs)}件の案件を取得")
             return jsonify({
                 'status': 'success',
                 'message': f'新規データの取得が完了しました（{len(jobs)}件）',
                 'jobs': jobs
             })
-        except json.JSONDecodeError as e:
-            logger.error(f"JSONの解析に失敗: {str(e)}, ファイル: {latest_file}")
-            return handle_error(
-                e,
-                error_type="JSONデータエラー",
-                user_message="新規データの解析に失敗しました。データが破損している可能性があります。",
-                status_code=500
-            )
         except Exception as e:
             logger.error(f"データ読み込みに失敗: {str(e)}\n{traceback.format_exc()}")
             return handle_error(
@@ -1110,6 +966,73 @@ def fetch_new_data():
             status_code=500
         )
 
+def get_crawl_result(job):
+    """
+    クロールジョブの結果（最新のフィルタリング済み案件）を取得
+    
+    Returns:
+        案件リスト。ジョブの開始以降に作成されたクロール結果がない場合は None
+    """
+    store = get_job_store(app_paths['data_dir'])
+    # クローラーが記録したクロール実行を使う（ポーリングのたびにファイルを確認しない）
+    runs = store.list_runs(validate=False)
+    if not runs:
+        return None
+    latest_run = runs[0]
+    # クロール結果のファイル名は秒単位の時刻のため、開始時刻の秒の切り捨てと比較する
+    started_at = datetime.fromtimestamp(int(job.started_at or job.created_at)).strftime('%Y-%m-%d %H:%M:%S')
+    if latest_run['date'] < started_at:
+        return None
+    logger.info(f"最新のクロール結果: {latest_run['name']}")
+    return store.filtered_jobs(run_key_from_path(latest_run['path']))
+
+@app.route('/api/crawl/<job_id>', methods=['GET'])
+@auth_required
+def crawl_status(job_id):
+    """クロールジョブの状態を取得するAPI（完了時は結果の案件を含む）"""
+    manager = get_crawl_manager(app_paths['data_dir'])
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': '指定されたジョブが見つかりません。'}), 404
+    response = {'success': True, **job.to_dict(), 'queued_jobs': manager.queued()}
+    if job.status == 'completed':
+        response['jobs'] = get_crawl_result(job) or []
+    return jsonify(response)
+
+@app.route('/api/crawl/<job_id>/cancel', methods=['POST'])
+@auth_required
+def cancel_crawl(job_id):
+    """待ち行列のクロールを取り消す、または実行中のクロールを停止するAPI"""
+    if not get_crawl_manager(app_paths['data_dir']).cancel(job_id):
+        return jsonify({'success': False, 'message': 'このジョブは取り消せません。'}), 400
+    return jsonify({'success': True, 'message': 'クロールを取り消しました。'})
+
+@app.route('/api/crawl/<job_id>/progress')
+@auth_required
+def crawl_progress(job_id):
+    """クロールジョブの出力と状態をSSEで配信するAPI"""
+    manager = get_crawl_manager(app_paths['data_dir'])
+    queue = manager.subscribe(job_id)
+    if queue is None:
+        return jsonify({'success': False, 'message': '指定されたジョブが見つかりません。'}), 404
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    event = queue.get(timeout=60)
+                except Empty:
+                    # ログインや詳細取得で出力が途切れる間は接続維持のためのコメントを送る
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if event.get('type') == 'status' and event.get('completed'):
+                    break
+        finally:
+            manager.unsubscribe(job_id, queue)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
 @app.route('/api/check_auth', methods=['POST'])
 @auth_required
 def api_check_auth():
@@ -1189,79 +1112,25 @@ def check_auth():
 @app.route('/fetch_status')
 @auth_required
 def fetch_status():
+    """クローラーの進捗を取得（進捗ファイルの最後の1行のみを読む）"""
     try:
-        # アプリケーションパスを取得
-        data_dir = app_paths['data_dir']
-        log_dir = data_dir / 'logs'
-        
-        # クローラーのログファイルを検索
-        try:
-            log_files = glob.glob(str(log_dir / 'crawler_*.log'))
-            if not log_files:
-                log_files = [str(log_dir / 'crawler.log')]
-                
-            # ログファイルが存在するか確認
-            if not os.path.exists(log_files[0]):
-                logger.warning(f"ログファイルが見つかりません: {log_files[0]}")
-                return jsonify({
-                    'status': 'unknown',
-                    'message': 'ログファイルが見つかりません'
-                })
-        except Exception as e:
-            return handle_error(
-                e,
-                error_type="ログファイル検索エラー",
-                user_message="ログファイルの検索に失敗しました。",
-                status_code=500
-            )
-        
-        # 最新のログファイルを取得
-        try:
-            latest_log = max(log_files, key=os.path.getctime)
-        except Exception as e:
-            return handle_error(
-                e,
-                error_type="ログファイル選択エラー",
-                user_message="最新のログファイルの選択に失敗しました。",
-                status_code=500
-            )
-        
-        # ログファイルを読み取り
-        try:
-            with open(latest_log, 'r', encoding='utf-8') as f:
-                # 最後の10行を読み取り
-                lines = f.readlines()[-10:]
-        except FileNotFoundError:
-            logger.warning(f"ログファイルが見つかりません: {latest_log}")
+        progress = read_latest_progress(get_progress_file(app_paths['data_dir'] / 'logs'))
+        if progress is None:
             return jsonify({
                 'status': 'unknown',
-                'message': 'ログファイルが見つかりません'
+                'message': '進捗情報が見つかりません'
             })
-        except Exception as e:
-            return handle_error(
-                e,
-                error_type="ログファイル読み取りエラー",
-                user_message="ログファイルの読み取りに失敗しました。",
-                status_code=500
-            )
-            
-        # ログから進捗状況を解析
-        for line in reversed(lines):
-            if '案件を取得' in line:
-                return jsonify({
-                    'status': 'running',
-                    'message': f'案件情報を取得中...'
-                })
-            elif 'GPTフィルタリング' in line:
-                return jsonify({
-                    'status': 'running',
-                    'message': 'GPTによるフィルタリング中...'
-                })
         
-        # 進捗状況が不明な場合
+        if progress['phase'] == 'failed':
+            status = 'error'
+        elif progress['phase'] in ('completed', 'cancelled'):
+            status = progress['phase']
+        else:
+            status = 'running'
         return jsonify({
-            'status': 'unknown',
-            'message': '処理中...'
+            'status': status,
+            'message': progress.get('message', '処理中...'),
+            'progress': progress
         })
         
     except Exception as e:
@@ -1272,13 +1141,46 @@ def fetch_status():
             status_code=500
         )
 
+@app.route('/fetch_status/stream')
+@auth_required
+def fetch_status_stream():
+    """クローラーの進捗をSSEで配信（進捗ファイルの追記分のみを読む）"""
+    progress_file = get_progress_file(app_paths['data_dir'] / 'logs')
+    
+    def generate():
+        # 接続時点の最新の進捗を送り、以降は追記された進捗を送る
+        latest = read_latest_progress(progress_file)
+        if latest is not None:
+            yield f"data: {json.dumps(latest, ensure_ascii=False)}\n\n"
+            if latest.get('phase') in FINAL_PHASES:
+                return
+        offset = os.path.getsize(progress_file) if os.path.exists(progress_file) else 0
+        idle = 0.0
+        while True:
+            events, offset = follow_progress(progress_file, offset)
+            for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if event.get('phase') in FINAL_PHASES:
+                    return
+            if events:
+                idle = 0.0
+            else:
+                idle += 0.5
+                if idle >= 30:
+                    # 接続維持のためのコメントを送る
+                    yield ": keep-alive\n\n"
+                    idle = 0.0
+            time.sleep(0.5)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
 @app.route('/job_history')
 @auth_required
 def job_history_page():
     """案件履歴管理ページを表示"""
     try:
-        # 利用可能な案件履歴ファイル一覧を取得
-        job_files = get_all_filtered_json_files()
+        # 利用可能な案件履歴ファイル一覧を取得（表示時に削除・変更されたファイルを反映する）
+        job_files = get_all_filtered_json_files(validate=True)
         
         # 最新のファイルから案件を読み込む
         jobs = []
@@ -1337,28 +1239,22 @@ def get_job_history_content():
                 'message': '無効な案件ファイルパスです。'
             }), 400
             
-        # ファイルの存在確認
-        if not os.path.exists(safe_file_path):
+        # クロール結果の存在確認
+        run = get_job_store(data_dir).get_run(run_key_from_path(file_name))
+        if run is None:
             return jsonify({
                 'success': False,
                 'message': '案件ファイルが見つかりません。'
             }), 404
             
-        # ファイルから案件を読み込む
+        # 案件データストアから案件を読み込む
         jobs = load_filtered_json(safe_file_path)
         
-        # ファイル情報を取得
-        file_name = os.path.basename(safe_file_path)
-        match = re.search(r'jobs_(\d{8})_(\d{6})_filtered\.json', file_name)
-        date_str = ""
-        if match:
-            date_str = f"{match.group(1)[:4]}-{match.group(1)[4:6]}-{match.group(1)[6:8]} {match.group(2)[:2]}:{match.group(2)[2:4]}:{match.group(2)[4:6]}"
-        
         return jsonify({
             'success': True,
             'jobs': jobs,
             'file_name': file_name,
-            'date': date_str,
+            'date': run['date'],
             'job_count': len(jobs)
         })
         
@@ -1431,9 +1327,6 @@ def refilter_job_history():
                 'message': 'フィルター条件が指定されていません。'
             }), 400
             
-        # 再フィルタリングを実行
-        total_filtered = refilter_jobs(filter_prompt, model)
-        
         # 設定を更新
         settings = load_settings()
         settings['filter_prompt'] = filter_prompt
@@ -1441,13 +1334,24 @@ def refilter_job_history():
             settings['model'] = model
         save_settings(settings)
         
-        # 操作をログに記録
-        logger.info(f"案件の再フィルタリングが完了しました: {total_filtered}件")
+        # 再フィルタリングはバックグラウンドで実行し、ジョブIDをすぐに返す
+        manager = get_refilter_manager(app_paths['data_dir'])
+        # 既定では前回から変わった案件のみを再評価する（incremental=false で全件を再評価）
+        incremental = bool(data.get('incremental', True))
+        job_id = manager.start(filter_prompt, model, settings, load_prompt_config(), incremental=incremental)
+        if job_id is None:
+            # 同じファイルを書き換えるため、実行中のジョブがある場合は開始しない
+            return jsonify({
+                'success': False,
+                'message': '再フィルタリングが実行中です。',
+                'job_id': manager.current()
+            }), 409
+        logger.info(f"案件の再フィルタリングを開始しました: {job_id}")
         
         return jsonify({
             'success': True,
-            'message': f'再フィルタリングが完了しました。{total_filtered}件の案件がフィルタリングされました。',
-            'total_filtered': total_filtered
+            'message': '再フィルタリングを開始しました。',
+            'job_id': job_id
         })
         
     except Exception as e:
@@ -1458,6 +1362,65 @@ def refilter_job_history():
             status_code=500
         )
 
+@app.route('/api/job_history/refilter/<job_id>', methods=['GET'])
+@auth_required
+def refilter_status(job_id):
+    """再フィルタリングジョブの状態を取得するAPI"""
+    status = get_refilter_manager(app_paths['data_dir']).get_status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': '指定されたジョブが見つかりません。'}), 404
+    return jsonify({'success': True, **status})
+
+@app.route('/api/job_history/refilter/<job_id>/resume', methods=['POST'])
+@auth_required
+def resume_refilter(job_id):
+    """中断した再フィルタリングジョブを再開するAPI"""
+    try:
+        manager = get_refilter_manager(app_paths['data_dir'])
+        if not manager.resume(job_id, load_settings(), load_prompt_config()):
+            running = manager.current()
+            if running is not None:
+                return jsonify({
+                    'success': False,
+                    'message': '再フィルタリングが実行中です。',
+                    'job_id': running
+                }), 409
+            return jsonify({'success': False, 'message': 'このジョブは再開できません。'}), 400
+        return jsonify({'success': True, 'message': '再フィルタリングを再開しました。', 'job_id': job_id})
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="再フィルタリングエラー",
+            user_message="再フィルタリングの再開に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/job_history/refilter/<job_id>/progress')
+@auth_required
+def refilter_progress(job_id):
+    """再フィルタリングの進捗をSSEで配信するAPI"""
+    manager = get_refilter_manager(app_paths['data_dir'])
+    queue = manager.subscribe(job_id)
+    if queue is None:
+        return jsonify({'success': False, 'message': '指定されたジョブが見つかりません。'}), 404
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    progress = queue.get(timeout=60)
+                except Empty:
+                    # 長いファイルの処理中は接続維持のためのコメントを送る
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(progress, ensure_ascii=False)}\n\n"
+                if progress['completed']:
+                    break
+        finally:
+            manager.unsubscribe(job_id, queue)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
 @app.route('/api/get_checks')
 @auth_required
 def get_checks_api():
@@ -1590,29 +1553,16 @@ def get_job_details_api():
                 'message': '案件URLが指定されていません'
             }), 400
         
-        # 全ての案件データをチェック
-        all_jobs = []
-        json_files = glob.glob('crawled_data/*_filtered.json')
-        
-        for file_path in json_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    jobs = json.load(f)
-                    all_jobs.extend(jobs)
-            except Exception as e:
-                logger.error(f"ファイル {file_path} の読み込み中にエラー: {str(e)}")
-                continue
-        
-        # URLに一致する案件を探す
-        for job in all_jobs:
-            if job.get('url') == job_url:
-                # 詳細情報の整形
-                if 'detail_description' in job:
-                    job['detail_description'] = job['detail_description'].replace('\n', '<br>')
-                return jsonify({
-                    'success': True,
-                    'job': job
-                })
+        # URLのインデックスから最新の案件を取得
+        job = get_job_store(app_paths['data_dir']).find_filtered_job_by_url(job_url)
+        if job:
+            # 詳細情報の整形
+            if 'detail_description' in job:
+                job['detail_description'] = job['detail_description'].replace('\n', '<br>')
+            return jsonify({
+                'success': True,
+                'job': job
+            })
         
         # 案件が見つからない場合
         return jsonify({
@@ -1693,6 +1643,12 @@ def chromedriver_error():
 
 # アプリケーション終了時の処理
 def cleanup_resources():
+    # 未保存のチェック状態を書き込む
+    flush_check_stores()
+    
+    # 一括応募で起動したブラウザを終了（os._exit では atexit が呼ばれないため。応募フォームのタブが開いているブラウザは残す）
+    close_browser_pools()
+    
     # ChromeDriverのバックグラウンド更新を停止
     chromedriver_manager.stop_background_update()
     logger.info("ChromeDriverのバックグラウンド更新を停止しました")
@@ -1834,6 +1790,12 @@ def init_app():
     # バルク応募ルートの登録
     register_bulk_apply_routes(app)
     
+    # 前回中断した再フィルタリングジョブを再開
+    try:
+        get_refilter_manager(app_paths['data_dir']).resume_interrupted(load_settings(), load_prompt_config())
+    except Exception as e:
+        logger.error(f"再フィルタリングジョブの再開に失敗: {str(e)}")
+    
     return app
 
 # ブラウザ終了通知を受け取るAPIエンドポイント
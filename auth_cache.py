@@ -0,0 +1,186 @@
+"""
+アクセストークンの検証結果キャッシュ
+
+auth_required と load_user はリクエストごとに Supabase の get_user を呼び出して
+トークンを検証していた。検証済みのトークンをハッシュ値をキーとして保持し、
+JWT の exp を上限とする有効期限内はネットワークを介さずに結果を返す。
+
+SUPABASE_JWT_SECRET が設定されている場合は、HS256 の署名と exp を
+ローカルで検証し、Supabase への問い合わせ自体を行わない。
+同じトークンの検証が同時に発生した場合は1回の問い合わせにまとめる。
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+# 検証結果を保持する最大秒数（exp がこれより早い場合は exp まで）
+DEFAULT_MAX_TTL = 300
+# 保持するトークンの最大数
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class TokenVerificationError(Exception):
+    """トークンの検証に失敗したことを示す例外"""
+    pass
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def decode_claims(token: str) -> Dict:
+    """署名を検証せずにJWTのペイロードを取得（有効期限の算出用）"""
+    try:
+        return json.loads(_b64decode(token.split('.')[1]))
+    except Exception:
+        return {}
+
+
+def verify_hs256(token: str, secret: str, leeway: int = 30) -> Dict:
+    """
+    HS256で署名されたJWTをローカルで検証し、クレームを返す
+
+    Raises:
+        TokenVerificationError: 形式・アルゴリズム・署名・有効期限のいずれかが不正な場合
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(_b64decode(header_segment))
+        claims = json.loads(_b64decode(payload_segment))
+        signature = _b64decode(signature_segment)
+    except Exception:
+        raise TokenVerificationError("トークンの形式が不正です")
+
+    if header.get('alg') != 'HS256':
+        raise TokenVerificationError(f"未対応の署名アルゴリズムです: {header.get('alg')}")
+
+    expected = hmac.new(secret.encode('utf-8'), f'{header_segment}.{payload_segment}'.encode('ascii'),
+                        hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise TokenVerificationError("トークンの署名が一致しません")
+
+    exp = claims.get('exp')
+    if exp is None or time.time() > float(exp) + leeway:
+        raise TokenVerificationError("トークンの有効期限が切れています")
+    return claims
+
+
+def user_from_claims(claims: Dict):
+    """クレームから get_user().user と同じ属性（id, email, user_metadata）を持つオブジェクトを作成"""
+    return SimpleNamespace(
+        id=claims.get('sub'),
+        email=claims.get('email'),
+        user_metadata=claims.get('user_metadata') or {}
+    )
+
+
+class TokenVerifier:
+    """アクセストークンの検証結果をキャッシュする"""
+
+    def __init__(self, fetch_user: Callable[[str], object], jwt_secret: Optional[str] = None,
+                 max_ttl: int = DEFAULT_MAX_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            fetch_user: トークンからユーザーを取得する関数（例: supabase.auth.get_user(token).user）
+            jwt_secret: SupabaseのJWTシークレット（指定時はローカルで署名を検証）
+        """
+        self.fetch_user = fetch_user
+        self.jwt_secret = jwt_secret
+        self.max_ttl = max_ttl
+        self.max_entries = max_entries
+        self._cache: OrderedDict = OrderedDict()
+        self._inflight: Dict[str, SimpleNamespace] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # トークン自体はメモリに保持しない
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def _get_cached(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if time.time() >= expires_at:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return user
+
+    def _store(self, key: str, token: str, user):
+        expires_at = time.time() + self.max_ttl
+        exp = decode_claims(token).get('exp')
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._cache[key] = (user, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def verify(self, token: str):
+        """
+        トークンを検証してユーザーを返す
+
+        Raises:
+            TokenVerificationError: トークンが無効な場合
+        """
+        if not token:
+            raise TokenVerificationError("アクセストークンがありません")
+        key = self._key(token)
+
+        user = self._get_cached(key)
+        if user is not None:
+            return user
+
+        if self.jwt_secret:
+            user = user_from_claims(verify_hs256(token, self.jwt_secret))
+            self._store(key, token, user)
+            return user
+
+        # 同じトークンの検証が進行中の場合は完了を待って結果（または例外）を共有する
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = SimpleNamespace(event=threading.Event(), user=None, error=None)
+                self._inflight[key] = flight
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.user
+
+        try:
+            user = self.fetch_user(token)
+            if not user:
+                raise TokenVerificationError("無効なセッションです")
+            self._store(key, token, user)
+            flight.user = user
+            return user
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def invalidate(self, token: Optional[str] = None):
+        """トークンの検証結果を破棄する（省略時は全て）"""
+        with self._lock:
+            if token is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self._key(token), None)
+        logger.debug("トークンの検証結果キャッシュを破棄しました")
@@ -0,0 +1,105 @@
+"""
+Chromeの軽量化（lean_browser）の効果の計測
+
+軽量化なし（従来の設定）と軽量化ありのそれぞれでクローラー用のChromeを起動し、
+同じページを読み込んで以下を比較する。
+
+- driver.get から戻るまでの時間
+- 案件カード（または詳細テーブル）が表示されるまでの時間
+- 読み込んだリソース数と転送量（Resource Timing）
+- ChromeDriver と Chrome の子プロセスを合わせたメモリ使用量（RSS）
+
+使い方:
+    python benchmarks/bench_browser.py [URL ...] [--rounds N] [--driver crawler|apply]
+
+URLを指定しない場合は新着順の検索結果ページを使う（ログインせずに公開ページを読み込む）。
+ChromeDriver が必要。
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from selenium.common.exceptions import TimeoutException  # noqa: E402
+
+from browser_pool import PooledBrowser  # noqa: E402
+from crowdworks_selectors import get_selector  # noqa: E402
+from lean_chrome import lean_options  # noqa: E402
+from selenium_waits import wait_for_any_element  # noqa: E402
+
+DEFAULT_URLS = ["https://crowdworks.jp/public/jobs/search?order=new"]
+
+_RESOURCE_SCRIPT = """
+const entries = performance.getEntriesByType('resource');
+return [entries.length, entries.reduce((sum, entry) => sum + (entry.transferSize || 0), 0)];
+"""
+
+
+def _factory(name: str):
+    if name == 'apply':
+        from bulk_apply import setup_driver
+        return setup_driver
+    from crawler import create_chrome_driver
+    return create_chrome_driver
+
+
+def measure(factory, lean, urls, rounds: int) -> dict:
+    """1つの設定でページを読み込み、計測結果の中央値を返す"""
+    driver = factory(None, lean=lean)
+    browser = PooledBrowser(0, driver, '', False)
+    samples = {'get': [], 'ready': [], 'resources': [], 'kb': []}
+    locators = get_selector('job_card').locators() + get_selector('job_detail').locators()
+    try:
+        for _ in range(rounds):
+            for url in urls:
+                driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+                started = time.perf_counter()
+                driver.get(url)
+                samples['get'].append(time.perf_counter() - started)
+                try:
+                    wait_for_any_element(driver, locators, name='bench')
+                except TimeoutException:
+                    pass
+                samples['ready'].append(time.perf_counter() - started)
+                count, size = driver.execute_script(_RESOURCE_SCRIPT)
+                samples['resources'].append(count)
+                samples['kb'].append(size / 1024)
+        result = {key: statistics.median(values) for key, values in samples.items()}
+        result['rss_mb'] = browser.rss_mb() or 0.0
+        return result
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chromeの軽量化の効果の計測')
+    parser.add_argument('urls', nargs='*', help='読み込むページのURL')
+    parser.add_argument('--rounds', type=int, default=3, help='ページごとの読み込み回数')
+    parser.add_argument('--driver', choices=['crawler', 'apply'], default='crawler',
+                        help='計測するドライバーの作成処理')
+    args = parser.parse_args()
+
+    factory = _factory(args.driver)
+    urls = args.urls or DEFAULT_URLS
+    full = measure(factory, lean_options({'lean_browser': {'enabled': False}}), urls, args.rounds)
+    lean = measure(factory, lean_options({}), urls, args.rounds)
+
+    rows = [
+        ('driver.get（秒）', 'get', '{:.2f}'),
+        ('要素の表示まで（秒）', 'ready', '{:.2f}'),
+        ('リソース数', 'resources', '{:.0f}'),
+        ('転送量（KB）', 'kb', '{:.0f}'),
+        ('メモリ使用量（MB）', 'rss_mb', '{:.0f}')
+    ]
+    print(f"{'':<24}{'従来':>10}{'軽量化':>10}{'削減率':>10}")
+    for label, key, fmt in rows:
+        reduction = (1 - lean[key] / full[key]) * 100 if full[key] else 0.0
+        print(f"{label:<24}{fmt.format(full[key]):>10}{fmt.format(lean[key]):>10}{reduction:>9.0f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
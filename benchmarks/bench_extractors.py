@@ -0,0 +1,128 @@
+"""
+HTML抽出処理のマイクロベンチマーク
+
+保存したページ（検索結果ページ・詳細ページ）を各抽出処理で解析し、
+1ページあたりの解析時間と、従来の処理（soup）と結果が一致するかを表示する。
+
+使い方:
+    python benchmarks/bench_extractors.py [HTMLファイルまたはディレクトリ ...] [--repeat N]
+
+ファイルを指定しない場合は benchmarks/fixtures/*.html を使う。それもない場合は
+案件カードと詳細テーブルの構造を再現したページを生成して計測する
+（クロール失敗時に保存される scrape_error_page.html なども指定できる）。
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extractors import available_extractors, get_extractor  # noqa: E402
+
+BASE_URL = "https://crowdworks.jp"
+FIXTURE_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# 生成するページのクラス名（サイトのマークアップと同じもの）
+JOB_CARD_CLASS = 'UNzN7'
+JOB_TITLE_CLASS = 'iCeus'
+JOB_BUDGET_CLASS = 'Yh37y'
+JOB_CLIENT_CLASS = 'uxHdW'
+DETAIL_TABLE_CLASS = 'job_offer_detail_table'
+
+
+def synthetic_list_page(cards: int = 50) -> str:
+    """検索結果ページに近い構造のHTML（周辺の要素を含む）"""
+    filler = ''.join(f'<div class="nav"><ul>{"<li><a href=#>メニュー</a></li>" * 20}</ul></div>'
+                     for _ in range(30))
+    items = ''.join(
+        f'<li><div class="{JOB_CARD_CLASS} card"><h3 class="{JOB_TITLE_CLASS}"><a href="/public/jobs/{10000 + i}">'
+        f' 案件タイトル {i} </a></h3><div class="meta"><span class="{JOB_BUDGET_CLASS}">{i},000円 〜 {i * 2},000円</span>'
+        f'<a class="{JOB_CLIENT_CLASS}" href="/public/employers/{i}">クライアント{i}</a>'
+        f'<time datetime="2026-10-{i % 28 + 1:02d}T10:00:00+09:00">{i}日前</time></div>'
+        f'<p>{"案件の説明文。" * 30}</p></div></li>'
+        for i in range(cards)
+    )
+    return (f'<html><head><title>検索結果</title><script>{"var x = 1;" * 500}</script></head>'
+            f'<body>{filler}<div id="vue-container"><ul>{items}</ul></div>{filler}</body></html>')
+
+
+def synthetic_detail_page(rows: int = 15) -> str:
+    """詳細ページに近い構造のHTML"""
+    filler = ''.join(f'<section><p>{"関連する案件。" * 40}</p></section>' for _ in range(40))
+    table = ''.join(f'<tr><th>項目{i}</th><td>\n  値{i}<br>{"詳細な説明。" * 10}\n</td></tr>' for i in range(rows))
+    return (f'<html><head><title>詳細</title></head><body>{filler}'
+            f'<table class="{DETAIL_TABLE_CLASS}"><tbody>{table}</tbody></table>{filler}</body></html>')
+
+
+def load_pages(paths):
+    """ベンチマークに使うページ（名前, HTML）のリスト"""
+    files = []
+    for path in paths or ([FIXTURE_DIR] if FIXTURE_DIR.is_dir() else []):
+        path = Path(path)
+        files.extend(sorted(path.glob('**/*.html')) if path.is_dir() else [path])
+    if files:
+        return [(str(f), f.read_text(encoding='utf-8', errors='replace')) for f in files]
+    return [('synthetic_list.html', synthetic_list_page()), ('synthetic_detail.html', synthetic_detail_page())]
+
+
+def _strip_timestamps(result):
+    if isinstance(result, (list, tuple)):
+        return [_strip_timestamps(item) for item in result]
+    if isinstance(result, dict):
+        return {key: value for key, value in result.items() if key not in ('crawled_at', 'crawled_detail_at')}
+    return result
+
+
+def _extract(extractor, html: str):
+    """ページの種類に応じた抽出を行う"""
+    if DETAIL_TABLE_CLASS in html:
+        return extractor.job_detail(html)
+    return extractor.job_cards(html, BASE_URL), extractor.embedded_data(html)
+
+
+def _time_ms(func, repeat: int) -> float:
+    func()  # 初回の呼び出し（インポートやキャッシュの影響）は計測しない
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML抽出処理のマイクロベンチマーク')
+    parser.add_argument('paths', nargs='*', help='HTMLファイルまたはディレクトリ')
+    parser.add_argument('--repeat', type=int, default=20, help='1ページあたりの解析回数')
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths)
+    names = available_extractors()
+    print(f"抽出処理: {', '.join(names)}（自動選択: {get_extractor().name}）")
+    print(f"{'ページ':<40} {'サイズ':>8}  " + '  '.join(f'{name:>12}' for name in names))
+
+    totals = dict.fromkeys(names, 0.0)
+    mismatches = []
+    for page_name, html in pages:
+        expected = _strip_timestamps(_extract(get_extractor('soup'), html))
+        cells = []
+        for name in names:
+            extractor = get_extractor(name)
+            if _strip_timestamps(_extract(extractor, html)) != expected:
+                mismatches.append((page_name, name))
+            elapsed = _time_ms(lambda: _extract(extractor, html), args.repeat)
+            totals[name] += elapsed
+            cells.append(f'{elapsed:>10.2f}ms')
+        print(f"{os.path.basename(page_name):<40} {len(html) // 1024:>6}KB  " + '  '.join(cells))
+
+    print(f"{'合計':<40} {'':>8}  " + '  '.join(f'{totals[name]:>10.2f}ms' for name in names))
+    baseline = totals['soup']
+    print(f"{'soup 比':<40} {'':>8}  " + '  '.join(
+        f'{baseline / totals[name] if totals[name] else 0:>11.1f}x' for name in names))
+    for page_name, name in mismatches:
+        print(f"結果が soup と一致しません: {page_name} [{name}]")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+保存したページによるセレクタの確認と解析時間の計測
+
+保存したHTML（検索結果ページ・詳細ページ・応募フォームなど）をオフラインで抽出処理に通し、
+ページごとに各セレクタがどの候補で一致したか（先頭の候補以外で一致した場合は代替）と、
+抽出した件数・1ページあたりの解析時間を表示する。必須のセレクタが一致しないページが
+ある場合は終了コード1を返すため、サイト変更の回帰確認に使える。
+
+使い方:
+    python benchmarks/replay_fixtures.py [HTMLファイルまたはディレクトリ ...]
+        [--page list|detail|apply|login] [--extractor NAME] [--repeat N]
+
+ファイルを指定しない場合は benchmarks/fixtures/*.html（匿名化した実際のページ）と、
+カレントディレクトリの *error_page.html（クロール失敗時に保存されるページ）を使う。
+確認するページがない場合（fixtures がない場合を含む）は、生成したページでは代替せずに
+終了コード1を返す。
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_extractors import load_pages, FIXTURE_DIR, BASE_URL  # noqa: E402
+from crowdworks_selectors import check_page, detect_page, reset_selectors, LIST_PAGE, DETAIL_PAGE  # noqa: E402
+from extractors import get_extractor  # noqa: E402
+from http_scraper import parse_embedded_jobs  # noqa: E402
+
+
+def default_paths():
+    """
+    ファイルを指定しない場合に確認するページ
+
+    Raises:
+        FileNotFoundError: benchmarks/fixtures にページがない場合
+    """
+    fixtures = sorted(FIXTURE_DIR.glob('**/*.html')) if FIXTURE_DIR.is_dir() else []
+    if not fixtures:
+        raise FileNotFoundError(f"確認するページがありません: {FIXTURE_DIR}")
+    return fixtures + sorted(Path.cwd().glob('*error_page.html'))
+
+
+def html_files(paths) -> list:
+    """指定したファイル・ディレクトリ内のHTMLファイル"""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob('**/*.html')) if path.is_dir() else [path])
+    return files
+
+
+def extract(extractor, html: str, page: str) -> str:
+    """ページの種類に応じた抽出を行い、結果の概要を返す"""
+    if page == LIST_PAGE:
+        embedded = parse_embedded_jobs(html, BASE_URL, extractor)
+        cards = extractor.job_cards(html, BASE_URL)
+        return f"案件カード {len(cards)}件, 埋め込みデータ {len(embedded) if embedded is not None else '-'}件"
+    if page == DETAIL_PAGE:
+        detail = extractor.job_detail(html)
+        return f"詳細 {len(detail.get('detail_description', ''))}文字"
+    return '-'
+
+
+def replay(name: str, html: str, page: str, extractor, repeat: int) -> bool:
+    """1ページ分の確認結果を表示し、必須のセレクタが全て一致したかを返す"""
+    reset_selectors()
+    page = page or detect_page(html) or LIST_PAGE
+    results = check_page(html, page)
+
+    reset_selectors()
+    summary = extract(extractor, html, page)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        extract(extractor, html, page)
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+
+    print(f"{os.path.basename(name)} [{page}] {len(html) // 1024}KB: {summary}, "
+          f"解析 {elapsed:.2f}ms（{extractor.name}）")
+    ok = True
+    for result in results:
+        if result['matched'] is None:
+            status = 'NG  ' if result['required'] else '--  '
+            ok = ok and not result['required']
+            print(f"  {status}{result['name']:<18} 見つかりません（{result['description']}）")
+        else:
+            status = 'OK  ' if result['matched'] == 0 else '代替'
+            print(f"  {status}{result['name']:<18} {result['candidate']}（{result['count']}件）")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='保存したページによるセレクタの確認と解析時間の計測')
+    parser.add_argument('paths', nargs='*', help='HTMLファイルまたはディレクトリ')
+    parser.add_argument('--page', choices=['list', 'detail', 'apply', 'login'],
+                        help='ページの種類（省略時は自動判定）')
+    parser.add_argument('--extractor', default='auto', help='抽出処理（soup / strainer / lxml / selectolax）')
+    parser.add_argument('--repeat', type=int, default=5, help='解析時間の計測回数')
+    args = parser.parse_args()
+
+    extractor = get_extractor(args.extractor)
+    try:
+        files = html_files(args.paths) if args.paths else default_paths()
+    except FileNotFoundError as e:
+        print(str(e))
+        return 1
+    if not files:
+        print(f"確認するページがありません: {' '.join(args.paths)}")
+        return 1
+    pages = load_pages(files)
+    failed = [name for name, html in pages if not replay(name, html, args.page, extractor, args.repeat)]
+    print(f"{len(pages)}ページ中 {len(pages) - len(failed)}ページで必須の要素を確認しました")
+    for name in failed:
+        print(f"必須の要素が見つかりません: {name}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
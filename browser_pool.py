@@ -0,0 +1,278 @@
+"""
+ブラウザ（ChromeDriver）のプール
+
+起動済みのブラウザを貸し出し・返却して使い回す。ブラウザごとに
+永続的なプロファイル（--user-data-dir）を割り当てるため、プロセスを再起動しても
+ログイン状態の Cookie が残り、ログイン処理を省略できる。
+
+貸し出し時に応答を確認し、応答がない・読み込んだページ数が上限を超えた・
+メモリ使用量が上限を超えたブラウザは作り直す。プロセス終了時に全て終了する。
+ただし keep_user_tabs を指定したプール（一括応募の入力済みフォームを利用者が確認するブラウザ）では、
+複数のタブが開いているブラウザは作り直さず、終了時も閉じずに残す。
+crawler.py（クローラーのプロセス内）と bulk_apply.py（アプリのプロセス内）で利用する。
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty, Queue
+from typing import Callable, Dict, List, Optional
+
+import psutil
+from loguru import logger
+
+# プールのブラウザ数のデフォルト値
+DEFAULT_SIZE = 1
+# 作り直すまでに読み込むページ数の上限
+DEFAULT_MAX_PAGES = 300
+# 作り直すメモリ使用量（ブラウザの子プロセスを含むRSS、MB）
+DEFAULT_MAX_RSS_MB = 1500
+# 貸し出しを待つ時間の上限（秒）
+DEFAULT_ACQUIRE_TIMEOUT = 300
+
+
+class BrowserPoolTimeout(Exception):
+    """空いているブラウザがなく、貸し出しを待つ時間の上限を超えたことを示す例外"""
+    pass
+
+
+class PooledBrowser:
+    """プールのブラウザ"""
+
+    def __init__(self, slot: int, driver, profile_dir: str, new_profile: bool):
+        self.slot = slot
+        self.driver = driver
+        self.profile_dir = profile_dir
+        # プロファイルを新規作成した場合はログイン済みの Cookie がない
+        self.new_profile = new_profile
+        self.logged_in = False
+        # 利用者のタブとは別に、プールの利用側が操作するタブ（未作成の場合は None）
+        self.home_handle: Optional[str] = None
+        self.pages = 0
+        self.created_at = time.time()
+
+    def get(self, url: str):
+        """ページを開き、読み込んだページ数を数える"""
+        self.pages += 1
+        self.driver.get(url)
+
+    def has_user_tabs(self) -> bool:
+        """操作用のタブ以外のタブ（入力済みの応募フォームなど）が開いているか"""
+        try:
+            handles = self.driver.window_handles
+            if self.home_handle is None:
+                return len(handles) > 1
+            return any(handle != self.home_handle for handle in handles)
+        except Exception:
+            return False
+
+    def rss_mb(self) -> Optional[float]:
+        """ChromeDriver と Chrome の子プロセスを合わせたメモリ使用量（MB）"""
+        try:
+            process = psutil.Process(self.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
+
+
+class BrowserPool:
+    """ブラウザの貸し出し・返却を管理するプール"""
+
+    def __init__(self, name: str, factory: Callable[[str], object], profile_root,
+                 size: int = DEFAULT_SIZE, max_pages: Optional[int] = DEFAULT_MAX_PAGES,
+                 max_rss_mb: Optional[float] = DEFAULT_MAX_RSS_MB, keep_user_tabs: bool = False):
+        """
+        Args:
+            name: プール名（プロファイルのディレクトリ名に使う）
+            factory: プロファイルのディレクトリを受け取ってドライバーを作成する関数
+            profile_root: プロファイルを保存するディレクトリ
+            size: ブラウザ数の上限
+            max_pages: 作り直すまでに読み込むページ数の上限（None の場合は無制限）
+            max_rss_mb: 作り直すメモリ使用量（None の場合は確認しない）
+            keep_user_tabs: 複数のタブが開いているブラウザを作り直さず、終了時も閉じない
+                （利用者が確認・送信する前のタブを失わないようにする）
+        """
+        self.name = name
+        self.factory = factory
+        self.profile_root = Path(profile_root)
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.keep_user_tabs = keep_user_tabs
+        self._browsers: Dict[int, PooledBrowser] = {}
+        self._free: Queue = Queue()
+        for slot in range(self.size):
+            self._free.put(slot)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _profile_dir(self, slot: int) -> str:
+        return str(self.profile_root / f'{self.name}_{slot}')
+
+    def _create(self, slot: int) -> PooledBrowser:
+        profile_dir = self._profile_dir(slot)
+        new_profile = not os.path.exists(profile_dir)
+        os.makedirs(profile_dir, exist_ok=True)
+        started = time.monotonic()
+        driver = self.factory(profile_dir)
+        logger.info(f"ブラウザを起動しました [{self.name}_{slot}]: {time.monotonic() - started:.2f}秒")
+        return PooledBrowser(slot, driver, profile_dir, new_profile)
+
+    def _is_healthy(self, browser: PooledBrowser) -> bool:
+        """ブラウザが応答するかを確認（利用者がウィンドウを閉じた場合は残りのウィンドウに切り替える）"""
+        try:
+            handles = browser.driver.window_handles
+            if not handles:
+                return False
+            try:
+                browser.driver.current_window_handle
+            except Exception:
+                browser.driver.switch_to.window(handles[0])
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, browser: PooledBrowser) -> Optional[str]:
+        """作り直しが必要な場合はその理由を返す"""
+        if not self._is_healthy(browser):
+            return '応答なし'
+        if self._keeps(browser):
+            return None
+        if self.max_pages and browser.pages >= self.max_pages:
+            return f'ページ数の上限（{browser.pages}ページ）'
+        if self.max_rss_mb:
+            rss = browser.rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                return f'メモリ使用量の上限（{rss:.0f}MB）'
+        return None
+
+    def _keeps(self, browser: PooledBrowser) -> bool:
+        """利用者のタブを残すため、終了・作り直しをしないブラウザか"""
+        if self.keep_user_tabs and browser.has_user_tabs():
+            logger.info(f"開いているタブがあるためブラウザを終了しません [{self.name}_{browser.slot}]")
+            return True
+        return False
+
+    def _quit(self, browser: PooledBrowser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.warning(f"ブラウザの終了に失敗 [{self.name}_{browser.slot}]: {str(e)}")
+
+    def acquire(self, timeout: float = DEFAULT_ACQUIRE_TIMEOUT) -> PooledBrowser:
+        """
+        ブラウザを借りる（起動済みのブラウザがあれば再利用する）
+
+        Raises:
+            BrowserPoolTimeout: timeout 秒以内に空きができなかった場合
+        """
+        try:
+            slot = self._free.get(timeout=timeout)
+        except Empty:
+            raise BrowserPoolTimeout(f"ブラウザの空きがありません [{self.name}]")
+
+        try:
+            with self._lock:
+                browser = self._browsers.get(slot)
+            if browser is not None:
+                reason = self._needs_recycle(browser)
+                if reason is None:
+                    logger.info(f"起動済みのブラウザを再利用します [{self.name}_{slot}]")
+                    return browser
+                logger.info(f"ブラウザを作り直します [{self.name}_{slot}]: {reason}")
+                self._quit(browser)
+            browser = self._create(slot)
+            with self._lock:
+                self._browsers[slot] = browser
+            return browser
+        except Exception:
+            with self._lock:
+                self._browsers.pop(slot, None)
+            self._free.put(slot)
+            raise
+
+    def release(self, browser: PooledBrowser, discard: bool = False):
+        """
+        ブラウザを返却する
+
+        Args:
+            discard: True の場合はブラウザを終了する（異常が起きた場合など）
+        """
+        if (discard or self._closed) and not self._keeps(browser):
+            self._quit(browser)
+            with self._lock:
+                self._browsers.pop(browser.slot, None)
+        self._free.put(browser.slot)
+
+    @contextmanager
+    def lease(self, timeout: float = DEFAULT_ACQUIRE_TIMEOUT):
+        """with文でブラウザを借りる（例外が発生した場合はブラウザを終了する）"""
+        browser = self.acquire(timeout)
+        try:
+            yield browser
+        except Exception:
+            self.release(browser, discard=True)
+            raise
+        self.release(browser)
+
+    def stats(self) -> List[Dict]:
+        """起動済みのブラウザの状態"""
+        with self._lock:
+            browsers = list(self._browsers.values())
+        return [{
+            'slot': browser.slot,
+            'pages': browser.pages,
+            'logged_in': browser.logged_in,
+            'uptime': round(time.time() - browser.created_at, 1),
+            'rss_mb': browser.rss_mb()
+        } for browser in browsers]
+
+    def close(self):
+        """全てのブラウザを終了する（keep_user_tabs の場合、タブが開いているブラウザは残す）"""
+        with self._lock:
+            self._closed = True
+            browsers = list(self._browsers.values())
+            self._browsers.clear()
+        browsers = [browser for browser in browsers if not self._keeps(browser)]
+        for browser in browsers:
+            self._quit(browser)
+        if browsers:
+            logger.info(f"ブラウザプールを終了しました [{self.name}]: {len(browsers)}台")
+
+
+def pool_options(settings: Dict) -> Dict:
+    """設定（settings.json の browser_pool）からプールのオプションを取得"""
+    options = settings.get('browser_pool') or {}
+    return {
+        'size': int(options.get('size', DEFAULT_SIZE)),
+        'max_pages': options.get('max_pages', DEFAULT_MAX_PAGES),
+        'max_rss_mb': options.get('max_rss_mb', DEFAULT_MAX_RSS_MB)
+    }
+
+
+_pools: Dict[str, BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(name: str, factory: Callable[[str], object], profile_root, **options) -> BrowserPool:
+    """名前ごとのブラウザプールを取得する（初回の呼び出し時に作成）"""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = BrowserPool(name, factory, profile_root, **options)
+            _pools[name] = pool
+        return pool
+
+
+def close_all():
+    """全てのプールのブラウザを終了する"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all)
@@ -13,12 +13,15 @@ from loguru import logger
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from openai import OpenAI
 from fix_settings_patch import get_app_paths
+from llm_gateway import get_client
+from browser_pool import get_browser_pool, pool_options
+from lean_chrome import lean_options, apply_lean_options, enable_resource_blocking, window_size, APPLY
+from selenium_waits import (wait_for_element, wait_for_any_element, wait_for_url_change, wait_for_network_idle,
+                            politeness_pause, wait_stats)
+from crowdworks_selectors import find_element, get_selector
+import config_cache
 
 # アプリケーションパスを取得
 app_paths = get_app_paths()
@@ -87,16 +90,28 @@ current_progress = {
 def load_settings():
     """設定ファイルを読み込む"""
     try:
-        with open('crawled_data/settings.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        settings = config_cache.load_json('crawled_data/settings.json')
+        if settings is None:
+            raise FileNotFoundError('crawled_data/settings.json')
+        return settings
     except Exception as e:
         logger.error(f"設定ファイルの読み込みに失敗: {str(e)}")
         return {}
 
-def setup_driver():
-    """Seleniumドライバーの設定"""
+def setup_driver(profile_dir=None, lean=None):
+    """
+    Seleniumドライバーの設定
+    
+    Args:
+        profile_dir: 永続的なプロファイルのディレクトリ（ログイン状態を引き継ぐ）
+        lean: 軽量化のオプション（省略時は設定の lean_browser。利用者がフォームを確認するため、
+            デフォルトでは軽量化しない）
+    """
+    lean = lean if lean is not None else lean_options(load_settings(), APPLY)
     chrome_options = Options()
-    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument(f"--window-size={window_size(lean)}")
+    # 画像・フォントなどを読み込まない軽量な設定
+    apply_lean_options(chrome_options, lean)
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -106,6 +121,8 @@ def setup_driver():
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
     chrome_options.add_experimental_option("detach", True)  # スクリプト終了後もブラウザを開いたままにする
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
     
     try:
         # 環境変数からChromeDriverのパスを取得
@@ -154,6 +171,7 @@ def setup_driver():
                 window.chrome = { runtime: {} };
             """
         })
+        enable_resource_blocking(driver, lean)
         
         return driver
     except Exception as e:
@@ -165,20 +183,29 @@ def login_to_crowdworks(driver, email: str, password: str) -> bool:
     try:
         logger.info("ログイン処理を開始")
         driver.get("https://crowdworks.jp/login")
-        wait = WebDriverWait(driver, 20)
+        login_page_url = driver.current_url
+        
+        # プロファイルにログイン状態が残っている場合はログインページから移動する
+        if "/login" not in login_page_url:
+            logger.info("ログイン済みのセッションを再利用します")
+            return True
         
         # メールアドレスとパスワードを入力
-        email_input = wait.until(EC.presence_of_element_located((By.NAME, "username")))
-        password_input = wait.until(EC.presence_of_element_located((By.NAME, "password")))
-        submit_button = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "button[type='submit']")))
+        email_input, _ = wait_for_any_element(driver, get_selector('login_email').locators(), name='login_form')
+        password_input, _ = wait_for_any_element(driver, get_selector('login_password').locators(), name='login_form')
+        _, submit_locator = wait_for_any_element(driver, get_selector('login_submit').locators(), name='login_form')
+        submit_button = wait_for_element(driver, submit_locator, clickable=True, name='login_form')
         
         email_input.send_keys(email)
-        time.sleep(1)
         password_input.send_keys(password)
-        time.sleep(1)
         submit_button.click()
         
-        time.sleep(5)
+        # ログイン後のページへの遷移と読み込みの完了を待つ
+        try:
+            wait_for_url_change(driver, login_page_url, name='login_redirect')
+            wait_for_network_idle(driver, timeout=10)
+        except TimeoutException:
+            pass
         
         # ログイン成功の確認
         return "/login" not in driver.current_url
@@ -187,19 +214,42 @@ def login_to_crowdworks(driver, email: str, password: str) -> bool:
         logger.error(f"ログイン処理でエラー発生: {str(e)}")
         return False
 
+def switch_to_home_tab(browser):
+    """ログインの確認などに使う操作用のタブに切り替える（応募フォームのタブには触れない）"""
+    driver = browser.driver
+    if browser.home_handle is None:
+        browser.home_handle = driver.current_window_handle
+    elif browser.home_handle not in driver.window_handles:
+        # 利用者が操作用のタブを閉じた場合は新しいタブを作る
+        driver.switch_to.new_window('tab')
+        browser.home_handle = driver.current_window_handle
+    driver.switch_to.window(browser.home_handle)
+
+def ensure_logged_in(browser, email: str, password: str) -> bool:
+    """
+    ログイン状態を確認し、セッションが切れていればログインし直す
+
+    前回の一括応募でログインしていても、Cookie の有効期限が切れている場合があるため
+    毎回ログインページを開き、ログイン済みとして移動するかを確認する。
+    """
+    switch_to_home_tab(browser)
+    browser.logged_in = login_to_crowdworks(browser.driver, email, password)
+    return browser.logged_in
+
+def session_expired(driver) -> bool:
+    """現在のタブがログインページに移動したか（セッション切れ）"""
+    try:
+        return "/login" in driver.current_url
+    except Exception:
+        return False
+
 def generate_application_content(job_detail: str, self_intro: str) -> Dict[str, str]:
     """LLMを使用して応募内容を生成"""
     try:
         settings = load_settings()
         
-        # モデルに応じてクライアントを選択
-        if settings.get('model') == 'deepseek-chat':
-            client = OpenAI(
-                api_key=settings.get('deepseek_api_key', ''),
-                base_url="https://api.deepseek.com"
-            )
-        else:
-            client = OpenAI(api_key=settings.get('api_key'))
+        # モデルに応じてクライアントを選択（レート制限・再試行はゲートウェイが担当）
+        client = get_client(settings.get('model', 'gpt-4'), settings)
         
         prompt = f"""
 以下の案件に対する応募メッセージと契約金額を生成してください。
@@ -241,30 +291,19 @@ def apply_to_job(driver, url: str, self_intro: str):
     """個別の案件に応募"""
     try:
         logger.info(f"案件への応募を開始: {url}")
-        # 新しいタブで開いて、そのタブに切り替える
-        driver.execute_script(f"window.open('{url}', '_blank');")
-        driver.switch_to.window(driver.window_handles[-1])
-        wait = WebDriverWait(driver, 20)
-        
-        # 案件詳細を取得（複数の要素を試行）
-        detail_selectors = [
-            "job_offer_detail_table",  # クラス名
-            "detail_description",      # 可能性のある別のクラス名
-            "//table[contains(@class, 'detail')]",  # XPath
-            "//div[contains(@class, 'detail')]"     # 別のXPath
-        ]
+        # 新しいタブを開いて切り替え、そのタブでもリソースのブロックを有効にしてから開く
+        # （Network.setBlockedURLs はタブごとの設定のため）
+        driver.switch_to.new_window('tab')
+        enable_resource_blocking(driver, lean_options(load_settings(), APPLY))
+        driver.get(url)
         
+        # 案件詳細を取得（セレクタの候補を順に試行し、最初に見つかった要素を使う）
         job_detail = ""
-        for selector in detail_selectors:
-            try:
-                if selector.startswith("//"):
-                    element = wait.until(EC.presence_of_element_located((By.XPATH, selector)))
-                else:
-                    element = wait.until(EC.presence_of_element_located((By.CLASS_NAME, selector)))
-                job_detail = element.text
-                break
-            except:
-                continue
+        try:
+            element, _ = wait_for_any_element(driver, get_selector('job_detail').locators(), name='job_detail')
+            job_detail = element.text
+        except TimeoutException:
+            pass
         
         if not job_detail:
             logger.warning("案件詳細の取得に失敗しましたが、処理を継続します")
@@ -272,9 +311,7 @@ def apply_to_job(driver, url: str, self_intro: str):
         
         # 「作業を開始する」ボタンの確認
         try:
-            start_work_button = driver.find_element(
-                By.XPATH, '//*[@id="job_offer_detail"]/div/div[1]/div[1]/div/div/form/input[4]'
-            )
+            find_element(driver, 'work_start_button')
             logger.info("この案件は「作業を開始する」タイプです")
             return {
                 "status": "work_start",
@@ -285,46 +322,44 @@ def apply_to_job(driver, url: str, self_intro: str):
         
         # 応募ボタンをクリック
         try:
-            apply_button = wait.until(EC.element_to_be_clickable((
-                By.XPATH, '//*[@id="job_offer_detail"]/div/div[1]/div[2]/div/p/a'
-            )))
+            _, apply_locator = wait_for_any_element(driver, get_selector('apply_button').locators(),
+                                                    name='apply_button')
+            apply_button = wait_for_element(driver, apply_locator, clickable=True, name='apply_button')
             apply_button.click()
-            time.sleep(3)
         except TimeoutException:
             return {
                 "status": "error",
                 "message": "応募ボタンが見つかりませんでした"
             }
         
-        # 応募内容を生成
-        content = generate_application_content(job_detail, self_intro)
-        
-        # 契約金額を入力
+        # 応募フォームの入力フィールドを確認してから応募内容を生成する（見つからない場合はLLMを呼び出さない）
         try:
-            amount_input = wait.until(EC.presence_of_element_located((
-                By.XPATH, '//*[@id="amount_dummy_"]'
-            )))
-            amount_input.clear()
-            amount_input.send_keys(content["contract_amount"])
+            amount_input, _ = wait_for_any_element(driver, get_selector('amount_input').locators(), name='apply_form')
         except TimeoutException:
             return {
                 "status": "error",
                 "message": "契約金額の入力フィールドが見つかりませんでした"
             }
-        
-        # 応募メッセージを入力
         try:
-            message_input = wait.until(EC.presence_of_element_located((
-                By.XPATH, '//*[@id="proposal_conditions_attributes_0_message_attributes_body"]'
-            )))
-            message_input.clear()
-            message_input.send_keys(content["application_message"])
+            message_input, _ = wait_for_any_element(driver, get_selector('message_input').locators(),
+                                                    name='apply_form')
         except TimeoutException:
             return {
                 "status": "error",
                 "message": "応募メッセージの入力フィールドが見つかりませんでした"
             }
         
+        # 応募内容を生成
+        content = generate_application_content(job_detail, self_intro)
+        
+        # 契約金額を入力
+        amount_input.clear()
+        amount_input.send_keys(content["contract_amount"])
+        
+        # 応募メッセージを入力
+        message_input.clear()
+        message_input.send_keys(content["application_message"])
+        
         return {
             "status": "success",
             "message": "応募情報の入力が完了しました"
@@ -348,17 +383,21 @@ def bulk_apply_process(urls: List[str]):
             raise ValueError("認証情報が設定されていません")
         
         # 自己紹介文を読み込み
-        try:
-            with open(SELF_INTRO_FILE, 'r', encoding='utf-8') as f:
-                self_intro = f.read()
-        except FileNotFoundError:
+        self_intro = config_cache.load_text(SELF_INTRO_FILE, default=None)
+        if self_intro is None:
             raise ValueError(f"{SELF_INTRO_FILE}が見つかりません")
         
-        driver = setup_driver()
+        # 起動済みのブラウザを借りる（前回の一括応募のブラウザとログイン状態を再利用）
+        # 入力済みの応募フォームのタブが開いている間は、作り直し・終了をしない
+        pool = get_browser_pool('apply', setup_driver, data_dir / 'browser_profiles',
+                                keep_user_tabs=True, **pool_options(settings))
+        browser = pool.acquire()
+        driver = browser.driver
+        wait_stats.reset()
         
         try:
-            # ログイン
-            if not login_to_crowdworks(driver, email, password):
+            # ログイン（セッションが残っていればログイン処理は省略される）
+            if not ensure_logged_in(browser, email, password):
                 raise Exception("ログインに失敗しました")
             
             total = len(urls)
@@ -378,8 +417,12 @@ def bulk_apply_process(urls: List[str]):
                 "messages": []
             }
             
+            # 案件ごとの最小間隔（サイトへの負荷を抑える場合のみ設定）
+            min_interval = settings.get('politeness_delay', 0)
+            
             # 各案件に応募
             for i, url in enumerate(urls, 1):
+                started_at = time.monotonic()
                 current_progress.update({
                     "current": i,
                     "status": f"案件 {i}/{total} を処理中...",
@@ -387,6 +430,13 @@ def bulk_apply_process(urls: List[str]):
                 progress_queue.put(current_progress.copy())
                 
                 result = apply_to_job(driver, url, self_intro)
+                if result["status"] == "error" and session_expired(driver):
+                    # 処理中にセッションが切れた場合は、ログインし直して1回だけ再試行する
+                    logger.warning("セッションが切れたため、ログインし直します")
+                    driver.close()
+                    if not ensure_logged_in(browser, email, password):
+                        raise Exception("ログインに失敗しました")
+                    result = apply_to_job(driver, url, self_intro)
                 results[result["status"]] += 1
                 results["messages"].append(f"案件 {i}: {result['message']}")
                 
@@ -396,7 +446,7 @@ def bulk_apply_process(urls: List[str]):
                 })
                 progress_queue.put(current_progress.copy())
                 
-                time.sleep(2)
+                politeness_pause(started_at, min_interval)
             
             # 最終結果を生成
             summary = (
@@ -413,6 +463,7 @@ def bulk_apply_process(urls: List[str]):
                 "details": results["messages"]
             })
             progress_queue.put(current_progress.copy())
+            wait_stats.log_summary()
             
         except Exception as e:
             logger.error(f"一括応募処理でエラーが発生: {str(e)}")
@@ -422,6 +473,9 @@ def bulk_apply_process(urls: List[str]):
             })
             progress_queue.put(current_progress.copy())
             raise
+        finally:
+            # 応募フォームのタブは開いたまま返却し、次回の一括応募で再利用する
+            pool.release(browser)
             
     except Exception as e:
         logger.error(f"一括応募処理でエラーが発生: {str(e)}")
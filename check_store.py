@@ -0,0 +1,134 @@
+"""
+案件のチェック状態のメモリストア
+
+チェック状態はメモリ上の辞書で管理し、更新はロック内で適用する。
+変更は短い待ち時間の間にまとめ、バックグラウンドのスレッドが1回の
+トランザクションで案件データストア（job_store の checks テーブル）に書き込む。
+チェック状態を書き換えるのはアプリのプロセスのみのため、メモリ上の状態を正とする。
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+from job_store import get_job_store
+
+# 更新をまとめて書き込むまでの待ち時間（秒）
+DEFAULT_FLUSH_DELAY = 0.5
+
+
+class CheckStore:
+    """チェック状態をメモリに保持し、変更をまとめて書き込むストア"""
+
+    def __init__(self, job_store, flush_delay: float = DEFAULT_FLUSH_DELAY):
+        self.job_store = job_store
+        self.flush_delay = flush_delay
+        self._checks: Dict[str, Dict] = job_store.load_checks()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        # 書き込みを同時に1つに制限する
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def get_all(self) -> Dict[str, Dict]:
+        """全てのチェック状態を取得（呼び出し側で変更してよいコピー）"""
+        with self._lock:
+            return {url: dict(value) for url, value in self._checks.items()}
+
+    def set(self, url: str, checked: bool):
+        """1件のチェック状態を更新する"""
+        self.set_many({url: checked})
+
+    def set_many(self, updates: Dict[str, bool]) -> int:
+        """
+        複数の案件のチェック状態をまとめて更新する
+
+        Returns:
+            更新した件数
+        """
+        updated_at = datetime.now().isoformat()
+        count = 0
+        with self._lock:
+            for url, checked in updates.items():
+                if not url:
+                    continue
+                self._checks[url] = {'checked': bool(checked), 'updated_at': updated_at}
+                self._dirty.add(url)
+                count += 1
+            if count:
+                self._schedule_flush()
+        return count
+
+    def set_urls(self, urls: Iterable[str], checked: bool) -> int:
+        """複数のURLを同じチェック状態に更新する"""
+        return self.set_many({url: checked for url in urls})
+
+    def apply_update(self, data: Dict) -> int:
+        """
+        一括更新APIのリクエストを適用する
+
+        Args:
+            data: {"urls": [...], "checked": true} または {"checks": {"<url>": true, ...}}
+
+        Returns:
+            更新した件数
+
+        Raises:
+            ValueError: 更新する案件が指定されていない場合
+        """
+        if not isinstance(data, dict):
+            raise ValueError('リクエストの形式が不正です')
+        if isinstance(data.get('checks'), dict):
+            return self.set_many(data['checks'])
+        if isinstance(data.get('urls'), list):
+            return self.set_urls(data['urls'], bool(data.get('checked', True)))
+        raise ValueError('更新する案件が指定されていません')
+
+    def _schedule_flush(self):
+        """書き込みを予約する（予約済みの場合は既存の予約にまとめる）"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """未保存の変更をデータストアに書き込む"""
+        with self._flush_lock:
+            with self._lock:
+                self._timer = None
+                if not self._dirty:
+                    return
+                pending = {url: dict(self._checks[url]) for url in self._dirty}
+                self._dirty.clear()
+            try:
+                self.job_store.set_checks(pending)
+                logger.debug(f"チェック状態を保存しました: {len(pending)}件")
+            except Exception as e:
+                logger.error(f"チェック状態の保存に失敗: {str(e)}")
+                # 失敗した変更は次回の書き込みで再試行する
+                with self._lock:
+                    self._dirty.update(pending)
+                    self._schedule_flush()
+
+
+_instances: Dict[str, CheckStore] = {}
+_instances_lock = threading.Lock()
+
+
+def get_check_store(data_dir) -> CheckStore:
+    """データディレクトリのチェック状態ストアを取得する"""
+    with _instances_lock:
+        store = _instances.get(str(data_dir))
+        if store is None:
+            store = CheckStore(get_job_store(data_dir))
+            _instances[str(data_dir)] = store
+        return store
+
+
+def flush_all():
+    """全てのストアの未保存の変更を書き込む（終了時に呼び出す）"""
+    with _instances_lock:
+        stores = list(_instances.values())
+    for store in stores:
+        store.flush()
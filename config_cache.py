@@ -0,0 +1,97 @@
+"""
+設定ファイルのメモリキャッシュ
+
+settings.json / prompt.txt / SelfIntroduction.txt などの小さな設定ファイルを
+解析済みの状態でメモリに保持する。読み込みのたびに os.stat でサイズと更新日時を
+確認し、変わっていなければファイルを開かずにキャッシュを返す。
+書き込みは write_json / write_text を通すことでキャッシュを更新する。
+
+app.py / crawler.py / bulk_apply.py の load_settings から共通で利用する
+（別プロセスで書き換えられた場合も更新日時の変化で検知できる）。
+"""
+import copy
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+# パス → ((サイズ, 更新日時), 解析済みの値)
+_entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_lock = threading.Lock()
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load(path, parser: Callable[[str], Any], default):
+    path = os.path.abspath(str(path))
+    signature = _signature(path)
+    if signature is None:
+        with _lock:
+            _entries.pop(path, None)
+        return copy.deepcopy(default)
+
+    with _lock:
+        entry = _entries.get(path)
+        if entry is not None and entry[0] == signature:
+            # 呼び出し側で変更されてもキャッシュに影響しないようにコピーを返す
+            return copy.deepcopy(entry[1])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        value = parser(f.read())
+    with _lock:
+        _entries[path] = (signature, value)
+    return copy.deepcopy(value)
+
+
+def load_json(path, default=None):
+    """
+    JSONファイルを読み込む（変更がなければキャッシュを返す）
+
+    ファイルが存在しない場合は default を返す。解析に失敗した場合は例外を送出する。
+    """
+    return _load(path, json.loads, default)
+
+
+def load_text(path, default: str = '') -> str:
+    """テキストファイルを読み込む（変更がなければキャッシュを返す）"""
+    return _load(path, lambda text: text, default)
+
+
+def write_json(path, data):
+    """JSONファイルを書き込み、キャッシュを更新する"""
+    _write(path, json.dumps(data, ensure_ascii=False, indent=2), data)
+
+
+def write_text(path, text: str):
+    """テキストファイルを書き込み、キャッシュを更新する"""
+    _write(path, text, text)
+
+
+def _write(path, content: str, value):
+    path = os.path.abspath(str(path))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    signature = _signature(path)
+    with _lock:
+        if signature is None:
+            _entries.pop(path, None)
+        else:
+            _entries[path] = (signature, copy.deepcopy(value))
+
+
+def invalidate(path=None):
+    """キャッシュを破棄する（path を省略した場合は全て）"""
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            _entries.pop(os.path.abspath(str(path)), None)
+    logger.debug(f"設定キャッシュを破棄しました: {path or 'すべて'}")
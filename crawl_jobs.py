@@ -0,0 +1,297 @@
+"""
+クローラーのバックグラウンド実行管理
+
+crawler.py をサブプロセスとして起動し、ジョブIDで状態を管理する。
+標準出力・標準エラー出力は1行ずつ読み取り、件数上限つきのリングバッファと
+ログに書き出す（全出力をメモリに溜めない）。進捗は購読者（SSE）に配信する。
+同じデータディレクトリで同時に実行できるクロールは1つのみで、
+実行中に開始した場合は待ち行列に追加する。
+
+取り消し時はクローラーに停止要求（SIGTERM、Windows では CTRL_BREAK）を送る。クローラーは
+install_stop_handler で SystemExit に変換し、finally と atexit の終了処理（ブラウザプールの
+ブラウザの終了など）を実行してから終了する。
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from queue import Queue
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from crawl_progress import finalize as finalize_progress, get_progress_file
+
+# 保持する出力の行数
+DEFAULT_OUTPUT_LINES = 500
+# 保持する終了済みジョブの数
+MAX_FINISHED_JOBS = 20
+
+# 終了状態
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+# 停止要求を送ってから強制終了するまでの時間（秒）。ブラウザの終了を待つ
+STOP_TIMEOUT = 20
+
+
+def install_stop_handler():
+    """
+    停止要求を SystemExit に変換するシグナルハンドラを登録する（クローラーのプロセスで呼び出す）
+
+    シグナルで即座に終了すると finally や atexit が実行されず、ChromeDriver と Chrome が残って
+    永続プロファイルがロックされたままになるため、例外として終了処理を実行させる。
+    """
+    def handle(signum, frame):
+        logger.info(f"停止要求を受け取りました（シグナル {signum}）。終了処理を行います")
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handle)
+    if hasattr(signal, 'SIGBREAK'):
+        signal.signal(signal.SIGBREAK, handle)
+
+
+def _request_stop(process: subprocess.Popen):
+    """クローラーに停止要求を送る（Windows の terminate は即座に終了させるため CTRL_BREAK を送る）"""
+    if os.name == 'nt':
+        process.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        process.terminate()
+
+
+class CrawlJob:
+    """1回のクロール実行"""
+
+    def __init__(self, command: List[str], output_lines: int = DEFAULT_OUTPUT_LINES):
+        self.job_id = uuid.uuid4().hex
+        self.command = command
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+        self.output = deque(maxlen=output_lines)
+        self.process: Optional[subprocess.Popen] = None
+        self.cancel_requested = False
+        self.done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self, output_tail: int = 20) -> Dict:
+        """状態をJSONで返せる形式に変換"""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'returncode': self.returncode,
+            'error': self.error,
+            'output': list(self.output)[-output_tail:] if output_tail else [],
+            'completed': self.finished
+        }
+
+
+class CrawlJobManager:
+    """データディレクトリごとのクロールジョブ管理"""
+
+    def __init__(self, data_dir, output_lines: int = DEFAULT_OUTPUT_LINES):
+        self.data_dir = str(data_dir)
+        self.progress_file = get_progress_file(os.path.join(self.data_dir, 'logs'))
+        self.output_lines = output_lines
+        self._jobs: Dict[str, CrawlJob] = {}
+        self._queue: deque = deque()
+        self._current: Optional[CrawlJob] = None
+        self._subscribers: Dict[str, List[Queue]] = {}
+        self._lock = threading.Lock()
+
+    # --- 開始・取消 ---
+
+    def start(self, command: List[str], queue_if_busy: bool = True) -> Optional[CrawlJob]:
+        """
+        クロールを開始する
+
+        Args:
+            command: 実行するコマンド（例: [sys.executable, 'crawler.py']）
+            queue_if_busy: 実行中のクロールがある場合に待ち行列に追加するか
+
+        Returns:
+            作成したジョブ。実行中で queue_if_busy が False の場合は None
+        """
+        with self._lock:
+            if self._current is not None and not queue_if_busy:
+                return None
+            job = CrawlJob(command, self.output_lines)
+            self._jobs[job.job_id] = job
+            self._prune_finished()
+            if self._current is None:
+                self._launch(job)
+            else:
+                self._queue.append(job)
+                logger.info(f"クロールジョブを待ち行列に追加しました: {job.job_id}（待ち: {len(self._queue)}件）")
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """待ち行列のジョブを取り消す、または実行中のクローラーを停止する"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.cancel_requested = True
+            if job in self._queue:
+                self._queue.remove(job)
+                self._finish(job, 'cancelled')
+                return True
+            process = job.process
+        if process is not None and process.poll() is None:
+            logger.info(f"クローラーを停止します: {job_id}")
+            _request_stop(process)
+            try:
+                process.wait(timeout=STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"クローラーが終了しないため強制終了します: {job_id}")
+                process.kill()
+        return True
+
+    def _launch(self, job: CrawlJob):
+        """ジョブを実行中にしてスレッドを起動する（ロック内で呼び出す）"""
+        self._current = job
+        job.status = 'running'
+        job.started_at = time.time()
+        self._publish(job, {'type': 'status', **job.to_dict(output_tail=0)})
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job: CrawlJob):
+        env = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+        try:
+            if job.cancel_requested:
+                raise InterruptedError("起動前に取り消されました")
+            logger.info(f"クローラーを実行: {' '.join(job.command)}（ジョブ: {job.job_id}）")
+            job.process = subprocess.Popen(
+                job.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                env=env,
+                # Windows で停止要求（CTRL_BREAK）をクローラーだけに送れるようにする
+                creationflags=getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+            )
+            if job.cancel_requested:
+                # 起動中に取り消された場合（cancel からはまだプロセスが見えていない）
+                _request_stop(job.process)
+            for line in job.process.stdout:
+                line = line.rstrip('\n')
+                if not line:
+                    continue
+                job.output.append(line)
+                logger.info(f"[crawler] {line}")
+                with self._lock:
+                    self._publish(job, {'type': 'output', 'job_id': job.job_id, 'line': line})
+            job.returncode = job.process.wait()
+
+            if job.cancel_requested:
+                status = 'cancelled'
+            elif job.returncode == 0:
+                status = 'completed'
+            else:
+                status = 'failed'
+                job.error = '\n'.join(list(job.output)[-10:]) or f"終了コード {job.returncode}"
+                logger.error(f"クローラーの実行に失敗: 戻り値={job.returncode}")
+        except InterruptedError:
+            status = 'cancelled'
+        except Exception as e:
+            logger.error(f"クローラーの起動に失敗: {str(e)}")
+            job.error = str(e)
+            status = 'failed'
+
+        # 取り消しや強制終了でクローラーが終了を記録しなかった場合は、ここで記録する
+        if job.process is not None and finalize_progress(self.progress_file, status, job.error):
+            logger.info(f"クローラーが記録しなかった終了を進捗ファイルに記録しました: {status}")
+
+        with self._lock:
+            self._finish(job, status)
+            self._current = None
+            # 待ち行列の次のジョブを開始
+            if self._queue:
+                self._launch(self._queue.popleft())
+
+    def _finish(self, job: CrawlJob, status: str):
+        """ジョブを終了状態にして購読者に通知する（ロック内で呼び出す）"""
+        job.status = status
+        job.finished_at = time.time()
+        job.done.set()
+        self._publish(job, {'type': 'status', **job.to_dict()})
+        logger.info(f"クロールジョブ {job.job_id} が終了しました: {status}")
+
+    def _prune_finished(self):
+        """古い終了済みジョブを破棄する（ロック内で呼び出す）"""
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda j: j.created_at)[:-MAX_FINISHED_JOBS]:
+            del self._jobs[job.job_id]
+            self._subscribers.pop(job.job_id, None)
+
+    # --- 参照・購読 ---
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def current(self) -> Optional[CrawlJob]:
+        """実行中のジョブ"""
+        with self._lock:
+            return self._current
+
+    def queued(self) -> List[str]:
+        """待ち行列のジョブID"""
+        with self._lock:
+            return [job.job_id for job in self._queue]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[CrawlJob]:
+        """ジョブの終了を待つ"""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def _publish(self, job: CrawlJob, event: Dict):
+        for queue in self._subscribers.get(job.job_id, []):
+            queue.put(event)
+
+    def subscribe(self, job_id: str) -> Optional[Queue]:
+        """進捗イベントを受け取るキューを登録する（最初に現在の状態が入る）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            queue = Queue()
+            queue.put({'type': 'status', **job.to_dict()})
+            self._subscribers.setdefault(job_id, []).append(queue)
+            return queue
+
+    def unsubscribe(self, job_id: str, queue: Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+
+
+_instances: Dict[str, CrawlJobManager] = {}
+_instances_lock = threading.Lock()
+
+
+def get_crawl_manager(data_dir) -> CrawlJobManager:
+    """データディレクトリのクロールジョブ管理を取得する"""
+    with _instances_lock:
+        manager = _instances.get(str(data_dir))
+        if manager is None:
+            manager = CrawlJobManager(data_dir)
+            _instances[str(data_dir)] = manager
+        return manager
@@ -0,0 +1,238 @@
+"""
+クローラーの進捗通知
+
+クローラーは処理の段階（phase）や件数を JSON Lines 形式の進捗ファイルに追記する。
+各行はその時点の進捗全体のスナップショットのため、読み込み側は
+ファイルの末尾だけを読めば最新の状態が得られる（ログの全行を読む必要がない）。
+SSE での配信用に、前回読み込んだ位置以降の行だけを読む follow も提供する。
+クローラーが終了を記録せずに終わった場合（取り消し・強制終了）は、
+アプリ側が finalize で終了の行を追記する。
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# 進捗ファイル名（ログディレクトリに作成）
+PROGRESS_FILENAME = 'crawl_progress.jsonl'
+
+# 段階ごとの表示メッセージ
+PHASE_MESSAGES = {
+    'starting': 'クローラーを起動中...',
+    'login': 'ログイン中...',
+    'scraping': '案件情報を取得中...',
+    'dedup': '新規案件を確認中...',
+    'ranking': '案件を事前ランキング中...',
+    'filtering': 'LLMによるフィルタリング中...',
+    'details': '案件の詳細情報を取得中...',
+    'saving': 'データを保存中...',
+    'completed': '完了しました',
+    'failed': 'エラーが発生しました',
+    'cancelled': '取り消されました'
+}
+
+# 終了を示す段階
+FINAL_PHASES = ('completed', 'failed', 'cancelled')
+
+# 末尾から読み込む際のブロックサイズ
+_TAIL_BLOCK_SIZE = 4096
+
+
+def get_progress_file(log_dir) -> str:
+    return os.path.join(str(log_dir), PROGRESS_FILENAME)
+
+
+class ProgressWriter:
+    """進捗のスナップショットを進捗ファイルに追記する"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._state: Dict = {}
+        self._phase_started_at = 0.0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """進捗ファイルを作り直して記録を開始する"""
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'w', encoding='utf-8')
+            now = time.time()
+            self._state = {
+                'phase': 'starting',
+                'started_at': now,
+                'page': 0,
+                'jobs_scraped': 0,
+                'jobs_new': 0,
+                'jobs_to_filter': 0,
+                'jobs_evaluated': 0,
+                'jobs_filtered': 0,
+                'details_total': 0,
+                'details_fetched': 0,
+                'eta_seconds': None,
+                'error': None
+            }
+            self._phase_started_at = now
+            self._write()
+
+    def update(self, phase: Optional[str] = None, **fields):
+        """
+        進捗を更新して1行追記する
+
+        Args:
+            phase: 新しい段階（省略時は現在の段階のまま）
+            fields: 更新する項目（page, jobs_scraped, details_fetched など）
+        """
+        with self._lock:
+            self._update(phase, fields)
+
+    def increment(self, field: str, count: int = 1):
+        """件数の項目を加算する（並列処理のスレッドから呼び出してよい）"""
+        with self._lock:
+            self._update(None, {field: self._state.get(field, 0) + count})
+
+    def _update(self, phase: Optional[str], fields: Dict):
+        """進捗を更新して書き込む（ロック内で呼び出す）"""
+        if self._file is None:
+            return
+        now = time.time()
+        if phase and phase != self._state.get('phase'):
+            self._state['phase'] = phase
+            self._phase_started_at = now
+        self._state.update(fields)
+        self._state['eta_seconds'] = self._estimate_remaining(now)
+        self._write()
+
+    def finish(self, error: Optional[str] = None):
+        """完了（または失敗）を記録してファイルを閉じる"""
+        self.update('failed' if error else 'completed', error=error)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _estimate_remaining(self, now: float) -> Optional[float]:
+        """件数が分かっている段階の残り時間を、現在の段階の処理速度から推定する"""
+        phase = self._state['phase']
+        if phase == 'filtering':
+            done, total = self._state['jobs_evaluated'], self._state['jobs_to_filter']
+        elif phase == 'details':
+            done, total = self._state['details_fetched'], self._state['details_total']
+        else:
+            return None
+        if done <= 0 or total <= done:
+            return 0 if total and total <= done else None
+        elapsed = now - self._phase_started_at
+        return round(elapsed / done * (total - done), 1)
+
+    def _write(self):
+        event = {
+            **self._state,
+            'message': PHASE_MESSAGES.get(self._state['phase'], '処理中...'),
+            'updated_at': time.time()
+        }
+        try:
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._file.flush()
+        except Exception as e:
+            logger.warning(f"進捗ファイルへの書き込みに失敗: {str(e)}")
+
+
+def read_latest(path) -> Optional[Dict]:
+    """
+    進捗ファイルの最後の行を読み込む
+
+    ファイルの末尾から最後の完全な行が見つかるまでブロック単位で読む。
+
+    Returns:
+        最新の進捗。ファイルがない、または空の場合は None
+    """
+    try:
+        with open(str(path), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            buffer = b''
+            while position > 0:
+                read_size = min(_TAIL_BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                buffer = f.read(read_size) + buffer
+                # 書き込み途中の最終行は除き、最後の完全な行を探す
+                lines = buffer.split(b'\n')
+                complete = lines[:-1] if not buffer.endswith(b'\n') else lines
+                complete = [line for line in complete if line.strip()]
+                if len(complete) > 1 or (complete and position == 0):
+                    return json.loads(complete[-1])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"進捗ファイルの読み込みに失敗: {str(e)}")
+    return None
+
+
+def follow(path, offset: int = 0) -> Tuple[List[Dict], int]:
+    """
+    前回の位置以降に追記された進捗を読み込む
+
+    クローラーの再実行でファイルが作り直された（サイズが位置より小さい）場合は先頭から読む。
+
+    Returns:
+        (進捗のリスト, 次回の読み込み位置)
+    """
+    try:
+        with open(str(path), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size < offset:
+                offset = 0
+            f.seek(offset)
+            data = f.read(size - offset)
+    except FileNotFoundError:
+        return [], 0
+
+    # 書き込み途中の行は次回に読む
+    end = data.rfind(b'\n') + 1
+    events = []
+    for line in data[:end].split(b'\n'):
+        if line.strip():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events, offset + end
+
+
+def finalize(path, phase: str, error: Optional[str] = None) -> bool:
+    """
+    最後の進捗が終了を示していない場合に、終了の行を追記する
+
+    クローラーのプロセスが finish を呼ばずに終了した場合に、アプリ側から呼び出す。
+
+    Args:
+        phase: 終了の段階（'completed' / 'failed' / 'cancelled'）
+
+    Returns:
+        追記した場合は True
+    """
+    latest = read_latest(path)
+    if latest is None or latest.get('phase') in FINAL_PHASES:
+        return False
+    event = {
+        **latest,
+        'phase': phase,
+        'eta_seconds': None,
+        'error': error,
+        'message': PHASE_MESSAGES.get(phase, '処理中...'),
+        'updated_at': time.time()
+    }
+    try:
+        with open(str(path), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+    except Exception as e:
+        logger.warning(f"進捗ファイルへの書き込みに失敗: {str(e)}")
+        return False
+    return True
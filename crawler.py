@@ -3,21 +3,19 @@ import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import time  # timeモジュールをインポート
-from typing import Dict, List
+from typing import Dict, List, Optional
 import random
 import sys
 
 import pandas as pd
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from loguru import logger
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from openai import OpenAI
 import re
 import platform
@@ -30,6 +28,26 @@ import chromedriver_manager
 # 設定ファイルパス用に修正モジュールをインポート
 from fix_settings_patch import get_app_paths, get_data_dir_from_env
 
+# LLMフィルタリングエンジン
+from llm_filter import create_client, filter_jobs_concurrently, get_max_concurrency
+from llm_cache import get_decision_cache
+from prefilter import PreFilter
+from semantic_rank import rank_jobs
+from job_store import get_job_store, is_newer
+from crawl_progress import ProgressWriter, get_progress_file
+from crawl_jobs import install_stop_handler
+from http_scraper import (HttpScraper, HttpScrapingError, parse_embedded_jobs, parse_job_cards,
+                          DEFAULT_PAGE_WORKERS, DEFAULT_STOP_AFTER_KNOWN)
+from extractors import get_extractor, extract_job_cards_in_browser, extract_job_detail_in_browser
+from crowdworks_selectors import css_candidates, find_element, get_selector, preflight, SelectorError, LIST_PAGE
+from browser_pool import get_browser_pool, pool_options
+from lean_chrome import lean_options, apply_lean_options, enable_resource_blocking, window_size
+from selenium_waits import (wait_for_document_ready, wait_for_any_element, wait_for_content_change,
+                            wait_for_url_change, politeness_pause, wait_stats)
+from detail_fetcher import (fetch_details, parse_job_detail, HostThrottle,
+                            DEFAULT_MAX_WORKERS, DEFAULT_MAX_PER_HOST, DEFAULT_MIN_INTERVAL)
+import config_cache
+
 # カスタム例外クラス
 class LoginError(Exception):
     """ログイン失敗を示す例外"""
@@ -70,14 +88,19 @@ os.makedirs(log_dir, exist_ok=True)
 logger.remove()  # デフォルトのハンドラを削除
 logger.add(str(log_dir / "crawler.log"), mode="w")  # 上書きモードでログファイルを作成
 
+# 進捗ファイル（アプリ側は末尾の1行を読むだけで進捗が分かる）
+progress = ProgressWriter(get_progress_file(log_dir))
+
 # 設定ファイルのパス
 SETTINGS_FILE = str(app_paths['settings_file'])
 
 # 設定を読み込む関数
 def load_settings():
     try:
-        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        settings = config_cache.load_json(SETTINGS_FILE)
+        if settings is None:
+            raise FileNotFoundError(SETTINGS_FILE)
+        return settings
     except Exception as e:
         logger.error(f"設定ファイルの読み込みに失敗: {str(e)}")
         return {}
@@ -94,6 +117,9 @@ deepseek_client = OpenAI(
     base_url="https://api.deepseek.com"
 )
 
+# 詳細ページ1件あたりの待ち時間の上限（秒）
+DETAIL_TIMEOUT = 15
+
 # プロンプトファイルのパス
 PROMPT_FILE = str(data_dir / 'prompt.txt')
 
@@ -115,9 +141,9 @@ def load_config():
     """
     try:
         # まずprompt.txtを試す
-        if os.path.exists(PROMPT_FILE):
-            with open(PROMPT_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        prompt_config = config_cache.load_json(PROMPT_FILE)
+        if prompt_config is not None:
+            return prompt_config
         
         # 次に設定ファイルから読み込む
         settings = load_settings()
@@ -145,78 +171,62 @@ def filter_jobs_by_gpt(jobs, config):
     settings = load_settings()
     
     # モデルに応じてクライアントを選択
-    if config['model'] == 'deepseek-chat':
-        client = OpenAI(
-            api_key=settings.get('deepseek_api_key', ''),
-            base_url="https://api.deepseek.com"
-        )
-    else:
-        client = OpenAI(
-            api_key=settings.get('api_key', '')
-        )
+    client = create_client(config['model'], settings)
     
-    filtered_jobs = []
     total_jobs = len(jobs)
     
     logger.info(f"LLMフィルタリングを開始します。対象案件数: {total_jobs}")
     logger.info(f"使用モデル: {config['model']}")
     logger.info(f"フィルター条件: {config['prompt']}")
     
-    for i, job in enumerate(jobs, 1):
-        logger.info(f"\n案件 {i}/{total_jobs} を処理中...")
+    # ルールで判定できる案件はLLMに送らずに振り分ける
+    prefilter = PreFilter(config.get('prefilter'))
+    accepted_jobs, llm_jobs, _ = prefilter.apply(jobs)
+    selected = {id(job) for job in accepted_jobs}
+    progress.update('filtering', jobs_to_filter=len(llm_jobs), jobs_evaluated=0)
+    
+    # 同時実行数を制限しながら残りの案件を並列に評価（結果は入力順）
+    max_concurrency = get_max_concurrency(config, settings.get('llm_max_concurrency'))
+    # 同じ案件・同じ条件の判断結果はキャッシュから再利用する
+    cache = get_decision_cache(data_dir, settings)
+    results = filter_jobs_concurrently(client, llm_jobs, config, max_concurrency, cache=cache,
+                                       on_progress=lambda count: progress.increment('jobs_evaluated', count))
+    
+    failed_jobs = []
+    for i, (job, result) in enumerate(zip(llm_jobs, results), 1):
+        logger.info(f"\n案件 {i}/{len(llm_jobs)} の判断結果")
         logger.info(f"タイトル: {job['title']}")
         logger.info(f"予算: {job['budget']}")
         
-        # LLMに送信するメッセージを作成
-        messages = [
-            {"role": "system", "content": """あなたは案件の審査員です。与えられた条件に基づいて、案件を評価してください。
-レスポンスは以下のJSON形式で返してください：
-{
-    "decision": "yes" or "no",
-    "reason": "判断理由を1文で"
-}"""},
-            {"role": "user", "content": f"""
-以下の案件が条件を満たすか判断してください。条件: {config['prompt']}
-
-案件情報:
-タイトル: {job['title']}
-予算: {job['budget']}
-クライアント: {job['client']}
-            """}
-        ]
-
-        try:
-            # LLMに問い合わせ（設定を使用）
-            response = client.chat.completions.create(
-                model=config['model'],
-                messages=messages,
-                temperature=config['temperature'],
-                max_tokens=100,
-                response_format={"type": "json_object"}
-            )
-            
-            # レスポンスを取得してJSONとしてパース
-            result = json.loads(response.choices[0].message.content)
-            logger.info(f"LLMの判断: {result}")
-            
-            # 'yes'の場合のみ案件を追加
-            if result.get('decision', '').lower() == 'yes':
-                # 判断理由を案件情報に追加
-                job['gpt_reason'] = result.get('reason', '')
-                filtered_jobs.append(job)
-                logger.info(f"✓ 案件が条件に適合: {job['title']}")
-                logger.info(f"理由: {result.get('reason', '')}")
-            else:
-                logger.info(f"✗ 案件が条件に不適合: {job['title']}")
-                logger.info(f"理由: {result.get('reason', '')}")
-                
-        except Exception as e:
-            logger.error(f"Error in LLM filtering for job {job['title']}: {e}")
-            logger.error(f"完全なエラー内容: {str(e)}")
-            # エラーの場合は安全のため、その案件を含める -> 変更: FilteringErrorを送出
-            # filtered_jobs.append(job)
-            raise FilteringError(f"LLMフィルタリング処理中にエラーが発生しました: {e}")
+        if result['error']:
+            # 失敗した案件は記録し、他の案件の結果は保持する
+            failed_jobs.append((job, result['error']))
+            continue
+        
+        logger.info(f"LLMの判断: {result}")
+        
+        # 'yes'の場合のみ案件を追加
+        if result['decision'] == 'yes':
+            # 判断理由を案件情報に追加
+            job['gpt_reason'] = result['reason']
+            selected.add(id(job))
+            logger.info(f"✓ 案件が条件に適合: {job['title']}")
+            logger.info(f"理由: {result['reason']}")
+        else:
+            logger.info(f"✗ 案件が条件に不適合: {job['title']}")
+            logger.info(f"理由: {result['reason']}")
     
+    if failed_jobs:
+        for job, error in failed_jobs:
+            logger.error(f"Error in LLM filtering for job {job['title']}: {error}")
+        # 全件失敗した場合はAPIキーや設定の問題とみなしてFilteringErrorを送出
+        if len(failed_jobs) == len(llm_jobs):
+            raise FilteringError(f"LLMフィルタリング処理中にエラーが発生しました: {failed_jobs[0][1]}")
+        logger.warning(f"LLMフィルタリングに失敗した案件: {len(failed_jobs)}/{len(llm_jobs)} 件（結果から除外）")
+    
+    # 元の順序を保ったまま適合した案件を抽出
+    filtered_jobs = [job for job in jobs if id(job) in selected]
+    progress.update(jobs_filtered=len(filtered_jobs))
     logger.info(f"\nLLMフィルタリング完了。{len(filtered_jobs)}/{total_jobs} 件が条件に適合")
     return filtered_jobs
 
@@ -246,8 +256,21 @@ def process_crawled_data(jobs, crawler=None):
     
     # GPTフィルタリングを実行
     config = load_config()
+    
+    # 埋め込みによる事前ランキングで上位の案件のみをLLMに渡す（設定時のみ）
+    llm_jobs = jobs
+    if config.get('semantic_rank', {}).get('enabled'):
+        rank_settings = load_settings()
+        rank_settings.setdefault('filter_prompt', config.get('prompt', ''))
+        if not rank_settings.get('self_introduction'):
+            self_intro_file = data_dir / 'crawled_data' / 'SelfIntroduction.txt'
+            rank_settings['self_introduction'] = config_cache.load_text(self_intro_file)
+        semantic_config = {'prompt': config.get('prompt', ''), **config['semantic_rank']}
+        progress.update('ranking')
+        llm_jobs = rank_jobs(jobs, semantic_config, rank_settings, base_filename)
+    
     try:
-        filtered_jobs = filter_jobs_by_gpt(jobs, config)
+        filtered_jobs = filter_jobs_by_gpt(llm_jobs, config)
     except FilteringError as e:
         logger.error(f"フィルタリング処理でエラー: {e}")
         raise  # FilteringErrorを再度送出してメイン処理に伝える
@@ -255,9 +278,12 @@ def process_crawled_data(jobs, crawler=None):
     # フィルタリング済み案件の詳細情報を取得
     if crawler and filtered_jobs:
         print(f"フィルタリング済み案件の詳細情報を取得中...")
-        for job in filtered_jobs:
-            detail_data = crawler.scrape_job_detail(job['url'])
-            job.update(detail_data)
+        progress.update('details', details_total=len(filtered_jobs), details_fetched=0)
+        details = crawler.scrape_job_details([job['url'] for job in filtered_jobs])
+        for job, detail_data in zip(filtered_jobs, details):
+            job.update(detail_data or {})
+    
+    progress.update('saving')
     
     # フィルタリング済みデータを保存
     filtered_filename = base_filename.replace('.json', '_filtered.json')
@@ -265,8 +291,79 @@ def process_crawled_data(jobs, crawler=None):
         json.dump(filtered_jobs, f, ensure_ascii=False, indent=2)
     print(f"フィルタリング済みデータを保存: {filtered_filename}")
     
+    # 案件データストアに登録（画面表示や重複チェックはストアから読み込む）
+    try:
+        get_job_store(data_dir).record_run(base_filename, jobs, filtered_jobs, filtered_filename)
+    except Exception as e:
+        logger.error(f"案件データストアへの登録に失敗: {str(e)}")
+    
     return base_filename, filtered_filename
 
+def create_chrome_driver(profile_dir: Optional[str] = None, lean: Optional[Dict] = None):
+    """
+    クローラー用のChromeを起動する
+    
+    Args:
+        profile_dir: 永続的なプロファイルのディレクトリ（ログイン状態を引き継ぐ）
+        lean: 軽量化のオプション（省略時は設定の lean_browser）
+    """
+    lean = lean if lean is not None else lean_options(load_settings())
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")  # 新しいヘッドレスモードを使用
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"--window-size={window_size(lean)}")
+    # 画像・フォントなどを読み込まない軽量な設定
+    apply_lean_options(chrome_options, lean)
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    
+    prefs = {
+        "profile.default_content_setting_values.notifications": 2,  # 通知を無効化
+        "credentials_enable_service": False,  # パスワード保存のポップアップを無効化
+        "profile.password_manager_enabled": False
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    
+    try:
+        # ChromeDriver自動管理モジュールを使用してドライバーパスを取得
+        driver_path = chromedriver_manager.setup_driver()
+        
+        if not driver_path:
+            logger.error("ChromeDriverの自動設定に失敗しました")
+            raise Exception("ChromeDriverの自動設定に失敗しました")
+        
+        service = Service(executable_path=driver_path)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        
+        # JavaScript注入でWebDriverを検出されないようにする
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+            "source": """
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                });
+                Object.defineProperty(navigator, 'plugins', {
+                    get: () => [1, 2, 3, 4, 5]
+                });
+                window.chrome = {
+                    runtime: {}
+                };
+            """
+        })
+        enable_resource_blocking(driver, lean)
+        
+        logger.info("ChromeDriverの設定が完了しました")
+        return driver
+    except Exception as e:
+        logger.error(f"ChromeDriverの設定に失敗: {str(e)}")
+        raise
+
 class CrowdWorksCrawler:
     def __init__(self, email: str, password: str):
         """
@@ -283,69 +380,27 @@ class CrowdWorksCrawler:
         self.password = password
         self.driver = None
         self.wait = None
+        self.http = None  # HTTPでの取得用セッション（初回の取得時に作成）
         self.logger = logger  # loggerをインスタンス変数として設定
         self.setup_driver()
 
     def setup_driver(self):
-        """Seleniumドライバーの設定"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")  # 新しいヘッドレスモードを使用
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        
-        prefs = {
-            "profile.default_content_setting_values.notifications": 2,  # 通知を無効化
-            "credentials_enable_service": False,  # パスワード保存のポップアップを無効化
-            "profile.password_manager_enabled": False
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        try:
-            # ChromeDriver自動管理モジュールを使用してドライバーパスを取得
-            driver_path = chromedriver_manager.setup_driver()
-            
-            if not driver_path:
-                logger.error("ChromeDriverの自動設定に失敗しました")
-                raise Exception("ChromeDriverの自動設定に失敗しました")
-            
-            service = Service(executable_path=driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # JavaScript注入でWebDriverを検出されないようにする
-            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                "source": """
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    });
-                    Object.defineProperty(navigator, 'plugins', {
-                        get: () => [1, 2, 3, 4, 5]
-                    });
-                    window.chrome = {
-                        runtime: {}
-                    };
-                """
-            })
-            
-            self.wait = WebDriverWait(self.driver, 20)  # 待機時間を20秒に延長
-            logger.info("ChromeDriverの設定が完了しました")
-        except Exception as e:
-            logger.error(f"ChromeDriverの設定に失敗: {str(e)}")
-            raise
+        """Seleniumドライバーの設定（ブラウザプールから起動済みのブラウザを借りる）"""
+        self.browser_pool = get_browser_pool('crawler', create_chrome_driver, data_dir / 'browser_profiles',
+                                             **pool_options(load_settings()))
+        self.browser = self.browser_pool.acquire()
+        self.driver = self.browser.driver
+        self.wait = WebDriverWait(self.driver, 20)  # 待機時間を20秒に延長
 
     def wait_for_page_load(self):
-        """ページの完全な読み込みを待機"""
+        """
+        ページのDOMの構築を待機
+        
+        画像などの読み込み（readyState の complete）は待たない（軽量化の pageLoadStrategy=eager と同じ）。
+        必要な要素は wait_for_any_element で待つ。
+        """
         try:
-            self.wait.until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            time.sleep(2)  # sleepをtime.sleepに修正
+            wait_for_document_ready(self.driver, state='interactive')
         except Exception as e:
             logger.error(f"ページの読み込み待機に失敗: {str(e)}")
 
@@ -353,25 +408,37 @@ class CrowdWorksCrawler:
         """クラウドワークスにログイン"""
         try:
             logger.info("ログイン処理を開始")
-            self.driver.get(self.login_url)
-            logger.info(f"現在のURL: {self.driver.current_url}")
+            self.browser.get(self.login_url)
+            login_page_url = self.driver.current_url
+            logger.info(f"現在のURL: {login_page_url}")
             
-            # ページの完全な読み込みを待機
+            # ページのDOMの構築を待機
             self.wait_for_page_load()
             
+            # プロファイルにログイン状態が残っている場合はログインページから移動する
+            if "/login" not in self.driver.current_url:
+                logger.info("ログイン済みのセッションを再利用します")
+                return True
+            
             try:
                 # メールアドレスとパスワードを入力
                 logger.info("ログインフォームの要素を探索中...")
+                try:
+                    wait_for_any_element(self.driver, get_selector('login_password').locators(), name='login_form')
+                except TimeoutException:
+                    pass  # 見つからない場合は下の検出結果でエラーにする
                 
-                # 新しいセレクタを使用
+                # セレクタの候補を順に試して要素を探す
                 form_elements = self.driver.execute_script("""
-                    const result = {
-                        email: document.querySelector('input[name="username"]'),
-                        password: document.querySelector('input[name="password"]'),
-                        submit: document.querySelector('button[type="submit"]')
+                    const find = candidates => {
+                        for (const css of candidates) {
+                            const element = document.querySelector(css);
+                            if (element) return element;
+                        }
+                        return null;
                     };
-                    return result;
-                """)
+                    return {email: find(arguments[0]), password: find(arguments[1]), submit: find(arguments[2])};
+                """, css_candidates('login_email'), css_candidates('login_password'), css_candidates('login_submit'))
                 
                 # フォーム要素の検証結果をログに記録
                 email_found = form_elements.get('email') is not None
@@ -402,14 +469,12 @@ class CrowdWorksCrawler:
                     arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
                     arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
                 """, form_elements['email'], self.email)
-                time.sleep(1)  # sleepをtime.sleepに修正
                 
                 self.driver.execute_script("""
                     arguments[0].value = arguments[1];
                     arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
                     arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
                 """, form_elements['password'], self.password)
-                time.sleep(1)  # sleepをtime.sleepに修正
 
                 if not submit_found:
                     logger.error("ログインボタンが見つかりません。フォームを直接送信します")
@@ -424,7 +489,12 @@ class CrowdWorksCrawler:
                         arguments[0].dispatchEvent(new Event('click', { bubbles: true }));
                     """, form_elements['submit'])
                 
-                time.sleep(5)  # sleepをtime.sleepに修正
+                # ログイン後のページへの遷移を待つ（遷移しない場合はエラーメッセージを確認する）
+                try:
+                    wait_for_url_change(self.driver, login_page_url, name='login_redirect')
+                    self.wait_for_page_load()
+                except TimeoutException:
+                    pass
 
                 # ログイン成功の確認（URLが変わったことを確認）
                 current_url = self.driver.current_url
@@ -478,121 +548,264 @@ class CrowdWorksCrawler:
             element.send_keys(char)
             self.random_sleep(0.1, 0.3)
 
-    def save_page_source(self, filename: str):
-        """ページソースを保存"""
+    def save_page_source(self, filename: str, html: Optional[str] = None):
+        """ページソース（html を指定した場合はそのHTML）を保存"""
         try:
             with open(filename, "w", encoding="utf-8") as f:
-                f.write(self.driver.page_source)
+                f.write(html if html is not None else self.driver.page_source)
             self.logger.info(f"ページソースを保存しました: {filename}")
         except Exception as e:
             self.logger.error(f"ページソースの保存に失敗: {str(e)}")
 
     def scrape_job_detail(self, url: str) -> Dict:
-        """個別の仕事詳細ページから情報を取得"""
+        """個別の仕事詳細ページから情報を取得（ブラウザ）"""
         try:
             self.logger.info(f"仕事詳細の取得を開始: {url}")
-            self.driver.get(url)
-            time.sleep(3)  # ページの読み込みを待つ
-            
-            # ページのHTMLを取得してBeautifulSoupで解析
-            html = self.driver.page_source
-            soup = BeautifulSoup(html, 'html.parser')
+            self.browser.get(url)
+            # 固定の待ち時間ではなく詳細テーブルが表示されるまで待つ
+            try:
+                wait_for_any_element(self.driver, get_selector('job_detail').locators(),
+                                     timeout=DETAIL_TIMEOUT, name='job_detail')
+            except TimeoutException:
+                pass
             
-            # 仕事詳細テーブルを取得
-            detail_table = soup.find('table', class_='job_offer_detail_table')
-            if detail_table:
-                # 改行を保持したまま取得
-                # 1. 不要な空白行を削除
-                # 2. 意味のある改行は保持
-                lines = []
-                for text in detail_table.stripped_strings:
-                    lines.append(text)
-                detail_text = '\n'.join(lines)
-                
-                return {
-                    "detail_description": detail_text,
-                    "crawled_detail_at": datetime.now().isoformat()
-                }
-            else:
+            # ページ全体のHTMLを転送せず、ブラウザ内で詳細テーブルのテキストだけを取り出す
+            try:
+                detail = extract_job_detail_in_browser(self.driver)
+            except WebDriverException as e:
+                self.logger.warning(f"ブラウザ内での抽出に失敗したため、HTMLを解析します: {str(e)}")
+                detail = parse_job_detail(self.driver.page_source, self.get_extractor())
+            if not detail:
                 self.logger.warning(f"仕事詳細が見つかりませんでした: {url}")
-                return {}
+            return detail
                 
         except Exception as e:
             self.logger.error(f"仕事詳細の取得中にエラーが発生: {str(e)}")
             return {}
 
+    def scrape_job_details(self, urls: List[str]) -> List[Dict]:
+        """
+        複数の仕事詳細ページから情報を取得（結果はURLの順）
+        
+        scrape_backend が 'http' の場合はHTTPで並列に取得し、取得できなかったページのみ
+        ブラウザで取得する。
+        """
+        settings = load_settings()
+        details: List[Optional[Dict]] = [None] * len(urls)
+        use_http = settings.get('scrape_backend', 'http') == 'http'
+        if use_http:
+            timeout = settings.get('detail_timeout', DETAIL_TIMEOUT)
+            throttle = HostThrottle(
+                max_per_host=settings.get('detail_max_per_host', DEFAULT_MAX_PER_HOST),
+                min_interval=settings.get('detail_min_interval', DEFAULT_MIN_INTERVAL)
+            )
+            details = fetch_details(
+                urls,
+                lambda url: self.get_http_session().get(url, timeout=timeout),
+                max_workers=settings.get('detail_max_workers', DEFAULT_MAX_WORKERS),
+                throttle=throttle,
+                on_done=lambda: progress.increment('details_fetched'),
+                extractor=self.get_extractor()
+            )
+        
+        missing = [i for i, detail in enumerate(details) if not detail]
+        if missing and len(missing) < len(urls):
+            self.logger.info(f"HTTPで取得できなかった {len(missing)} 件の詳細をブラウザで取得します")
+        for i in missing:
+            details[i] = self.scrape_job_detail(urls[i])
+            if not use_http:
+                progress.increment('details_fetched')
+        return details
+
     def scrape_jobs(self):
+        """
+        案件一覧を取得する
+        
+        設定の scrape_backend が 'http'（デフォルト）の場合はブラウザを使わずにHTTPで取得し、
+        失敗した場合のみSeleniumでの取得に切り替える。
+        """
+        # 設定から最大取得件数を取得
+        settings = load_settings()
+        max_items = settings.get('max_items', 20)  # デフォルトは20件
+        progress.update('scraping', page=1)
+        
+        if settings.get('scrape_backend', 'http') == 'http':
+            try:
+                return self.scrape_jobs_http(max_items, settings)
+            except Exception as e:
+                self.logger.warning(f"HTTPでの案件一覧の取得に失敗したため、ブラウザで取得します: {str(e)}")
+        return self.scrape_jobs_selenium(max_items, settings)
+
+    def preflight_selectors(self):
+        """
+        検索結果の1ページ目をHTTPで取得し、案件を取り出せるかを事前に確認する
+        
+        ログインやLLMの呼び出しの前にサイト構造の変更を検出するため、ログインせずに取得する。
+        ページを取得できない場合は確認を省略する（ブラウザでの取得時に1ページ目で確認する）。
+        
+        Raises:
+            ScrapingError: 埋め込みデータも案件カードも見つからない場合
+        """
+        scraper = HttpScraper(self.base_url, extractor=self.get_extractor())
+        try:
+            html = scraper.get(self.search_url)
+        except HttpScrapingError as e:
+            self.logger.warning(f"セレクタの事前確認を省略します: {str(e)}")
+            return
+        finally:
+            scraper.close()
+        
+        if parse_embedded_jobs(html, self.base_url, scraper.extractor):
+            self.logger.info("セレクタの事前確認: 埋め込みデータから案件を取得できます")
+            return
+        try:
+            preflight(html, LIST_PAGE)
+        except SelectorError as e:
+            self.save_page_source("preflight_error_page.html", html)
+            raise ScrapingError(f"検索結果ページから案件を取得できません。サイト構造が変更された可能性があります: {e}")
+
+    def get_extractor(self):
+        """HTMLの抽出処理を取得（設定の html_extractor、デフォルトは利用できる中で最も高速なもの）"""
+        return get_extractor(load_settings().get('html_extractor', 'auto'))
+
+    def get_http_session(self) -> HttpScraper:
+        """HTTPでの取得用セッションを取得（ログイン済みのブラウザのCookieを引き継ぐ）"""
+        if self.http is None:
+            self.http = HttpScraper(self.base_url, extractor=self.get_extractor())
+            if self.driver is not None:
+                self.http.load_cookies(self.driver.get_cookies())
+        return self.http
+
+    def scrape_jobs_http(self, max_items: int, settings: Dict) -> List[Dict]:
+        """HTTPで案件一覧を取得（複数ページを並列に取得し、前回取得済みの案件で打ち切る）"""
+        self.logger.info("案件情報の取得を開始（HTTP）")
+        return self.get_http_session().scrape_jobs(
+            self.search_url, max_items,
+            on_page=lambda page, count: progress.update(page=page, jobs_scraped=count),
+            workers=settings.get('crawl_workers', DEFAULT_PAGE_WORKERS),
+            **self.known_job_options(settings)
+        )
+
+    def known_job_options(self, settings: Dict) -> Dict:
+        """前回取得済みの案件で一覧の取得を打ち切るためのオプション（設定の stop_at_known, stop_after_known）"""
+        return {
+            'is_known': self.known_job_checker() if settings.get('stop_at_known', True) else None,
+            'stop_after_known': settings.get('stop_after_known', DEFAULT_STOP_AFTER_KNOWN)
+        }
+
+    def known_job_checker(self):
+        """
+        取得済みで更新のない案件かを判定する関数を作成
+        
+        案件データストアの取得済み案件の記録（URLと投稿日時）で判定する。
+        投稿日時がウォーターマーク（取得済みの最新の投稿日時）より新しい案件は
+        問い合わせずに未取得と判定する。記録がない場合は前回のクロール結果で判定する。
+        """
+        try:
+            store = get_job_store(data_dir)
+            watermark = store.seen_watermark()
+        except Exception as e:
+            self.logger.error(f"取得済み案件の記録の読み込みに失敗: {str(e)}")
+            store, watermark = None, None
+        
+        if store is not None and watermark is not None:
+            self.logger.info(f"取得済み案件のウォーターマーク: {watermark}")
+            
+            def is_known(job: Dict) -> bool:
+                if is_newer(job.get('posted_date'), watermark):
+                    return False
+                return store.is_seen(job['url'], job.get('posted_date'))
+            
+            return is_known
+        
+        previous_jobs = self.load_previous_jobs()
+        
+        def is_known_previous(job: Dict) -> bool:
+            previous = previous_jobs.get(job['url'])
+            # 再掲載などで投稿日時が新しくなった案件は取得対象とする
+            return previous is not None and not is_newer(job.get('posted_date'), previous.get('posted_date'))
+        
+        return is_known_previous
+
+    def scrape_jobs_selenium(self, max_items: int, settings: Optional[Dict] = None) -> List[Dict]:
+        """ブラウザで案件一覧を取得（HTTPでの取得と同じく、前回取得済みの案件で打ち切る）"""
         try:
             self.logger.info("案件情報の取得を開始")
-            self.driver.get(self.search_url)
-            time.sleep(5)  # ページの読み込みを待つ
+            settings = settings if settings is not None else load_settings()
+            options = self.known_job_options(settings)
+            is_known, stop_after_known = options['is_known'], options['stop_after_known']
+            known_streak = 0
+            skipped = 0
+            done = False
+            min_interval = settings.get('politeness_delay', 0)
+            page_started_at = time.monotonic()
+            self.browser.get(self.search_url)
             
-            # 設定から最大取得件数を取得
-            settings = load_settings()
-            max_items = settings.get('max_items', 20)  # デフォルトは20件
             jobs_data = []
             current_page = 1
             
-            while len(jobs_data) < max_items:
-                # ページのHTMLを取得してBeautifulSoupで解析
-                html = self.driver.page_source
-                soup = BeautifulSoup(html, 'html.parser')
+            while not done and len(jobs_data) < max_items:
+                # 案件リストが描画されるまで待つ（見つからない場合は下でエラーにする）
+                try:
+                    job_card, _ = wait_for_any_element(self.driver, get_selector('job_card').locators(),
+                                                       name='job_list')
+                except TimeoutException:
+                    job_card = None
+                
+                # 1ページ目で案件の取得に必要な要素があるかを確認する（LLMの呼び出し前に失敗させる）
+                if current_page == 1 and settings.get('selector_preflight', True):
+                    try:
+                        preflight(self.driver.page_source, LIST_PAGE)
+                    except SelectorError as e:
+                        self.save_page_source("scrape_error_page.html")
+                        raise ScrapingError(f"案件リストの取得に失敗しました。サイト構造の変更の可能性があります: {e}")
                 
-                # 案件要素を取得
-                job_elements = soup.find_all('div', class_='UNzN7')
+                # ページ全体のHTMLを転送せず、ブラウザ内で案件カードの値だけを取り出す
+                try:
+                    page_jobs = extract_job_cards_in_browser(self.driver, self.base_url)
+                except WebDriverException as e:
+                    self.logger.warning(f"ブラウザ内での抽出に失敗したため、HTMLを解析します: {str(e)}")
+                    page_jobs = parse_job_cards(self.driver.page_source, self.base_url, self.get_extractor())
 
                 # 最初のページで案件要素が見つからない場合、エラーとする
-                if current_page == 1 and not job_elements:
+                if current_page == 1 and not page_jobs:
                     logger.error("案件リストの要素が見つかりません。サイト構造が変更された可能性があります。")
                     self.save_page_source("scrape_error_page.html")
                     raise ScrapingError("案件リストの取得に失敗しました。サイト構造の変更の可能性があります。")
                 
-                for job_element in job_elements:
+                for job_data in page_jobs:
                     if len(jobs_data) >= max_items:
                         break
-                        
-                    try:
-                        # タイトルとURL
-                        title_element = job_element.find('h3', class_='iCeus').find('a')
-                        title = title_element.text.strip()
-                        url = f"https://crowdworks.jp{title_element['href']}"
-                        
-                        # 予算
-                        budget_element = job_element.find('span', class_='Yh37y')
-                        budget = budget_element.text.strip() if budget_element else "予算未設定"
-                        
-                        # クライアント名
-                        client_element = job_element.find('a', class_='uxHdW')
-                        client = client_element.text.strip() if client_element else "クライアント名非公開"
-                        
-                        # 投稿日
-                        posted_date_element = job_element.find('time')
-                        posted_date = posted_date_element['datetime'] if posted_date_element else None
-                        
-                        job_data = {
-                            "title": title,
-                            "url": url,
-                            "budget": budget,
-                            "client": client,
-                            "posted_date": posted_date,
-                            "crawled_at": datetime.now().isoformat()
-                        }
-                        
-                        self.logger.info(f"求人情報を取得しました: {title}")
-                        jobs_data.append(job_data)
-                        
-                    except Exception as e:
-                        self.logger.error(f"案件データの取得中にエラーが発生: {str(e)}")
+                    # 新着順のため、取得済みの案件が続いた時点で以降のページは取得しない
+                    if is_known and is_known(job_data):
+                        skipped += 1
+                        known_streak += 1
+                        if known_streak >= max(1, stop_after_known):
+                            self.logger.info(f"取得済みの案件が{known_streak}件続いたため取得を終了します")
+                            done = True
+                            break
                         continue
+                    known_streak = 0
+                    self.logger.info(f"求人情報を取得しました: {job_data['title']}")
+                    jobs_data.append(job_data)
+                progress.update(jobs_scraped=len(jobs_data))
                 
                 # 次のページが存在し、まだ必要な件数に達していない場合は次ページへ
-                if len(jobs_data) < max_items:
+                if not done and len(jobs_data) < max_items:
                     try:
-                        next_button = self.driver.find_element(By.XPATH, '//*[@id="vue-container"]/div/div[2]/div/div[3]/div[2]/section/div[4]/a')
+                        next_button = find_element(self.driver, 'next_page')
+                        politeness_pause(page_started_at, min_interval)
+                        page_started_at = time.monotonic()
                         self.driver.execute_script("arguments[0].click();", next_button)
                         current_page += 1
+                        progress.update(page=current_page)
                         self.logger.info(f"次のページ（{current_page}ページ目）に移動します")
-                        time.sleep(5)  # ページ遷移を待つ
+                        # 前のページの案件リストが置き換わる（または書き換わる）まで待つ
+                        if job_card is not None:
+                            try:
+                                wait_for_content_change(self.driver, job_card, name='next_page')
+                            except TimeoutException:
+                                pass
                     except NoSuchElementException:
                         self.logger.info("最後のページに到達しました")
                         break
@@ -601,7 +814,8 @@ class CrowdWorksCrawler:
                         self.save_page_source("scrape_error_page.html")
                         raise ScrapingError(f"案件一覧のページ遷移中にエラーが発生しました: {e}")
             
-            self.logger.info(f"合計{len(jobs_data)}件の案件を取得しました（{current_page}ページ分）")
+            self.logger.info(f"合計{len(jobs_data)}件の案件を取得しました（{current_page}ページ分、"
+                             f"取得済みのため除外: {skipped}件）")
             return jobs_data
             
         except Exception as e:
@@ -645,7 +859,15 @@ class CrowdWorksCrawler:
             os.makedirs(save_dir, exist_ok=True)
             return {}
         
-        # 最新のJSONファイルを探す
+        # 案件データストアから前回のクロール結果を取得
+        try:
+            previous_jobs = get_job_store(data_dir).latest_run_jobs()
+            if previous_jobs:
+                return previous_jobs
+        except Exception as e:
+            self.logger.error(f"案件データストアからの読み込みに失敗: {str(e)}")
+        
+        # ストアが空の場合は最新のJSONファイルを探す
         json_files = list(save_dir.glob("jobs_*.json"))
         if not json_files:
             return {}
@@ -663,32 +885,28 @@ class CrowdWorksCrawler:
 
     def check_duplicates(self, new_jobs: List[Dict]) -> List[Dict]:
         """重複チェックを行い、新規または更新が必要な案件のみを返す"""
-        previous_jobs = self.load_previous_jobs()
+        progress.update('dedup')
+        is_known = self.known_job_checker()
         updated_jobs = []
         
         for new_job in new_jobs:
-            url = new_job["url"]
-            if url not in previous_jobs:
-                # 新規案件
-                self.logger.info(f"新規案件を追加: {new_job['title']}")
+            if not is_known(new_job):
+                self.logger.info(f"新規/更新案件を追加: {new_job['title']}")
                 updated_jobs.append(new_job)
-            else:
-                # 既存案件の場合、投稿日時を比較
-                prev_date = datetime.fromisoformat(previous_jobs[url]["posted_date"])
-                new_date = datetime.fromisoformat(new_job["posted_date"])
-                
-                if new_date > prev_date:
-                    # 更新があった場合
-                    self.logger.info(f"案件を更新: {new_job['title']}")
-                    updated_jobs.append(new_job)
         
         self.logger.info(f"新規/更新案件: {len(updated_jobs)}件")
+        progress.update(jobs_new=len(updated_jobs))
         return updated_jobs
 
     def run(self):
         """クローラーのメイン処理"""
         try:
-            if self.login():
+            if load_settings().get('selector_preflight', True):
+                self.preflight_selectors()
+            progress.update('login')
+            # 起動済みのブラウザがログイン済みの場合はログインを省略する
+            if self.browser.logged_in or self.login():
+                self.browser.logged_in = True
                 jobs = self.scrape_jobs()
                 if jobs:
                     # 重複チェックを実行
@@ -702,11 +920,23 @@ class CrowdWorksCrawler:
                         self.logger.info("新規または更新された案件はありません")
             else:
                 self.logger.error("ログインに失敗したため、処理を中止します")
+        except WebDriverException:
+            # 異常が起きたブラウザは再利用しない
+            self.browser_pool.release(self.browser, discard=True)
+            self.browser = None
+            raise
         finally:
-            self.driver.quit()
+            if self.browser is not None:
+                self.browser_pool.release(self.browser)
+            if self.http is not None:
+                self.http.close()
+            wait_stats.log_summary()
             self.logger.info("クローラーを終了します")
 
 if __name__ == "__main__":
+    # 取り消し時も finally と atexit でブラウザを終了し、プロファイルのロックを残さない
+    install_stop_handler()
+    progress.start()
     try:
         # 設定を読み込み
         settings = load_settings()
@@ -716,6 +946,7 @@ if __name__ == "__main__":
         if not email or not password:
             logger.error("CrowdWorksのメールアドレスまたはパスワードが設定されていません")
             print("エラー: CrowdWorksのメールアドレスまたはパスワードが設定されていません")
+            progress.finish(error="CrowdWorksのメールアドレスまたはパスワードが設定されていません")
             sys.exit(1)
         
         logger.info(f"認証情報: email={bool(email)}, password={bool(password)}")
@@ -729,26 +960,31 @@ if __name__ == "__main__":
         
         # 正常終了
         logger.info("クローラーが正常に終了しました")
+        progress.finish()
         sys.exit(0)
     except LoginError as e:
         error_msg = f"CrowdWorksへのログイン失敗: ログインできていない可能性があります。IDとパスを確認してください。\n詳細: {str(e)}"
         logger.error(error_msg)
+        progress.finish(error=error_msg)
         show_error_dialog("ログインエラー", "CrowdWorksへのログインに失敗しました。\nIDとパスワードを確認してください。")
         sys.exit(1)
     except ScrapingError as e:
         error_msg = f"スクレイピングの失敗: サイト構造が変更された、または案件が取得できなかった可能性があります。\n詳細: {str(e)}"
         logger.error(error_msg)
+        progress.finish(error=error_msg)
         show_error_dialog("スクレイピングエラー", "案件情報の取得に失敗しました。\nサイト構造が変更された可能性があります。\nバージョンアップをお待ちください。")
         sys.exit(1)
     except FilteringError as e:
         error_msg = f"フィルタリング処理の問題: GPTフィルタリングでエラーが発生している可能性があります。\n詳細: {str(e)}"
         logger.error(error_msg)
+        progress.finish(error=error_msg)
         show_error_dialog("フィルタリングエラー", "フィルタリング処理でエラーが発生しました。\nAPIキーの設定やフィルタリング条件を確認してください。")
         sys.exit(1)
     except Exception as e:
         # 予期しないエラーを記録
         error_msg = f"クローラー実行中に予期しないエラーが発生しました: {str(e)}"
         logger.error(error_msg)
+        progress.finish(error=error_msg)
         print(f"エラー: {error_msg}")
         # トレースバックを記録
         import traceback
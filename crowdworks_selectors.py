@@ -0,0 +1,316 @@
+"""
+クラウドワークスのページのセレクタ定義
+
+クロール・一括応募で使う要素のセレクタを名前つきで一か所にまとめる。
+セレクタごとに候補を優先順に持ち、サイトの変更で先頭の候補（難読化されたクラス名や
+絶対XPath）が使えなくなった場合は、URLや属性に基づく後続の候補で代替する。
+
+各候補は CSS セレクタと XPath の両方（どちらか一方の場合もある）を持ち、
+抽出処理（extractors）はライブラリに応じて使い分け、Seleniumでは (By, 値) の
+ロケーターとして使う。check_page / preflight で保存したHTMLや取得したページに対して
+どの候補が一致するかを確認し、一致した候補を以降の取得で優先する。
+詳細ページの並列取得などで複数のスレッドから使うため、優先する候補の切り替えはロック内で行う。
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+from loguru import logger
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Selenium の By.CSS_SELECTOR / By.XPATH と同じ値
+CSS = 'css selector'
+XPATH = 'xpath'
+
+# ページの種類
+LIST_PAGE = 'list'
+DETAIL_PAGE = 'detail'
+APPLY_PAGE = 'apply'
+LOGIN_PAGE = 'login'
+
+
+class SelectorError(Exception):
+    """必須の要素がページで見つからない（サイト構造が変更された可能性がある）ことを示す例外"""
+    pass
+
+
+class Candidate:
+    """セレクタの候補"""
+
+    def __init__(self, css: Optional[str] = None, xpath: Optional[str] = None,
+                 strain: Optional[Tuple[Optional[str], str, str]] = None):
+        """
+        Args:
+            css: CSS セレクタ
+            xpath: XPath（要素内の検索に使う場合は './/' で始める）
+            strain: SoupStrainer で解析範囲を絞る場合の (タグ名, 属性名, 値)。属性名が 'class' の場合は
+                クラス名の一つに一致させる
+        """
+        self.css = css
+        self.xpath = xpath
+        self.strain = strain
+
+    @property
+    def locator(self) -> Tuple[str, str]:
+        """Seleniumのロケーター（CSS セレクタを優先）"""
+        return (CSS, self.css) if self.css else (XPATH, self.xpath)
+
+    def __repr__(self) -> str:
+        return self.css or self.xpath
+
+
+class Selector:
+    """名前つきのセレクタ（候補を優先順に持つ）"""
+
+    def __init__(self, name: str, page: str, candidates: Sequence[Candidate],
+                 required: bool = True, scope: Optional[str] = None, description: str = ''):
+        """
+        Args:
+            name: セレクタ名
+            page: 要素があるページの種類
+            candidates: 候補（優先順）
+            required: ページに必ず存在する要素か（preflight で確認する）
+            scope: 別のセレクタの要素内で検索する場合はそのセレクタ名
+            description: 要素の説明
+        """
+        self.name = name
+        self.page = page
+        self.candidates = list(candidates)
+        self.required = required
+        self.scope = scope
+        self.description = description
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def order(self) -> List[int]:
+        """候補を試す順序（一致した候補を先頭にする。呼び出し時点の優先する候補で決める）"""
+        active = self.active
+        return [active] + [i for i in range(len(self.candidates)) if i != active]
+
+    def ordered(self) -> List[Candidate]:
+        return [self.candidates[i] for i in self.order()]
+
+    def use(self, index: int):
+        """以降の取得で優先する候補を設定"""
+        with self._lock:
+            if index == self.active:
+                return
+            previous, self.active = self.active, index
+        logger.warning(f"セレクタ [{self.name}] の候補を切り替えます: "
+                       f"{self.candidates[previous]!r} -> {self.candidates[index]!r}")
+
+    def reset(self):
+        """優先する候補を先頭に戻す"""
+        with self._lock:
+            self.active = 0
+
+    @property
+    def locator(self) -> Tuple[str, str]:
+        """優先する候補のSeleniumのロケーター"""
+        return self.candidates[self.active].locator
+
+    def locators(self) -> List[Tuple[str, str]]:
+        """全ての候補のSeleniumのロケーター（試す順）"""
+        return [candidate.locator for candidate in self.ordered()]
+
+
+def _class_xpath(tag: str, class_name: str, axis: str = '//') -> str:
+    """クラス名で要素を探す XPath（class 属性の一部の単語に一致させる）"""
+    return f"{axis}{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+_REGISTRY: Dict[str, Selector] = {selector.name: selector for selector in [
+    # --- 検索結果ページ ---
+    Selector('job_card', LIST_PAGE, [
+        Candidate('div.UNzN7', _class_xpath('div', 'UNzN7'), strain=('div', 'class', 'UNzN7')),
+        Candidate('li:has(a[href*="/public/jobs/"])', "//li[.//a[contains(@href, '/public/jobs/')]]"),
+    ], description='案件カード'),
+    Selector('job_title', LIST_PAGE, [
+        Candidate('h3.iCeus a', _class_xpath('h3', 'iCeus', './/') + '//a'),
+        Candidate('h3 a[href*="/public/jobs/"]', ".//h3//a[contains(@href, '/public/jobs/')]"),
+    ], scope='job_card', description='案件タイトル（リンク）'),
+    Selector('job_budget', LIST_PAGE, [
+        Candidate('span.Yh37y', _class_xpath('span', 'Yh37y', './/')),
+    ], required=False, scope='job_card', description='予算'),
+    Selector('job_client', LIST_PAGE, [
+        Candidate('a.uxHdW', _class_xpath('a', 'uxHdW', './/')),
+        Candidate('a[href*="/public/employers/"]', ".//a[contains(@href, '/public/employers/')]"),
+    ], required=False, scope='job_card', description='クライアント名'),
+    Selector('job_posted_date', LIST_PAGE, [
+        Candidate('time[datetime]', ".//time[@datetime]"),
+    ], required=False, scope='job_card', description='投稿日時'),
+    Selector('vue_container', LIST_PAGE, [
+        Candidate('#vue-container', "//*[@id='vue-container']", strain=(None, 'id', 'vue-container')),
+    ], required=False, description='Vueの初期データを持つ要素'),
+    Selector('next_page', LIST_PAGE, [
+        Candidate(xpath='//*[@id="vue-container"]/div/div[2]/div/div[3]/div[2]/section/div[4]/a'),
+        Candidate('a[rel="next"]', "//a[@rel='next']"),
+        Candidate(xpath="//a[contains(normalize-space(.), '次へ')]"),
+    ], required=False, description='次のページへのリンク'),
+    # --- 案件詳細ページ ---
+    Selector('job_detail', DETAIL_PAGE, [
+        Candidate('table.job_offer_detail_table', _class_xpath('table', 'job_offer_detail_table'),
+                  strain=('table', 'class', 'job_offer_detail_table')),
+        Candidate('.detail_description', _class_xpath('*', 'detail_description')),
+        Candidate('table[class*="detail"]', "//table[contains(@class, 'detail')]"),
+        Candidate('div[class*="detail"]', "//div[contains(@class, 'detail')]"),
+    ], description='案件詳細'),
+    Selector('work_start_button', DETAIL_PAGE, [
+        Candidate(xpath='//*[@id="job_offer_detail"]/div/div[1]/div[1]/div/div/form/input[4]'),
+        Candidate(xpath="//form//input[@type='submit' and contains(@value, '作業を開始')]"),
+    ], required=False, description='「作業を開始する」ボタン'),
+    Selector('apply_button', DETAIL_PAGE, [
+        Candidate(xpath='//*[@id="job_offer_detail"]/div/div[1]/div[2]/div/p/a'),
+        Candidate('a[href*="/proposals/new"]', "//a[contains(@href, '/proposals/new')]"),
+    ], required=False, description='応募ボタン'),
+    # --- 応募フォーム ---
+    Selector('amount_input', APPLY_PAGE, [
+        Candidate('#amount_dummy_', "//*[@id='amount_dummy_']"),
+        Candidate('input[name*="amount"]', "//input[contains(@name, 'amount')]"),
+    ], description='契約金額の入力フィールド'),
+    Selector('message_input', APPLY_PAGE, [
+        Candidate('#proposal_conditions_attributes_0_message_attributes_body',
+                  "//*[@id='proposal_conditions_attributes_0_message_attributes_body']"),
+        Candidate('textarea[name*="message"]', "//textarea[contains(@name, 'message')]"),
+    ], description='応募メッセージの入力フィールド'),
+    # --- ログインページ ---
+    Selector('login_email', LOGIN_PAGE, [
+        Candidate('input[name="username"]', "//input[@name='username']"),
+        Candidate('input[type="email"]', "//input[@type='email']"),
+    ], description='メールアドレスの入力フィールド'),
+    Selector('login_password', LOGIN_PAGE, [
+        Candidate('input[name="password"]', "//input[@name='password']"),
+        Candidate('input[type="password"]', "//input[@type='password']"),
+    ], description='パスワードの入力フィールド'),
+    Selector('login_submit', LOGIN_PAGE, [
+        Candidate('button[type="submit"]', "//button[@type='submit']"),
+        Candidate('input[type="submit"]', "//input[@type='submit']"),
+    ], description='ログインボタン'),
+]}
+
+
+def get_selector(name: str) -> Selector:
+    """名前からセレクタを取得"""
+    return _REGISTRY[name]
+
+
+def page_selectors(page: str) -> List[Selector]:
+    """ページの種類ごとのセレクタ"""
+    return [selector for selector in _REGISTRY.values() if selector.page == page]
+
+
+def reset_selectors():
+    """全てのセレクタの優先する候補を先頭に戻す"""
+    for selector in _REGISTRY.values():
+        selector.reset()
+
+
+def detect_page(html: str) -> Optional[str]:
+    """必須のセレクタが全て一致するページの種類を返す（該当しない場合は None）"""
+    for page in (LIST_PAGE, DETAIL_PAGE, APPLY_PAGE, LOGIN_PAGE):
+        results = check_page(html, page)
+        if all(result['matched'] is not None for result in results if result['required']):
+            return page
+    return None
+
+
+def css_candidates(name: str) -> List[str]:
+    """CSS セレクタの候補（試す順）。ブラウザ内のスクリプトに渡す場合に使う"""
+    return [candidate.css for candidate in get_selector(name).ordered() if candidate.css]
+
+
+def find_element(driver, name: str):
+    """
+    候補を順に試して要素を取得する（Seleniumの find_element と同様に、待たずに探す）
+
+    Raises:
+        NoSuchElementException: どの候補でも見つからない場合
+    """
+    selector = get_selector(name)
+    for index in selector.order():
+        elements = driver.find_elements(*selector.candidates[index].locator)
+        if elements:
+            selector.use(index)
+            return elements[0]
+    # どの候補でも見つからない場合は、先頭の候補で Selenium の例外を発生させる
+    return driver.find_element(*selector.locator)
+
+
+def _count(soup, root, candidate: Candidate) -> Optional[int]:
+    """保存したHTMLで候補に一致する要素数（確認できない候補は None）"""
+    if candidate.css and soup is not None:
+        return len(soup.select(candidate.css))
+    if candidate.xpath and root is not None:
+        return len(root.xpath(candidate.xpath))
+    return None
+
+
+def _first(soup, root, candidate: Candidate):
+    """候補に一致する最初の要素（BeautifulSoup の要素, lxml の要素）"""
+    first_soup = soup.select_one(candidate.css) if candidate.css and soup is not None else None
+    matches = root.xpath(candidate.xpath) if candidate.xpath and root is not None else []
+    return first_soup, (matches[0] if matches else None)
+
+
+def check_page(html: str, page: str) -> List[Dict]:
+    """
+    ページのHTMLに対して、ページの種類のセレクタがどの候補で一致するかを確認する
+
+    要素内で検索するセレクタ（案件タイトルなど）は、親の要素の1件目の中で確認する。
+    XPath のみの候補は lxml がない場合は確認しない。
+
+    Returns:
+        セレクタごとの {'name', 'required', 'matched'（一致した候補の番号、一致しない場合は None）,
+        'candidate', 'count', 'description'}
+    """
+    soup = BeautifulSoup(html, 'lxml' if lxml is not None else 'html.parser')
+    root = lxml.html.fromstring(html) if lxml is not None and html.strip() else None
+    # 要素内の検索に使う、セレクタごとの最初の要素
+    firsts = {}
+    results = []
+    for selector in page_selectors(page):
+        scope_soup, scope_root = firsts.get(selector.scope, (None, None)) if selector.scope else (soup, root)
+        matched, count = None, 0
+        for index in selector.order():
+            found = _count(scope_soup, scope_root, selector.candidates[index])
+            if found:
+                matched, count = index, found
+                break
+        if matched is not None:
+            firsts[selector.name] = _first(scope_soup, scope_root, selector.candidates[matched])
+        results.append({
+            'name': selector.name,
+            'required': selector.required,
+            'matched': matched,
+            'candidate': repr(selector.candidates[matched]) if matched is not None else None,
+            'count': count,
+            'description': selector.description
+        })
+    return results
+
+
+def preflight(html: str, page: str = LIST_PAGE) -> List[Dict]:
+    """
+    ページのHTMLで必須のセレクタが一致するかを確認し、一致した候補を以降の取得で優先する
+
+    Raises:
+        SelectorError: 必須のセレクタがどの候補でも一致しない場合
+    """
+    results = check_page(html, page)
+    missing = []
+    for result in results:
+        if result['matched'] is not None:
+            get_selector(result['name']).use(result['matched'])
+        elif result['required']:
+            missing.append(f"{result['description']}（{result['name']}）")
+        else:
+            logger.info(f"任意の要素が見つかりません: {result['description']}（{result['name']}）")
+    if missing:
+        raise SelectorError(f"ページの要素が見つかりません: {', '.join(missing)}")
+    logger.info(f"セレクタの事前確認に成功しました（{page}）: " +
+                ', '.join(f"{r['name']}={r['count']}" for r in results if r['matched'] is not None))
+    return results
@@ -0,0 +1,108 @@
+"""
+案件詳細ページの並列取得
+
+フィルタリング後の案件の詳細ページを、件数上限つきのスレッドプールで並列に取得する。
+同じホストへの同時接続数とリクエスト開始の最小間隔を制限し（ホストごとの負荷制限）、
+結果は入力したURLの順に返す。ページの取得方法（HTTPセッションなど）は呼び出し側が渡す。
+詳細テーブルの抽出には extractors の抽出処理を使う。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from extractors import Extractor, get_extractor
+
+# 同時に取得するページ数のデフォルト値
+DEFAULT_MAX_WORKERS = 4
+# 同じホストへの同時接続数のデフォルト値
+DEFAULT_MAX_PER_HOST = 2
+# 同じホストへのリクエスト開始の最小間隔（秒）
+DEFAULT_MIN_INTERVAL = 0.5
+
+
+def parse_job_detail(html: str, extractor: Optional[Extractor] = None) -> Dict:
+    """
+    詳細ページのHTMLから詳細情報を取り出す
+
+    Returns:
+        {'detail_description', 'crawled_detail_at'}。詳細テーブルがない場合は空の辞書
+    """
+    return (extractor or get_extractor()).job_detail(html)
+
+
+class HostThrottle:
+    """ホストごとの同時接続数とリクエスト間隔の制限"""
+
+    def __init__(self, max_per_host: int = DEFAULT_MAX_PER_HOST, min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.max_per_host = max(1, max_per_host)
+        self.min_interval = max(0.0, min_interval)
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str):
+        """URLのホストへのリクエスト枠を確保する"""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.max_per_host))
+        with semaphore:
+            # リクエストの開始時刻を予約し、前のリクエストから最小間隔を空ける
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+def fetch_details(urls: List[str], fetch_html: Callable[[str], str],
+                  max_workers: int = DEFAULT_MAX_WORKERS,
+                  throttle: Optional[HostThrottle] = None,
+                  on_done: Optional[Callable[[], None]] = None,
+                  extractor: Optional[Extractor] = None) -> List[Optional[Dict]]:
+    """
+    詳細ページを並列に取得する
+
+    Args:
+        urls: 詳細ページのURL
+        fetch_html: URLからHTMLを取得する関数（タイムアウトは関数側で設定する）
+        max_workers: 同時に取得するページ数の上限
+        throttle: ホストごとの負荷制限（省略時はデフォルト値）
+        on_done: 1件の取得が終わるたびに呼ばれる関数（進捗通知用）
+        extractor: 詳細テーブルの抽出処理（省略時は自動選択）
+
+    Returns:
+        入力と同じ順序の詳細情報のリスト。取得に失敗したURLは None
+    """
+    if not urls:
+        return []
+    throttle = throttle or HostThrottle()
+    extractor = extractor or get_extractor()
+
+    def _fetch(url):
+        try:
+            with throttle.slot(url):
+                html = fetch_html(url)
+            detail = parse_job_detail(html, extractor)
+            if not detail:
+                logger.warning(f"仕事詳細が見つかりませんでした: {url}")
+            return detail
+        except Exception as e:
+            logger.error(f"仕事詳細の取得に失敗: {url} - {str(e)}")
+            return None
+        finally:
+            if on_done:
+                on_done()
+
+    workers = min(max(1, max_workers), len(urls))
+    logger.info(f"仕事詳細を並列に取得します（{len(urls)}件、同時実行数: {workers}）")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # mapは入力順に結果を返す
+        return list(executor.map(_fetch, urls))
@@ -0,0 +1,344 @@
+"""
+HTMLからの案件情報の抽出
+
+案件一覧のカード・詳細テーブル・Vueの埋め込みデータ（#vue-container の data 属性）だけを
+取り出す抽出処理。ページ全体の木構造を作らずに済むよう、複数の実装を切り替えられるようにする。
+
+- soup: BeautifulSoup（html.parser）でページ全体を解析（従来の処理）
+- strainer: SoupStrainer で必要な要素だけを解析（lxml があればパーサーに使う）
+- lxml: lxml.html と XPath で抽出
+- selectolax: selectolax（Lexbor）と CSS セレクタで抽出
+
+lxml と selectolax はインストールされている場合のみ利用できる。
+要素のセレクタは crowdworks_selectors の定義を使い、優先する候補で見つからない場合は
+後続の候補で探す。ブラウザで取得する場合は、extract_*_in_browser で execute_script を
+1回呼び出し、必要な値だけをJSONで受け取る（page_source の転送と解析を省略できる）。
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+from loguru import logger
+
+from crowdworks_selectors import Candidate, Selector, css_candidates, get_selector
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+DEFAULT_BUDGET = "予算未設定"
+DEFAULT_CLIENT = "クライアント名非公開"
+
+# 自動選択の優先順
+_AUTO_ORDER = ('selectolax', 'lxml', 'strainer', 'soup')
+
+
+def _card(title: str, href: str, budget: Optional[str], client: Optional[str],
+          posted_date: Optional[str], base_url: str) -> Dict:
+    """抽出した値から案件情報を作成（Seleniumでの取得と同じ形式）"""
+    return {
+        "title": title.strip(),
+        "url": urljoin(base_url, href),
+        "budget": budget.strip() if budget is not None else DEFAULT_BUDGET,
+        "client": client.strip() if client is not None else DEFAULT_CLIENT,
+        "posted_date": posted_date,
+        "crawled_at": datetime.now().isoformat()
+    }
+
+
+def _detail(lines: List[str]) -> Dict:
+    # 不要な空白行を除き、意味のある改行は保持する
+    return {
+        "detail_description": '\n'.join(lines),
+        "crawled_detail_at": datetime.now().isoformat()
+    }
+
+
+class Extractor:
+    """
+    抽出処理の共通部分
+
+    実装ごとに、HTMLの解析（_parse）・要素の検索（_select）・テキストと属性の取得を定義する。
+    """
+
+    name = ''
+
+    def _parse(self, html: str, candidate: Candidate):
+        """HTMLを解析してルート要素を返す（candidate は解析範囲を絞る場合に使う）"""
+        raise NotImplementedError
+
+    def _select(self, node, candidate: Candidate) -> list:
+        raise NotImplementedError
+
+    def _text(self, node) -> str:
+        raise NotImplementedError
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _strings(self, node) -> List[str]:
+        """要素内の空白でないテキストを前後の空白を除いて返す"""
+        raise NotImplementedError
+
+    def _find_all(self, html: str, selector: Selector) -> list:
+        """
+        候補を順に試し、要素が見つかった候補の要素を返す
+
+        優先する候補以外で見つかった場合は、以降その候補を優先する。
+        """
+        roots = {}
+        for index in selector.order():
+            candidate = selector.candidates[index]
+            if candidate.strain not in roots:
+                roots[candidate.strain] = self._parse(html, candidate)
+            nodes = self._select(roots[candidate.strain], candidate)
+            if nodes:
+                selector.use(index)
+                return nodes
+        return []
+
+    def _find(self, node, selector: Selector):
+        """要素内で候補を順に試し、最初に見つかった要素を返す"""
+        for candidate in selector.ordered():
+            nodes = self._select(node, candidate)
+            if nodes:
+                return nodes[0]
+        return None
+
+    def job_cards(self, html: str, base_url: str) -> List[Dict]:
+        """案件カードから案件情報を取り出す"""
+        title_selector = get_selector('job_title')
+        budget_selector = get_selector('job_budget')
+        client_selector = get_selector('job_client')
+        posted_selector = get_selector('job_posted_date')
+        jobs = []
+        for card in self._find_all(html, get_selector('job_card')):
+            try:
+                title = self._find(card, title_selector)
+                budget = self._find(card, budget_selector)
+                client = self._find(card, client_selector)
+                posted = self._find(card, posted_selector)
+                jobs.append(_card(
+                    self._text(title), self._attr(title, 'href'),
+                    self._text(budget) if budget is not None else None,
+                    self._text(client) if client is not None else None,
+                    self._attr(posted, 'datetime') if posted is not None else None,
+                    base_url
+                ))
+            except Exception as e:
+                logger.error(f"案件データの取得中にエラーが発生: {str(e)}")
+        return jobs
+
+    def job_detail(self, html: str) -> Dict:
+        """詳細テーブルから詳細情報を取り出す（テーブルがない場合は空の辞書）"""
+        tables = self._find_all(html, get_selector('job_detail'))
+        if not tables:
+            return {}
+        return _detail(self._strings(tables[0]))
+
+    def embedded_data(self, html: str) -> Optional[str]:
+        """Vueの初期データ（data 属性の値）を取り出す"""
+        containers = self._find_all(html, get_selector('vue_container'))
+        return self._attr(containers[0], 'data') if containers else None
+
+
+class SoupExtractor(Extractor):
+    """BeautifulSoupでページ全体を解析する"""
+
+    name = 'soup'
+    parser = 'html.parser'
+
+    def _parse(self, html: str, candidate: Candidate):
+        return BeautifulSoup(html, self.parser)
+
+    def _select(self, node, candidate: Candidate) -> list:
+        return node.select(candidate.css) if candidate.css else []
+
+    def _text(self, node) -> str:
+        return node.text
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def _strings(self, node) -> List[str]:
+        return list(node.stripped_strings)
+
+
+def _has_class(class_name: str):
+    """class 属性に class_name を含むかの判定（SoupStrainer は分割前の属性値で判定するため）"""
+    return lambda value: bool(value) and class_name in (value.split() if isinstance(value, str) else value)
+
+
+class StrainedSoupExtractor(SoupExtractor):
+    """SoupStrainer で必要な要素だけを解析する"""
+
+    name = 'strainer'
+    # html.parser より高速な lxml があればパーサーに使う
+    parser = 'lxml' if lxml is not None else 'html.parser'
+
+    def _parse(self, html: str, candidate: Candidate):
+        # 属性で絞れない候補（構造やURLで探す候補）はページ全体を解析する
+        if candidate.strain is None:
+            return BeautifulSoup(html, self.parser)
+        tag, attr, value = candidate.strain
+        strainer = SoupStrainer(tag, attrs={attr: _has_class(value) if attr == 'class' else value})
+        return BeautifulSoup(html, self.parser, parse_only=strainer)
+
+
+class LxmlExtractor(Extractor):
+    """lxml.html と XPath で抽出する"""
+
+    name = 'lxml'
+
+    def _parse(self, html: str, candidate: Candidate):
+        return lxml.html.fromstring(html)
+
+    def _select(self, node, candidate: Candidate) -> list:
+        return node.xpath(candidate.xpath) if candidate.xpath else []
+
+    def _text(self, node) -> str:
+        return node.text_content()
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def _strings(self, node) -> List[str]:
+        return [text.strip() for text in node.xpath('.//text()') if text.strip()]
+
+
+class SelectolaxExtractor(Extractor):
+    """selectolax（Lexbor）と CSS セレクタで抽出する"""
+
+    name = 'selectolax'
+
+    def _parse(self, html: str, candidate: Candidate):
+        return LexborHTMLParser(html)
+
+    def _select(self, node, candidate: Candidate) -> list:
+        return node.css(candidate.css) if candidate.css else []
+
+    def _text(self, node) -> str:
+        return node.text()
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+    def _strings(self, node) -> List[str]:
+        lines = []
+        for child in node.traverse(include_text=True):
+            if child.tag == '-text':
+                text = (child.text_content or '').strip()
+                if text:
+                    lines.append(text)
+        return lines
+
+
+_EXTRACTORS = {
+    'soup': SoupExtractor,
+    'strainer': StrainedSoupExtractor,
+    'lxml': LxmlExtractor,
+    'selectolax': SelectolaxExtractor
+}
+
+_instances: Dict[str, Extractor] = {}
+
+
+def available_extractors() -> List[str]:
+    """利用できる抽出処理の名前"""
+    names = ['soup', 'strainer']
+    if lxml is not None:
+        names.append('lxml')
+    if LexborHTMLParser is not None:
+        names.append('selectolax')
+    return names
+
+
+def get_extractor(name: Optional[str] = None) -> Extractor:
+    """
+    抽出処理を取得する
+
+    Args:
+        name: 'soup' / 'strainer' / 'lxml' / 'selectolax'。省略時または 'auto' の場合は
+            利用できる中で最も高速なもの。利用できない名前の場合も自動選択する
+    """
+    available = available_extractors()
+    if name and name != 'auto' and name not in available:
+        logger.warning(f"抽出処理 {name} は利用できないため自動選択します")
+        name = None
+    if not name or name == 'auto':
+        name = next(candidate for candidate in _AUTO_ORDER if candidate in available)
+    if name not in _instances:
+        _instances[name] = _EXTRACTORS[name]()
+    return _instances[name]
+
+
+# --- ブラウザ内での抽出 ---
+
+# arguments[0] にセレクタ名ごとのCSSセレクタの候補（試す順）を渡す
+_JOB_CARDS_SCRIPT = """
+const selectors = arguments[0];
+const findAll = (root, candidates) => {
+    for (const css of candidates) {
+        const nodes = root.querySelectorAll(css);
+        if (nodes.length) return Array.from(nodes);
+    }
+    return [];
+};
+const find = (root, candidates) => findAll(root, candidates)[0] || null;
+return findAll(document, selectors.job_card).map(card => {
+    const title = find(card, selectors.job_title);
+    const budget = find(card, selectors.job_budget);
+    const client = find(card, selectors.job_client);
+    const posted = find(card, selectors.job_posted_date);
+    return {
+        title: title ? title.textContent : null,
+        href: title ? title.getAttribute('href') : null,
+        budget: budget ? budget.textContent : null,
+        client: client ? client.textContent : null,
+        posted_date: posted ? posted.getAttribute('datetime') : null
+    };
+});
+"""
+
+_JOB_DETAIL_SCRIPT = """
+let table = null;
+for (const css of arguments[0]) {
+    table = document.querySelector(css);
+    if (table) break;
+}
+if (!table) return null;
+const walker = document.createTreeWalker(table, NodeFilter.SHOW_TEXT);
+const lines = [];
+while (walker.nextNode()) {
+    const text = walker.currentNode.textContent.trim();
+    if (text) lines.push(text);
+}
+return lines;
+"""
+
+
+def extract_job_cards_in_browser(driver, base_url: str) -> List[Dict]:
+    """表示中のページの案件カードを execute_script 1回で取り出す"""
+    selectors = {name: css_candidates(name)
+                 for name in ('job_card', 'job_title', 'job_budget', 'job_client', 'job_posted_date')}
+    jobs = []
+    for item in driver.execute_script(_JOB_CARDS_SCRIPT, selectors) or []:
+        if not item.get('title') or not item.get('href'):
+            logger.error("案件データの取得中にエラーが発生: タイトルまたはURLが見つかりません")
+            continue
+        jobs.append(_card(item['title'], item['href'], item.get('budget'), item.get('client'),
+                          item.get('posted_date'), base_url))
+    return jobs
+
+
+def extract_job_detail_in_browser(driver) -> Dict:
+    """表示中のページの詳細テーブルを execute_script 1回で取り出す"""
+    lines = driver.execute_script(_JOB_DETAIL_SCRIPT, css_candidates('job_detail'))
+    return _detail(lines) if lines else {}
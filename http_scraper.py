@@ -0,0 +1,271 @@
+"""
+HTTPによる案件一覧の取得
+
+ブラウザを使わずに requests.Session で検索結果ページを取得し、
+ページに埋め込まれた Vue の初期データ（JSON）から案件を取り出す。
+埋め込みデータが見つからない場合は、Seleniumでの取得と同じ案件カードの
+HTMLセレクタで解析する。出力する案件の形式は CrowdWorksCrawler.scrape_jobs と同じ。
+HTMLの解析には extractors の抽出処理（lxml などの高速な実装）を使う。
+
+ログインが必要な場合は Selenium でログインしたブラウザの Cookie を引き継ぐ。
+"""
+import html as html_lib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlencode, urljoin, urlparse, parse_qsl, urlunparse
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from extractors import Extractor, get_extractor, DEFAULT_BUDGET, DEFAULT_CLIENT
+
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+DEFAULT_TIMEOUT = 15
+DEFAULT_POOL_SIZE = 8
+# 同時に取得する検索結果のページ数のデフォルト値
+DEFAULT_PAGE_WORKERS = 4
+# 取得を打ち切る、取得済みの案件の連続数のデフォルト値
+DEFAULT_STOP_AFTER_KNOWN = 3
+
+
+class HttpScrapingError(Exception):
+    """HTTPでの案件一覧の取得・解析に失敗したことを示す例外"""
+    pass
+
+
+def parse_job_cards(html: str, base_url: str, extractor: Optional[Extractor] = None) -> List[Dict]:
+    """案件カードのHTMLから案件情報を取り出す"""
+    return (extractor or get_extractor()).job_cards(html, base_url)
+
+
+def _find_job_offers(data) -> Optional[list]:
+    """埋め込みデータから案件（job_offers）の配列を探す"""
+    if isinstance(data, dict):
+        offers = data.get('job_offers')
+        if isinstance(offers, list):
+            return offers
+        for value in data.values():
+            offers = _find_job_offers(value)
+            if offers is not None:
+                return offers
+    elif isinstance(data, list):
+        for value in data:
+            offers = _find_job_offers(value)
+            if offers is not None:
+                return offers
+    return None
+
+
+def _format_yen(value) -> str:
+    try:
+        return f"{int(float(value)):,}円"
+    except (TypeError, ValueError):
+        return ''
+
+
+def _format_budget(payment: Dict) -> str:
+    """埋め込みデータの報酬情報を予算の文字列に変換"""
+    if not isinstance(payment, dict):
+        return DEFAULT_BUDGET
+    for kind, prefix in (('fixed_price_payment', ''), ('hourly_payment', '時給 '),
+                         ('task_payment', '単価 '), ('fixed_price_writing_payment', '単価 ')):
+        detail = payment.get(kind)
+        if not isinstance(detail, dict):
+            continue
+        low = _format_yen(detail.get('min_budget') or detail.get('min_hourly_wage') or detail.get('task_price')
+                          or detail.get('article_price'))
+        high = _format_yen(detail.get('max_budget') or detail.get('max_hourly_wage'))
+        if low and high and low != high:
+            return f"{prefix}{low} 〜 {high}"
+        if low or high:
+            return f"{prefix}{low or high}"
+    return DEFAULT_BUDGET
+
+
+def parse_embedded_jobs(html: str, base_url: str, extractor: Optional[Extractor] = None) -> Optional[List[Dict]]:
+    """
+    Vueの初期データ（#vue-container の data 属性）から案件情報を取り出す
+
+    Returns:
+        案件のリスト。埋め込みデータが見つからない場合は None
+    """
+    raw = (extractor or get_extractor()).embedded_data(html)
+    if not raw:
+        return None
+    try:
+        data = json.loads(html_lib.unescape(raw))
+    except ValueError:
+        logger.warning("埋め込みデータのJSON解析に失敗しました")
+        return None
+
+    offers = _find_job_offers(data)
+    if offers is None:
+        return None
+
+    jobs = []
+    for item in offers:
+        offer = item.get('job_offer', item) if isinstance(item, dict) else None
+        if not isinstance(offer, dict) or not offer.get('id') or not offer.get('title'):
+            continue
+        client = item.get('client') or {}
+        jobs.append({
+            "title": str(offer['title']).strip(),
+            "url": urljoin(base_url, f"/public/jobs/{offer['id']}"),
+            "budget": _format_budget(item.get('payment') or {}),
+            "client": (client.get('username') or client.get('name') or DEFAULT_CLIENT)
+            if isinstance(client, dict) else DEFAULT_CLIENT,
+            "posted_date": offer.get('last_released_at') or offer.get('created_at'),
+            "crawled_at": datetime.now().isoformat()
+        })
+    return jobs
+
+
+def parse_job_list(html: str, base_url: str, extractor: Optional[Extractor] = None) -> List[Dict]:
+    """検索結果ページから案件情報を取り出す（埋め込みデータを優先）"""
+    extractor = extractor or get_extractor()
+    jobs = parse_embedded_jobs(html, base_url, extractor)
+    if jobs is None:
+        jobs = parse_job_cards(html, base_url, extractor)
+    return jobs
+
+
+def page_url(search_url: str, page: int) -> str:
+    """検索URLに page パラメータを付けたURLを作成"""
+    parts = urlparse(search_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != 'page']
+    if page > 1:
+        query.append(('page', str(page)))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+class HttpScraper:
+    """接続を使い回す requests.Session による案件一覧の取得"""
+
+    def __init__(self, base_url: str, user_agent: str = DEFAULT_USER_AGENT,
+                 timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE,
+                 extractor: Optional[Extractor] = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.extractor = extractor or get_extractor()
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3'
+        })
+
+    def load_cookies(self, cookies: Iterable[Dict]):
+        """Seleniumの get_cookies() の結果をセッションに引き継ぐ"""
+        count = 0
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+            count += 1
+        logger.info(f"ブラウザのCookieを引き継ぎました: {count}件")
+
+    def get(self, url: str, timeout: Optional[float] = None) -> str:
+        """ページのHTMLを取得"""
+        try:
+            response = self.session.get(url, timeout=timeout or self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise HttpScrapingError(f"ページの取得に失敗しました: {url} - {str(e)}")
+        response.encoding = response.encoding or 'utf-8'
+        return response.text
+
+    def fetch_job_list(self, search_url: str, page: int) -> List[Dict]:
+        """検索結果の1ページ分の案件を取得"""
+        return parse_job_list(self.get(page_url(search_url, page)), self.base_url, self.extractor)
+
+    def scrape_jobs(self, search_url: str, max_items: int,
+                    on_page: Optional[Callable[[int, int], None]] = None,
+                    workers: int = DEFAULT_PAGE_WORKERS,
+                    is_known: Optional[Callable[[Dict], bool]] = None,
+                    stop_after_known: int = DEFAULT_STOP_AFTER_KNOWN) -> List[Dict]:
+        """
+        検索結果を先頭ページから取得する
+
+        1ページ目で1ページあたりの件数を確認した後、必要なページ数（最大 workers ページ）を
+        まとめて並列に取得する。結果はページ順に処理するため、取得順は逐次取得と同じになる。
+
+        Args:
+            search_url: 検索結果のURL（新着順）
+            max_items: 取得する最大件数
+            on_page: ページ取得ごとに (ページ番号, 取得済み件数) を受け取る関数
+            workers: 同時に取得するページ数
+            is_known: 前回までに取得済みの案件かを判定する関数。取得済みの案件は結果に含めず、
+                新着順のため取得済みの案件が stop_after_known 件続いた時点で以降のページは取得しない
+            stop_after_known: 取得を打ち切る、取得済みの案件の連続数
+
+        Raises:
+            HttpScrapingError: 最初のページで案件が見つからない、または取得に失敗した場合
+        """
+        jobs_data = []
+        seen_urls = set()
+        page_size = 0
+        next_page = 1
+        known_streak = 0
+        skipped = 0
+        done = False
+        executor = ThreadPoolExecutor(max_workers=max(1, workers)) if workers > 1 else None
+        try:
+            while not done and len(jobs_data) < max_items:
+                # 1ページ目は単独で取得し、以降は残りの件数に必要なページ数をまとめて取得する
+                if next_page == 1 or executor is None:
+                    wave = [next_page]
+                else:
+                    needed = -(-(max_items - len(jobs_data)) // max(1, page_size))
+                    wave = list(range(next_page, next_page + min(workers, max(1, needed))))
+                if executor is not None and len(wave) > 1:
+                    results = list(executor.map(lambda page: self.fetch_job_list(search_url, page), wave))
+                else:
+                    results = [self.fetch_job_list(search_url, page) for page in wave]
+                next_page = wave[-1] + 1
+
+                for page, page_jobs in zip(wave, results):
+                    if page == 1:
+                        if not page_jobs:
+                            raise HttpScrapingError("検索結果の1ページ目で案件が見つかりませんでした")
+                        page_size = len(page_jobs)
+                    new_jobs = [job for job in page_jobs if job['url'] not in seen_urls]
+                    if not new_jobs:
+                        logger.info("最後のページに到達しました")
+                        done = True
+                        break
+                    for job in new_jobs:
+                        if len(jobs_data) >= max_items:
+                            break
+                        seen_urls.add(job['url'])
+                        if is_known and is_known(job):
+                            skipped += 1
+                            known_streak += 1
+                            if known_streak >= max(1, stop_after_known):
+                                logger.info(f"取得済みの案件が{known_streak}件続いたため取得を終了します")
+                                done = True
+                                break
+                            continue
+                        known_streak = 0
+                        jobs_data.append(job)
+                        logger.info(f"求人情報を取得しました: {job['title']}")
+                    if on_page:
+                        on_page(page, len(jobs_data))
+                    if done or len(jobs_data) >= max_items:
+                        break
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+        logger.info(f"合計{len(jobs_data)}件の案件を取得しました（HTTP、{next_page - 1}ページ取得、"
+                    f"取得済みのため除外: {skipped}件）")
+        return jobs_data
+
+    def close(self):
+        self.session.close()
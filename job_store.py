@@ -0,0 +1,628 @@
+"""
+SQLiteによる案件データストア
+
+クロール結果（jobs_YYYYMMDD_HHMMSS.json / _filtered.json）の内容を1つの
+SQLiteデータベース（WALモード）に保存し、画面表示やクローラーの重複チェックは
+ファイル全体を読み込む代わりにインデックス経由で問い合わせる。
+JSONファイルは従来通り書き出すが、読み込みはこのストアから行う。
+
+テーブル:
+- crawl_runs: クロール実行（1回のクロール = 1組の JSON ファイル）
+- jobs: 案件（クロール実行ごと、元の順序を position で保持）
+- filter_decisions: フィルタリングの判断結果（yes / no と理由）
+- checks: 案件のチェック状態（URL単位）
+- job_url_index: URL → 最新のフィルタリング済み案件の行（詳細表示用）
+- seen_jobs: これまでに取得した案件のURLと最新の投稿日時（クロールの打ち切り判定用）
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+# 最近表示した案件詳細をメモリに保持する件数
+DEFAULT_DETAIL_CACHE_SIZE = 256
+
+# ファイル名からクロール日時を抽出する
+_RUN_KEY_PATTERN = re.compile(r'^jobs_(\d{8})_(\d{6})$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key TEXT NOT NULL UNIQUE,
+    crawled_at TEXT NOT NULL,
+    raw_file TEXT,
+    filtered_file TEXT,
+    job_count INTEGER NOT NULL DEFAULT 0,
+    filtered_count INTEGER NOT NULL DEFAULT 0,
+    filtered_size INTEGER,
+    filtered_mtime REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_runs_crawled_at ON crawl_runs(crawled_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES crawl_runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    url TEXT,
+    title TEXT,
+    posted_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_url ON jobs(url);
+CREATE INDEX IF NOT EXISTS idx_jobs_run_position ON jobs(run_id, position);
+
+CREATE TABLE IF NOT EXISTS filter_decisions (
+    job_id INTEGER PRIMARY KEY REFERENCES jobs(id) ON DELETE CASCADE,
+    decision TEXT NOT NULL,
+    reason TEXT,
+    decided_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_filter_decisions_decision ON filter_decisions(decision);
+
+CREATE TABLE IF NOT EXISTS job_url_index (
+    url TEXT PRIMARY KEY,
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    crawled_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS checks (
+    url TEXT PRIMARY KEY,
+    checked INTEGER NOT NULL,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS seen_jobs (
+    url TEXT PRIMARY KEY,
+    posted_date TEXT,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def run_key_from_path(file_path: str) -> str:
+    """JSONファイルのパスからクロール実行のキー（jobs_YYYYMMDD_HHMMSS）を取得"""
+    name = os.path.basename(str(file_path))
+    for suffix in ('_filtered.json', '.json'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def crawled_at_from_run_key(run_key: str) -> Optional[str]:
+    """キーからクロール日時（YYYY-MM-DD HH:MM:SS）を取得"""
+    match = _RUN_KEY_PATTERN.match(run_key)
+    if not match:
+        return None
+    date_str, time_str = match.groups()
+    return (f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]} "
+            f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:6]}")
+
+
+def _parse_posted_date(value) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+    # タイムゾーンの有無が混在しても比較できるようにそろえる
+    return parsed.replace(tzinfo=None) if parsed.tzinfo is None else parsed.astimezone().replace(tzinfo=None)
+
+
+def is_newer(posted_date, reference) -> bool:
+    """posted_date が reference より新しいか（どちらかが解釈できない場合は False）"""
+    posted, ref = _parse_posted_date(posted_date), _parse_posted_date(reference)
+    return posted is not None and ref is not None and posted > ref
+
+
+def _job_match_key(job: Dict) -> str:
+    """生データと_filtered.jsonの案件を対応付けるキー"""
+    return job.get('url') or json.dumps([job.get('title'), job.get('budget'), job.get('client')],
+                                        ensure_ascii=False)
+
+
+class JobStore:
+    """案件データのSQLiteストア"""
+
+    def __init__(self, db_path, detail_cache_size: int = DEFAULT_DETAIL_CACHE_SIZE):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        # 最近表示した案件詳細のLRU（データ更新の世代が変わったら破棄）
+        self._detail_cache: OrderedDict = OrderedDict()
+        self._detail_cache_size = detail_cache_size
+        self._detail_cache_generation = None
+        self._detail_cache_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """トランザクション付きで接続し、終了時に確実にクローズする"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """WALモードの設定とテーブルの作成"""
+        with self._lock, self._connect() as conn:
+            # クローラー（別プロセス）の書き込み中もアプリから読み込めるようにする
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+            # 以前のバージョンで作成したデータベースに列を追加する
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(crawl_runs)")}
+            for column, column_type in (('filtered_size', 'INTEGER'), ('filtered_mtime', 'REAL')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE crawl_runs ADD COLUMN {column} {column_type}")
+            # 既存のデータベースにURLインデックスがない場合に作成する
+            self._fill_url_index(conn)
+            # 既存のデータベースの案件を取得済みとして登録する
+            if conn.execute("SELECT 1 FROM seen_jobs LIMIT 1").fetchone() is None:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR IGNORE INTO seen_jobs (url, posted_date, first_seen_at, last_seen_at) "
+                    "SELECT url, MAX(posted_date), ?, ? FROM jobs WHERE url IS NOT NULL GROUP BY url",
+                    (now, now)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO store_meta (key, value) "
+                    "SELECT 'seen_watermark', MAX(posted_date) FROM seen_jobs "
+                    "WHERE EXISTS (SELECT 1 FROM seen_jobs WHERE posted_date IS NOT NULL)"
+                )
+
+    @staticmethod
+    def _bump_generation(conn):
+        """データ更新の世代を進める（別プロセスのLRUを無効化するため）"""
+        conn.execute(
+            "INSERT INTO store_meta (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    @staticmethod
+    def _fill_url_index(conn):
+        """URLインデックスに登録されていないURLを最新のフィルタリング済み案件で補完する"""
+        conn.execute("""
+            INSERT INTO job_url_index (url, job_id, crawled_at)
+            SELECT j.url, j.id, MAX(r.crawled_at)
+            FROM jobs j
+            JOIN crawl_runs r ON r.id = j.run_id
+            JOIN filter_decisions d ON d.job_id = j.id
+            WHERE d.decision = 'yes' AND j.url IS NOT NULL
+              AND j.url NOT IN (SELECT url FROM job_url_index)
+            GROUP BY j.url
+        """)
+
+    # --- 書き込み ---
+
+    def record_run(self, raw_file: str, jobs: List[Dict], filtered_jobs: Optional[List[Dict]] = None,
+                   filtered_file: Optional[str] = None):
+        """
+        クロール結果を保存する（同じキーの実行が既にある場合は置き換える）
+
+        Args:
+            raw_file: 生データのJSONファイルパス
+            jobs: 生データの案件リスト
+            filtered_jobs: フィルタリング済みの案件リスト（未実施の場合は None）
+            filtered_file: フィルタリング済みJSONファイルパス（省略時は raw_file から生成）
+        """
+        run_key = run_key_from_path(raw_file)
+        crawled_at = crawled_at_from_run_key(run_key) or time.strftime('%Y-%m-%d %H:%M:%S')
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO crawl_runs (run_key, crawled_at, raw_file, job_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_key) DO UPDATE SET raw_file = excluded.raw_file, "
+                "job_count = excluded.job_count, updated_at = excluded.updated_at",
+                (run_key, crawled_at, str(raw_file), len(jobs), now)
+            )
+            run_id = conn.execute("SELECT id FROM crawl_runs WHERE run_key = ?", (run_key,)).fetchone()['id']
+            conn.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+            conn.executemany(
+                "INSERT INTO jobs (run_id, position, url, title, posted_date, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, position, job.get('url'), job.get('title'), job.get('posted_date'),
+                  json.dumps(job, ensure_ascii=False))
+                 for position, job in enumerate(jobs)]
+            )
+            if filtered_jobs is not None:
+                filtered_file = filtered_file or str(raw_file).replace('.json', '_filtered.json')
+                self._apply_filtered(conn, run_id, filtered_jobs, filtered_file, now)
+            self._fill_url_index(conn)
+            self._mark_seen(conn, jobs, now)
+            self._bump_generation(conn)
+
+    @staticmethod
+    def _mark_seen(conn, jobs: List[Dict], now: float):
+        """案件を取得済みとして登録し、投稿日時の最大値（ウォーターマーク）を更新する"""
+        rows = [(job['url'], job.get('posted_date'), now, now) for job in jobs if job.get('url')]
+        if not rows:
+            return
+        conn.executemany(
+            "INSERT INTO seen_jobs (url, posted_date, first_seen_at, last_seen_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET posted_date = COALESCE(excluded.posted_date, posted_date), "
+            "last_seen_at = excluded.last_seen_at",
+            rows
+        )
+        watermark = conn.execute("SELECT value FROM store_meta WHERE key = 'seen_watermark'").fetchone()
+        newest = watermark['value'] if watermark else None
+        for _, posted_date, _, _ in rows:
+            if posted_date and (newest is None or is_newer(posted_date, newest)):
+                newest = posted_date
+        if newest:
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('seen_watermark', ?)", (newest,))
+
+    def record_filtered(self, raw_file: str, filtered_jobs: List[Dict], filtered_file: Optional[str] = None):
+        """再フィルタリングの結果で判断結果を更新する（実行が未登録の場合は生データから登録）"""
+        run_key = run_key_from_path(raw_file)
+        filtered_file = filtered_file or str(raw_file).replace('.json', '_filtered.json')
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT id FROM crawl_runs WHERE run_key = ?", (run_key,)).fetchone()
+            if row is not None:
+                self._apply_filtered(conn, row['id'], filtered_jobs, filtered_file, time.time())
+                self._fill_url_index(conn)
+                self._bump_generation(conn)
+                return
+        with open(raw_file, 'r', encoding='utf-8') as f:
+            jobs = json.load(f)
+        self.record_run(raw_file, jobs, filtered_jobs, filtered_file)
+
+    @staticmethod
+    def _apply_filtered(conn, run_id: int, filtered_jobs: List[Dict], filtered_file: str, now: float):
+        """フィルタリング済みの案件を yes、それ以外を no として判断結果を置き換える"""
+        filtered_by_key = {_job_match_key(job): job for job in filtered_jobs}
+        rows = conn.execute("SELECT id, position, data FROM jobs WHERE run_id = ? ORDER BY position",
+                            (run_id,)).fetchall()
+        decisions = []
+        matched = set()
+        for row in rows:
+            key = _job_match_key(json.loads(row['data']))
+            filtered_job = filtered_by_key.get(key)
+            if filtered_job is None:
+                decisions.append((row['id'], 'no', None, now))
+                continue
+            matched.add(key)
+            # 詳細情報などフィルタリング後に追加された項目も保存する
+            conn.execute("UPDATE jobs SET data = ? WHERE id = ?",
+                         (json.dumps(filtered_job, ensure_ascii=False), row['id']))
+            decisions.append((row['id'], 'yes', filtered_job.get('gpt_reason'), now))
+
+        # 生データに存在しない案件は末尾に追加する
+        position = len(rows)
+        for key, job in filtered_by_key.items():
+            if key in matched:
+                continue
+            cursor = conn.execute(
+                "INSERT INTO jobs (run_id, position, url, title, posted_date, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, position, job.get('url'), job.get('title'), job.get('posted_date'),
+                 json.dumps(job, ensure_ascii=False))
+            )
+            decisions.append((cursor.lastrowid, 'yes', job.get('gpt_reason'), now))
+            position += 1
+
+        conn.execute("DELETE FROM filter_decisions WHERE job_id IN (SELECT id FROM jobs WHERE run_id = ?)",
+                     (run_id,))
+        conn.executemany(
+            "INSERT INTO filter_decisions (job_id, decision, reason, decided_at) VALUES (?, ?, ?, ?)",
+            decisions
+        )
+        # ファイルのサイズと更新日時を記録し、一覧表示時の変更検知に使う
+        try:
+            stat = os.stat(filtered_file)
+            filtered_size, filtered_mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            filtered_size = filtered_mtime = None
+        conn.execute(
+            "UPDATE crawl_runs SET filtered_file = ?, filtered_count = ?, filtered_size = ?, "
+            "filtered_mtime = ?, updated_at = ? WHERE id = ?",
+            (str(filtered_file), len(filtered_jobs), filtered_size, filtered_mtime, now, run_id)
+        )
+
+        # URLインデックスを更新（より新しいクロール実行の案件がある場合はそちらを優先）
+        conn.execute("DELETE FROM job_url_index WHERE job_id IN (SELECT id FROM jobs WHERE run_id = ?)",
+                     (run_id,))
+        conn.execute("""
+            INSERT INTO job_url_index (url, job_id, crawled_at)
+            SELECT j.url, j.id, r.crawled_at
+            FROM jobs j
+            JOIN crawl_runs r ON r.id = j.run_id
+            JOIN filter_decisions d ON d.job_id = j.id
+            WHERE j.run_id = ? AND d.decision = 'yes' AND j.url IS NOT NULL
+            ORDER BY j.position
+            ON CONFLICT(url) DO UPDATE SET job_id = excluded.job_id, crawled_at = excluded.crawled_at
+            WHERE excluded.crawled_at >= job_url_index.crawled_at
+        """, (run_id,))
+
+    def delete_run(self, run_key: str) -> int:
+        """クロール実行とその案件を削除する"""
+        with self._lock, self._connect() as conn:
+            deleted = conn.execute("DELETE FROM crawl_runs WHERE run_key = ?", (run_key,)).rowcount
+            self._fill_url_index(conn)
+            self._bump_generation(conn)
+            return deleted
+
+    def delete_runs_before(self, crawled_at: str) -> int:
+        """指定日時（YYYY-MM-DD HH:MM:SS）より前のクロール実行を削除する"""
+        with self._lock, self._connect() as conn:
+            deleted = conn.execute("DELETE FROM crawl_runs WHERE crawled_at < ?", (crawled_at,)).rowcount
+            self._fill_url_index(conn)
+            self._bump_generation(conn)
+            return deleted
+
+    def delete_all_runs(self) -> int:
+        """全てのクロール実行と取得済みの案件の記録を削除する（チェック状態は保持）"""
+        with self._lock, self._connect() as conn:
+            deleted = conn.execute("DELETE FROM crawl_runs").rowcount
+            conn.execute("DELETE FROM seen_jobs")
+            conn.execute("DELETE FROM store_meta WHERE key = 'seen_watermark'")
+            self._bump_generation(conn)
+            return deleted
+
+    # --- 読み込み ---
+
+    @staticmethod
+    def _run_info(row) -> Dict:
+        return {
+            'path': row['filtered_file'],
+            'name': os.path.basename(row['filtered_file']),
+            'date': row['crawled_at'],
+            'timestamp': row['run_key'][len('jobs_'):],
+            'job_count': row['filtered_count']
+        }
+
+    def list_runs(self, validate: bool = True) -> List[Dict]:
+        """
+        フィルタリング済みのクロール実行の一覧を新しい順に取得
+
+        validate が True の場合は _filtered.json のサイズと更新日時（os.stat のみ）で
+        カタログを検証し、変更・追加されたファイルだけを読み込み直す。
+        ファイルが削除されたクロール実行は一覧に含めない。
+
+        Returns:
+            get_all_filtered_json_files と同じ形式（path, name, date, timestamp, job_count）
+        """
+        query = ("SELECT run_key, crawled_at, raw_file, filtered_file, filtered_count, filtered_size, "
+                 "filtered_mtime FROM crawl_runs WHERE filtered_file IS NOT NULL ORDER BY crawled_at DESC")
+        with self._connect() as conn:
+            rows = conn.execute(query).fetchall()
+        if not validate:
+            return [self._run_info(row) for row in rows]
+
+        crawled_data_dir = Path(self.db_path).parent
+        on_disk = {}
+        for path in crawled_data_dir.glob('jobs_*_filtered.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            on_disk[run_key_from_path(path)] = (path, stat.st_size, stat.st_mtime)
+
+        catalog = {row['run_key']: row for row in rows}
+        stale = [run_key for run_key, (_, size, mtime) in on_disk.items()
+                 if run_key not in catalog
+                 or catalog[run_key]['filtered_size'] != size
+                 or catalog[run_key]['filtered_mtime'] != mtime]
+        for run_key in stale:
+            self._reload_run(on_disk[run_key][0])
+        if stale:
+            with self._connect() as conn:
+                rows = conn.execute(query).fetchall()
+
+        return [self._run_info(row) for row in rows if row['run_key'] in on_disk]
+
+    def _reload_run(self, filtered_path: Path):
+        """カタログと内容が異なる _filtered.json（と対応する生データ）を読み込み直す"""
+        run_key = run_key_from_path(filtered_path)
+        if not _RUN_KEY_PATTERN.match(run_key):
+            return
+        raw_path = filtered_path.with_name(f'{run_key}.json')
+        try:
+            with open(filtered_path, 'r', encoding='utf-8') as f:
+                filtered_jobs = json.load(f)
+            if raw_path.exists():
+                with open(raw_path, 'r', encoding='utf-8') as f:
+                    jobs = json.load(f)
+            else:
+                jobs = filtered_jobs
+            logger.info(f"変更されたクロール結果を読み込み直します: {filtered_path.name}")
+            self.record_run(str(raw_path), jobs, filtered_jobs, str(filtered_path))
+        except Exception as e:
+            logger.error(f"クロール結果の読み込みに失敗: {filtered_path} - {str(e)}")
+
+    def get_run(self, run_key: str) -> Optional[Dict]:
+        """クロール実行の情報を取得"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT run_key, crawled_at, filtered_file, filtered_count FROM crawl_runs "
+                "WHERE run_key = ? AND filtered_file IS NOT NULL", (run_key,)
+            ).fetchone()
+        return self._run_info(row) if row else None
+
+    def filtered_jobs(self, run_key: str) -> List[Dict]:
+        """クロール実行のフィルタリング済み案件を元の順序で取得"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT j.data FROM jobs j "
+                "JOIN crawl_runs r ON r.id = j.run_id "
+                "JOIN filter_decisions d ON d.job_id = j.id "
+                "WHERE r.run_key = ? AND d.decision = 'yes' ORDER BY j.position",
+                (run_key,)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def latest_filtered_jobs(self) -> List[Dict]:
+        """最新のクロール実行のフィルタリング済み案件を取得"""
+        runs = self.list_runs()
+        if not runs:
+            return []
+        return self.filtered_jobs(run_key_from_path(runs[0]['path']))
+
+    def find_filtered_job_by_url(self, url: str) -> Optional[Dict]:
+        """
+        URLに一致するフィルタリング済み案件を最新のクロール実行から取得
+
+        URLインデックスの主キー検索で取得し、最近表示した案件はメモリのLRUから返す。
+        返り値は呼び出し側で変更してよいコピー。
+        """
+        with self._connect() as conn:
+            generation = conn.execute("SELECT value FROM store_meta WHERE key = 'generation'").fetchone()
+            generation = generation['value'] if generation else None
+            with self._detail_cache_lock:
+                if generation != self._detail_cache_generation:
+                    self._detail_cache.clear()
+                    self._detail_cache_generation = generation
+                job = self._detail_cache.get(url)
+                if job is not None:
+                    self._detail_cache.move_to_end(url)
+                    return dict(job)
+            row = conn.execute(
+                "SELECT j.data FROM job_url_index i JOIN jobs j ON j.id = i.job_id WHERE i.url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = json.loads(row['data'])
+        with self._detail_cache_lock:
+            if generation == self._detail_cache_generation:
+                self._detail_cache[url] = job
+                if len(self._detail_cache) > self._detail_cache_size:
+                    self._detail_cache.popitem(last=False)
+        return dict(job)
+
+    def latest_run_jobs(self) -> Dict[str, Dict]:
+        """最新のクロール実行の全案件をURLをキーとして取得（重複チェック用）"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT j.url, j.data FROM jobs j WHERE j.run_id = ("
+                "SELECT id FROM crawl_runs ORDER BY crawled_at DESC LIMIT 1) AND j.url IS NOT NULL"
+            ).fetchall()
+        return {row['url']: json.loads(row['data']) for row in rows}
+
+    def seen_watermark(self) -> Optional[str]:
+        """これまでに取得した案件の投稿日時の最大値"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM store_meta WHERE key = 'seen_watermark'").fetchone()
+        return row['value'] if row else None
+
+    def is_seen(self, url: str, posted_date: Optional[str] = None) -> bool:
+        """
+        取得済みの案件かを判定する
+
+        URLが取得済みでも、投稿日時が記録より新しい場合（再掲載など）は未取得として扱う。
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT posted_date FROM seen_jobs WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return False
+        return not is_newer(posted_date, row['posted_date'])
+
+    # --- チェック状態 ---
+
+    def load_checks(self) -> Dict[str, Dict]:
+        """全てのチェック状態を checked_jobs.json と同じ形式で取得"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT url, checked, updated_at FROM checks").fetchall()
+        return {row['url']: {'checked': bool(row['checked']), 'updated_at': row['updated_at']}
+                for row in rows}
+
+    def set_checks(self, checks: Dict[str, Dict]):
+        """チェック状態をまとめて保存する"""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO checks (url, checked, updated_at) VALUES (?, ?, ?)",
+                [(url, int(bool(value.get('checked'))), value.get('updated_at'))
+                 for url, value in checks.items()]
+            )
+
+    # --- JSONファイルからの移行 ---
+
+    def import_json_files(self, crawled_data_dir, checks_file=None, force: bool = False) -> int:
+        """
+        既存のJSONファイルをデータベースに取り込む（初回のみ実行）
+
+        Args:
+            crawled_data_dir: クロール結果のJSONファイルのディレクトリ
+            checks_file: チェック状態のファイル（省略時は crawled_data_dir の checked_jobs.json。
+                相対パスの場合も crawled_data_dir の親ディレクトリを基準にする）
+
+        Returns:
+            取り込んだクロール実行の数
+        """
+        checks_file = Path(checks_file) if checks_file else Path(crawled_data_dir) / 'checked_jobs.json'
+        if not checks_file.is_absolute():
+            checks_file = Path(crawled_data_dir).parent / checks_file
+        with self._connect() as conn:
+            imported = conn.execute("SELECT value FROM store_meta WHERE key = 'json_imported'").fetchone()
+            existing = {row['run_key'] for row in conn.execute("SELECT run_key FROM crawl_runs")}
+        if imported and not force:
+            return 0
+
+        count = 0
+        for raw_path in sorted(Path(crawled_data_dir).glob('jobs_*.json')):
+            if raw_path.name.endswith('_filtered.json'):
+                continue
+            run_key = run_key_from_path(raw_path)
+            if run_key in existing or not _RUN_KEY_PATTERN.match(run_key):
+                continue
+            try:
+                with open(raw_path, 'r', encoding='utf-8') as f:
+                    jobs = json.load(f)
+                filtered_path = raw_path.with_name(f'{run_key}_filtered.json')
+                filtered_jobs = None
+                if filtered_path.exists():
+                    with open(filtered_path, 'r', encoding='utf-8') as f:
+                        filtered_jobs = json.load(f)
+                self.record_run(str(raw_path), jobs, filtered_jobs, str(filtered_path))
+                count += 1
+            except Exception as e:
+                logger.error(f"案件データの取り込みに失敗: {raw_path} - {str(e)}")
+
+        if checks_file.exists():
+            try:
+                with open(checks_file, 'r', encoding='utf-8') as f:
+                    checks = json.load(f)
+                # 取り込み済みのチェック状態は上書きしない
+                current = self.load_checks()
+                self.set_checks({url: value for url, value in checks.items() if url not in current})
+            except Exception as e:
+                logger.error(f"チェック状態の取り込みに失敗: {str(e)}")
+
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_imported', ?)",
+                         (str(time.time()),))
+        if count:
+            logger.info(f"JSONファイルから {count} 件のクロール結果を取り込みました")
+        return count
+
+
+# データディレクトリごとのストアインスタンス
+_instances: Dict[str, JobStore] = {}
+_instances_lock = threading.Lock()
+
+
+def get_job_store(data_dir) -> JobStore:
+    """データディレクトリ配下の案件データストアを取得する"""
+    db_path = Path(data_dir) / 'crawled_data' / 'jobs.db'
+    with _instances_lock:
+        store = _instances.get(str(db_path))
+        if store is None:
+            store = JobStore(db_path)
+            _instances[str(db_path)] = store
+        return store
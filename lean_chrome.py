@@ -0,0 +1,133 @@
+"""
+軽量なChromeの設定（リソースのブロック）
+
+クロールと一括応募ではページのDOMだけが必要なため、画像・動画・フォント・
+アクセス解析などの外部スクリプトを読み込まないようにし、不要な機能を無効にする。
+
+- 起動オプション: 小さいウィンドウ、画像の無効化、バックグラウンド通信や翻訳などの機能の無効化
+- pageLoadStrategy=eager: DOMの構築が終わった時点で driver.get から戻る
+  （必要な要素は selenium_waits の待機処理で待つ）
+- CDP の Network.setBlockedURLs: URLのパターンで通信をブロックする
+
+設定（settings.json の lean_browser）で無効にしたり、ブロックする種類を変更できる。
+crawler.py と bulk_apply.py のドライバー作成から共通で利用する。ただし一括応募のブラウザは
+利用者が入力済みのフォームを確認・送信するため、デフォルトでは軽量化しない
+（lean_browser の apply_enabled で有効にした場合も、画像・フォントはブロックしない）。
+"""
+from typing import Dict, List
+
+from loguru import logger
+
+# ブロックするURLのパターン（種類ごと）
+BLOCKED_URL_PATTERNS: Dict[str, List[str]] = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp'],
+    'media': ['*.mp4', '*.webm', '*.ogg', '*.mp3', '*.wav', '*.m4a', '*.mov'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'trackers': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*googleadservices.com*',
+        '*doubleclick.net*', '*googlesyndication.com*', '*connect.facebook.net*',
+        '*facebook.com/tr*', '*analytics.twitter.com*', '*static.ads-twitter.com*',
+        '*bat.bing.com*', '*clarity.ms*', '*hotjar.com*', '*criteo.com*', '*criteo.net*',
+        '*yjtag.yahoo.co.jp*', '*b.yjtag.jp*',
+        '*nr-data.net*', '*js-agent.newrelic.com*', '*sentry.io*', '*cdn.mouseflow.com*'
+    ]
+}
+
+DEFAULT_BLOCK = ('images', 'media', 'fonts', 'trackers')
+# 一括応募のブラウザで表示に必要なため、ブロックしない種類
+APPLY_KEEP = ('images', 'fonts')
+
+# 軽量化の対象（ドライバーを作成する処理）
+CRAWLER = 'crawler'
+APPLY = 'apply'
+DEFAULT_WINDOW_SIZE = '1280,800'
+# 軽量化しない場合のウィンドウサイズ
+FULL_WINDOW_SIZE = '1920,1080'
+
+# 無効にするChromeの機能
+DISABLED_FEATURES = [
+    'Translate', 'OptimizationHints', 'MediaRouter', 'DialMediaRouteProvider',
+    'InterestFeedContentSuggestions', 'AutofillServerCommunication', 'CalculateNativeWinOcclusion',
+    'PrivacySandboxSettings4', 'HeavyAdPrivacyMitigations'
+]
+
+LEAN_ARGUMENTS = [
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-client-side-phishing-detection',
+    '--disable-domain-reliability',
+    '--disable-breakpad',
+    '--metrics-recording-only',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--mute-audio',
+    f"--disable-features={','.join(DISABLED_FEATURES)}"
+]
+
+
+def lean_options(settings: Dict, target: str = CRAWLER) -> Dict:
+    """
+    設定（settings.json の lean_browser）から軽量化のオプションを取得
+
+    Args:
+        target: CRAWLER（デフォルトで軽量化する）または APPLY（apply_enabled を指定した場合のみ軽量化し、
+            画像・フォントはブロックしない）
+    """
+    options = settings.get('lean_browser') or {}
+    block = options.get('block', list(DEFAULT_BLOCK))
+    if target == APPLY:
+        enabled = options.get('apply_enabled', False)
+        block = [kind for kind in block if kind not in APPLY_KEEP]
+        size = FULL_WINDOW_SIZE
+    else:
+        enabled = options.get('enabled', True)
+        size = options.get('window_size', DEFAULT_WINDOW_SIZE)
+    return {
+        'enabled': enabled,
+        'window_size': size,
+        'block_images': 'images' in block,
+        'blocked_urls': blocked_urls(block) + list(options.get('extra_blocked_urls', []))
+    }
+
+
+def blocked_urls(kinds) -> List[str]:
+    """ブロックする種類からURLのパターンを作成"""
+    patterns = []
+    for kind in kinds:
+        if kind not in BLOCKED_URL_PATTERNS:
+            logger.warning(f"不明なブロックの種類です: {kind}")
+            continue
+        patterns.extend(BLOCKED_URL_PATTERNS[kind])
+    return patterns
+
+
+def window_size(options: Dict) -> str:
+    """--window-size に指定する値（軽量化しない場合は従来のサイズ）"""
+    return options['window_size'] if options['enabled'] else FULL_WINDOW_SIZE
+
+
+def apply_lean_options(chrome_options, options: Dict):
+    """Chromeの起動オプションに軽量化の設定を追加する"""
+    if not options['enabled']:
+        return
+    for argument in LEAN_ARGUMENTS:
+        chrome_options.add_argument(argument)
+    if options['block_images']:
+        # 拡張子のないURLの画像も読み込まない
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.page_load_strategy = 'eager'
+
+
+def enable_resource_blocking(driver, options: Dict):
+    """CDP でURLのパターンに一致するリソースの読み込みをブロックする"""
+    if not options['enabled'] or not options['blocked_urls']:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': options['blocked_urls']})
+        logger.info(f"リソースのブロックを有効にしました: {len(options['blocked_urls'])}パターン")
+    except Exception as e:
+        # ブロックできなくてもページの取得はできるため処理を続ける
+        logger.warning(f"リソースのブロックの設定に失敗: {str(e)}")
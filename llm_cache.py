@@ -0,0 +1,197 @@
+"""
+LLMによる案件判断結果の永続キャッシュ
+
+モデル・フィルター条件・判断に影響するリクエストのパラメータ（temperature、バッチ評価か）・
+案件内容（プロンプトに含めるタイトル/予算/クライアント）のハッシュをキーとして、判断結果（decision, reason）をSQLiteに保存する。
+同じ案件を同じ条件で再評価する場合はAPIを呼び出さずに結果を再利用する。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+# キャッシュの最大保持件数（超えた分は最終利用日時の古い順に削除）
+DEFAULT_MAX_ENTRIES = 20000
+# キャッシュの最大保持日数
+DEFAULT_MAX_AGE_DAYS = 30
+
+# SQLiteの1クエリあたりのパラメータ数の上限に合わせた分割サイズ
+_QUERY_CHUNK_SIZE = 500
+
+# 判断に影響する案件の項目（llm_filter の評価プロンプトと事前フィルタが参照する項目）
+JOB_FIELDS = ('title', 'budget', 'client')
+
+
+def _normalize(value) -> str:
+    """比較用に文字列を正規化（全角半角の統一・空白の圧縮）"""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(value))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def job_fingerprint(job: Dict) -> str:
+    """判断に影響する案件内容（JOB_FIELDS の項目）のハッシュ"""
+    payload = json.dumps([_normalize(job.get(field)) for field in JOB_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DecisionCache:
+    """LLM判断結果のSQLiteキャッシュ"""
+
+    def __init__(self, db_path, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_age_days: int = DEFAULT_MAX_AGE_DAYS):
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+        self.evict()
+
+    @contextmanager
+    def _connect(self):
+        """トランザクション付きで接続し、終了時に確実にクローズする"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """テーブルの作成"""
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_decisions (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    decision TEXT NOT NULL,
+                    reason TEXT,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_decisions_last_used ON llm_decisions(last_used_at)")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, job: Dict, params: Optional[Dict] = None) -> str:
+        """
+        モデル・フィルター条件・案件内容からキャッシュキーを生成
+
+        Args:
+            params: 判断に影響するその他のパラメータ（temperature、評価モードなど）
+        """
+        payload = json.dumps([_normalize(model), _normalize(prompt), job_fingerprint(job), params or {}],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """
+        複数のキーに対応する判断結果を取得する
+
+        Returns:
+            キーをキーとした {'decision', 'reason'} の辞書（期限切れ・未登録は含まない）
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        min_created_at = now - self.max_age_days * 86400
+        found = {}
+        try:
+            with self._lock, self._connect() as conn:
+                for i in range(0, len(keys), _QUERY_CHUNK_SIZE):
+                    chunk = keys[i:i + _QUERY_CHUNK_SIZE]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT cache_key, decision, reason FROM llm_decisions "
+                        f"WHERE cache_key IN ({placeholders}) AND created_at >= ?",
+                        (*chunk, min_created_at)
+                    ).fetchall()
+                    for cache_key, decision, reason in rows:
+                        found[cache_key] = {'decision': decision, 'reason': reason or ''}
+                    if rows:
+                        conn.executemany(
+                            "UPDATE llm_decisions SET last_used_at = ? WHERE cache_key = ?",
+                            [(now, row[0]) for row in rows]
+                        )
+        except sqlite3.Error as e:
+            logger.error(f"判断キャッシュの読み込みに失敗: {str(e)}")
+            return {}
+        return found
+
+    def put_many(self, entries: List[Tuple[str, str, str, str]]):
+        """
+        判断結果をまとめて保存する
+
+        Args:
+            entries: (キー, モデル, decision, reason) のリスト
+        """
+        if not entries:
+            return
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO llm_decisions "
+                    "(cache_key, model, decision, reason, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key, model, decision, reason, now, now) for key, model, decision, reason in entries]
+                )
+        except sqlite3.Error as e:
+            logger.error(f"判断キャッシュの保存に失敗: {str(e)}")
+            return
+        self.evict()
+
+    def evict(self) -> int:
+        """期限切れのエントリと上限を超えたエントリを削除し、削除件数を返す"""
+        min_created_at = time.time() - self.max_age_days * 86400
+        try:
+            with self._lock, self._connect() as conn:
+                deleted = conn.execute(
+                    "DELETE FROM llm_decisions WHERE created_at < ?", (min_created_at,)
+                ).rowcount
+                deleted += conn.execute("""
+                    DELETE FROM llm_decisions WHERE cache_key IN (
+                        SELECT cache_key FROM llm_decisions
+                        ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,)).rowcount
+        except sqlite3.Error as e:
+            logger.error(f"判断キャッシュの整理に失敗: {str(e)}")
+            return 0
+        if deleted:
+            logger.info(f"判断キャッシュから {deleted} 件を削除しました")
+        return deleted
+
+
+# データディレクトリごとのキャッシュインスタンス
+_instances: Dict[str, DecisionCache] = {}
+_instances_lock = threading.Lock()
+
+
+def get_decision_cache(data_dir, settings: Optional[Dict] = None) -> DecisionCache:
+    """データディレクトリ配下の判断キャッシュを取得する"""
+    settings = settings or {}
+    db_path = Path(data_dir) / 'crawled_data' / 'llm_decisions.db'
+    with _instances_lock:
+        cache = _instances.get(str(db_path))
+        if cache is None:
+            cache = DecisionCache(
+                db_path,
+                max_entries=int(settings.get('llm_cache_max_entries', DEFAULT_MAX_ENTRIES)),
+                max_age_days=int(settings.get('llm_cache_max_age_days', DEFAULT_MAX_AGE_DAYS))
+            )
+            _instances[str(db_path)] = cache
+        return cache
@@ -0,0 +1,335 @@
+"""
+LLMによる案件フィルタリングエンジン
+
+crawler.py の filter_jobs_by_gpt と refilter.py の再フィルタリング（RefilterManager）から利用する共通処理。
+案件ごとの問い合わせ（またはバッチ単位の問い合わせ）をスレッドプールで
+並列に実行し、結果は入力順に返す。
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from llm_gateway import get_client
+
+# 同時に送信するLLMリクエスト数のデフォルト値
+DEFAULT_MAX_CONCURRENCY = 8
+
+# バッチモードで1案件あたりに割り当てる最大トークン数
+BATCH_TOKENS_PER_JOB = 80
+
+# 有効な判断結果（これ以外の値はキャッシュしない）
+VALID_DECISIONS = ('yes', 'no')
+
+# 案件評価用のシステムプロンプト
+SYSTEM_PROMPT = """あなたは案件の審査員です。与えられた条件に基づいて、案件を評価してください。
+レスポンスは以下のJSON形式で返してください：
+{
+    "decision": "yes" or "no",
+    "reason": "判断理由を1文で"
+}"""
+
+# バッチ評価用のシステムプロンプト
+BATCH_SYSTEM_PROMPT = """あなたは案件の審査員です。与えられた条件に基づいて、複数の案件をそれぞれ評価してください。
+レスポンスは以下のJSON形式で、全ての案件について番号(index)順に返してください：
+{
+    "results": [
+        {"index": 案件番号, "decision": "yes" or "no", "reason": "判断理由を1文で"}
+    ]
+}"""
+
+
+class BatchResponseError(Exception):
+    """バッチ評価のレスポンスが不正または途中で切れていることを示す例外"""
+    pass
+
+
+def create_client(model: str, settings: Dict):
+    """モデルに応じたクライアントを取得（レート制限・再試行はゲートウェイが担当）"""
+    return get_client(model, settings)
+
+
+def build_messages(job: Dict, prompt: str) -> List[Dict]:
+    """1件の案件を評価するためのメッセージを作成"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"""
+以下の案件が条件を満たすか判断してください。条件: {prompt}
+
+案件情報:
+タイトル: {job.get('title', 'N/A')}
+予算: {job.get('budget', 'N/A')}
+クライアント: {job.get('client', 'N/A')}
+            """}
+    ]
+
+
+def evaluate_job(client, job: Dict, config: Dict) -> Dict:
+    """
+    1件の案件をLLMで評価する
+
+    Returns:
+        {'decision': 'yes' | 'no', 'reason': str}
+    """
+    response = client.chat.completions.create(
+        model=config['model'],
+        messages=build_messages(job, config['prompt']),
+        temperature=config.get('temperature', 0),
+        max_tokens=100,
+        response_format={"type": "json_object"}
+    )
+    result = json.loads(response.choices[0].message.content)
+    return {
+        'decision': str(result.get('decision', '')).lower(),
+        'reason': result.get('reason', '')
+    }
+
+
+def build_batch_messages(jobs: List[Dict], prompt: str) -> List[Dict]:
+    """複数の案件をまとめて評価するためのメッセージを作成（案件番号は0始まり）"""
+    job_lines = []
+    for i, job in enumerate(jobs):
+        job_lines.append(f"""[{i}]
+タイトル: {job.get('title', 'N/A')}
+予算: {job.get('budget', 'N/A')}
+クライアント: {job.get('client', 'N/A')}""")
+    jobs_text = '\n\n'.join(job_lines)
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""
+以下の{len(jobs)}件の案件がそれぞれ条件を満たすか判断してください。条件: {prompt}
+
+案件情報:
+{jobs_text}
+            """}
+    ]
+
+
+def evaluate_batch(client, jobs: List[Dict], config: Dict) -> Dict[int, Dict]:
+    """
+    複数の案件を1リクエストでLLMに評価させる
+
+    Returns:
+        バッチ内の案件番号をキーとした {'decision', 'reason'} の辞書。
+        レスポンスに含まれなかった案件はキーが存在しない。
+
+    Raises:
+        BatchResponseError: レスポンスが途中で切れている、またはJSONとして解釈できない場合
+    """
+    response = client.chat.completions.create(
+        model=config['model'],
+        messages=build_batch_messages(jobs, config['prompt']),
+        temperature=config.get('temperature', 0),
+        max_tokens=BATCH_TOKENS_PER_JOB * len(jobs) + 100,
+        response_format={"type": "json_object"}
+    )
+    choice = response.choices[0]
+    if choice.finish_reason == 'length':
+        raise BatchResponseError("レスポンスが最大トークン数で途中終了しました")
+
+    try:
+        payload = json.loads(choice.message.content)
+    except (TypeError, ValueError) as e:
+        raise BatchResponseError(f"レスポンスのJSON解析に失敗: {str(e)}")
+
+    items = payload.get('results') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise BatchResponseError("レスポンスに結果の配列が含まれていません")
+
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get('index'))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(jobs):
+            results[index] = {
+                'decision': str(item.get('decision', '')).lower(),
+                'reason': item.get('reason', '')
+            }
+    return results
+
+
+def _evaluate_batch_with_split(client, batch: List[Tuple[int, Dict]], config: Dict) -> List[Dict]:
+    """
+    バッチを評価し、不正・欠落があった案件は分割して再評価する
+
+    Args:
+        batch: (入力全体での位置, 案件) のリスト
+    """
+    if len(batch) == 1:
+        index, job = batch[0]
+        try:
+            result = evaluate_job(client, job, config)
+            return [{'index': index, 'decision': result['decision'],
+                     'reason': result['reason'], 'error': None}]
+        except Exception as e:
+            logger.error(f"案件 {index + 1} のLLM評価に失敗: {job.get('title', 'N/A')} - {str(e)}")
+            return [{'index': index, 'decision': None, 'reason': '', 'error': str(e)}]
+
+    try:
+        batch_results = evaluate_batch(client, [job for _, job in batch], config)
+    except BatchResponseError as e:
+        logger.warning(f"バッチ評価のレスポンスが不正なため分割して再評価します（{len(batch)}件）: {str(e)}")
+        batch_results = {}
+    except Exception as e:
+        # API自体のエラーは分割しても解決しないため、バッチ全体を失敗として返す
+        logger.error(f"バッチ評価に失敗（{len(batch)}件）: {str(e)}")
+        return [{'index': index, 'decision': None, 'reason': '', 'error': str(e)}
+                for index, _ in batch]
+
+    results = []
+    missing = []
+    for position, (index, job) in enumerate(batch):
+        if position in batch_results:
+            results.append({'index': index, 'error': None, **batch_results[position]})
+        else:
+            missing.append((index, job))
+
+    if missing:
+        if len(missing) < len(batch):
+            logger.warning(f"バッチ評価で結果が欠落した {len(missing)} 件を再評価します")
+            # 一部だけ欠落した場合はその案件のみを再評価
+            results.extend(_evaluate_batch_with_split(client, missing, config))
+        else:
+            middle = len(missing) // 2
+            results.extend(_evaluate_batch_with_split(client, missing[:middle], config))
+            results.extend(_evaluate_batch_with_split(client, missing[middle:], config))
+
+    results.sort(key=lambda r: r['index'])
+    return results
+
+
+def get_batch_size(config: Dict) -> int:
+    """設定からバッチサイズを取得（1以下はバッチモード無効）"""
+    try:
+        return max(1, int(config.get('batch_size', 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def cache_params(config: Dict) -> Dict:
+    """判断キャッシュのキーに含める、判断に影響するパラメータ"""
+    temperature = config.get('temperature', 0)
+    try:
+        temperature = float(temperature or 0)
+    except (TypeError, ValueError):
+        temperature = str(temperature)
+    return {
+        'temperature': temperature,
+        'mode': 'batch' if get_batch_size(config) > 1 else 'single'
+    }
+
+
+def get_max_concurrency(config: Dict, default: Optional[int] = None) -> int:
+    """設定から同時実行数を取得（1未満や不正値はデフォルトに丸める）"""
+    value = config.get('max_concurrency', default or DEFAULT_MAX_CONCURRENCY)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_CONCURRENCY
+    return max(1, value)
+
+
+def _evaluate_items(client, items: List[Tuple[int, Dict]], config: Dict,
+                    max_concurrency: int, on_progress=None) -> List[Dict]:
+    """(入力全体での位置, 案件) のリストを並列に評価し、位置順の結果を返す"""
+    batch_size = get_batch_size(config)
+    if batch_size > 1:
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        max_workers = min(max_concurrency, len(batches))
+        logger.info(f"LLM評価をバッチモードで実行します（{len(batches)}リクエスト、バッチサイズ: {batch_size}、同時実行数: {max_workers}）")
+
+        def _evaluate_batch(batch):
+            batch_result = _evaluate_batch_with_split(client, batch, config)
+            if on_progress:
+                on_progress(len(batch))
+            return batch_result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            batch_results = executor.map(_evaluate_batch, batches)
+            results = [result for batch in batch_results for result in batch]
+        results.sort(key=lambda r: r['index'])
+        return results
+
+    max_workers = min(max_concurrency, len(items))
+
+    def _evaluate(item):
+        index, job = item
+        try:
+            result = evaluate_job(client, job, config)
+            return {'index': index, 'decision': result['decision'],
+                    'reason': result['reason'], 'error': None}
+        except Exception as e:
+            logger.error(f"案件 {index + 1} のLLM評価に失敗: {job.get('title', 'N/A')} - {str(e)}")
+            return {'index': index, 'decision': None, 'reason': '', 'error': str(e)}
+        finally:
+            if on_progress:
+                on_progress(1)
+
+    logger.info(f"LLM評価を並列実行します（同時実行数: {max_workers}）")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # mapは入力順に結果を返す
+        return list(executor.map(_evaluate, items))
+
+
+def filter_jobs_concurrently(client, jobs: List[Dict], config: Dict,
+                             max_concurrency: Optional[int] = None,
+                             cache=None, on_progress=None) -> List[Dict]:
+    """
+    案件リストを並列にLLMで評価する
+
+    batch_size が2以上の場合は、その件数ずつ1リクエストにまとめて評価する。
+    cache が指定された場合は、キャッシュ済みの案件はAPIを呼び出さずに結果を再利用し、
+    新たに評価できた結果のうち、判断が yes / no のものだけをキャッシュに保存する。
+
+    Args:
+        client: OpenAI互換クライアント
+        jobs: 評価対象の案件リスト
+        config: フィルタリング設定（model, prompt, temperature, batch_size）
+        max_concurrency: 同時に送信するリクエスト数の上限
+        cache: llm_cache.DecisionCache（省略可）
+        on_progress: 評価が済んだ件数を受け取る関数（進捗通知用、ワーカースレッドから呼ばれる）
+
+    Returns:
+        入力と同じ順序の評価結果リスト。各要素は
+        {'index', 'decision', 'reason', 'error'} を持ち、
+        失敗した案件は 'error' にエラー内容が入る。
+    """
+    if not jobs:
+        return []
+
+    if max_concurrency is None:
+        max_concurrency = get_max_concurrency(config)
+
+    if cache is None:
+        return _evaluate_items(client, list(enumerate(jobs)), config, max_concurrency, on_progress)
+
+    # キャッシュ済みの判断結果を取得
+    params = cache_params(config)
+    keys = [cache.make_key(config['model'], config['prompt'], job, params) for job in jobs]
+    cached = cache.get_many(keys)
+    results = []
+    pending = []
+    for index, (job, key) in enumerate(zip(jobs, keys)):
+        if key in cached and cached[key]['decision'] in VALID_DECISIONS:
+            results.append({'index': index, 'error': None, **cached[key]})
+        else:
+            pending.append((index, job))
+    logger.info(f"判断キャッシュ: {len(jobs) - len(pending)}/{len(jobs)} 件ヒット")
+    if on_progress and len(pending) < len(jobs):
+        on_progress(len(jobs) - len(pending))
+
+    if pending:
+        evaluated = _evaluate_items(client, pending, config, max_concurrency, on_progress)
+        cache.put_many([
+            (keys[result['index']], config['model'], result['decision'], result['reason'])
+            for result in evaluated if not result['error'] and result['decision'] in VALID_DECISIONS
+        ])
+        results.extend(evaluated)
+
+    results.sort(key=lambda r: r['index'])
+    return results
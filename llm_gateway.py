@@ -0,0 +1,337 @@
+"""
+レート制限を考慮したLLMゲートウェイ
+
+crawler.py / app.py / bulk_apply.py から共通で利用するLLMクライアント。
+- モデルごとにRPM（リクエスト/分）とTPM（トークン/分）のトークンバケットで送信量を制御
+- Retry-After やレート制限ヘッダーを読み取り、ジッター付き指数バックオフで再試行
+- APIキー・接続先ごとにクライアントを共有し、HTTP接続を再利用
+"""
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+from openai import OpenAI, APIConnectionError, APIStatusError, RateLimitError
+
+# DeepSeekのAPIエンドポイント
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+# モデルごとのデフォルトのレート制限（settings.jsonの llm_rate_limits で上書き可能）
+DEFAULT_RATE_LIMITS = {
+    'gpt-4o-mini': {'rpm': 500, 'tpm': 200000},
+    'gpt-4o': {'rpm': 500, 'tpm': 30000},
+    'gpt-4': {'rpm': 500, 'tpm': 10000},
+    'deepseek-chat': {'rpm': 600, 'tpm': 1000000},
+    'text-embedding-3-small': {'rpm': 3000, 'tpm': 1000000},
+}
+# 未知のモデルに適用するレート制限
+FALLBACK_RATE_LIMIT = {'rpm': 500, 'tpm': 30000}
+
+# 再試行の設定
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# 再試行対象のHTTPステータスコード
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1):
+        """指定量のトークンが貯まるまで待機して消費する"""
+        # バケット容量を超える要求は容量分だけ待つ（永久に待たないように）
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    wait = (amount - self.tokens) / self.refill_per_second
+            time.sleep(min(max(wait, 0.01), 5))
+
+    def update_limit(self, per_minute: float):
+        """プロバイダーが返した上限値に合わせてバケットを調整"""
+        with self._lock:
+            if per_minute > 0 and per_minute != self.capacity:
+                self.capacity = per_minute
+                self.refill_per_second = per_minute / 60.0
+                self.tokens = min(self.tokens, self.capacity)
+
+    def sync_remaining(self, remaining: float):
+        """プロバイダー側の残量の方が少なければそれに合わせる"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+
+    def pause(self, seconds: float):
+        """指定秒数の間、払い出しを停止する"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class ModelLimiter:
+    """1モデル分のRPM/TPMバケット"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+
+    def acquire(self, estimated_tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(estimated_tokens)
+
+    def pause(self, seconds: float):
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
+
+    def update_from_headers(self, headers):
+        """x-ratelimit-* ヘッダーからバケットを調整"""
+        if not headers:
+            return
+        for bucket, kind in ((self.requests, 'requests'), (self.tokens, 'tokens')):
+            limit = _parse_float(headers.get(f'x-ratelimit-limit-{kind}'))
+            if limit:
+                bucket.update_limit(limit)
+            remaining = _parse_float(headers.get(f'x-ratelimit-remaining-{kind}'))
+            if remaining is not None:
+                bucket.sync_remaining(remaining)
+                if remaining <= 0:
+                    reset = _parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+                    if reset:
+                        bucket.pause(reset)
+
+
+def _parse_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_duration(value) -> Optional[float]:
+    """'1s', '6m0s', '20ms' 形式の時間を秒に変換"""
+    if not value:
+        return None
+    seconds = 0.0
+    matched = False
+    for amount, unit in re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', str(value)):
+        matched = True
+        amount = float(amount)
+        seconds += {'ms': amount / 1000, 'h': amount * 3600, 'm': amount * 60, 's': amount}[unit]
+    if not matched:
+        return _parse_float(value)
+    return seconds
+
+
+def _parse_retry_after(headers) -> Optional[float]:
+    """Retry-After / retry-after-ms ヘッダーから待機秒数を取得"""
+    if not headers:
+        return None
+    retry_after_ms = _parse_float(headers.get('retry-after-ms'))
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    seconds = _parse_float(retry_after)
+    if seconds is not None:
+        return seconds
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _estimate_tokens(kwargs: Dict) -> int:
+    """送信メッセージと最大出力トークンから消費トークン数を概算"""
+    chars = sum(len(str(message.get('content', ''))) for message in kwargs.get('messages', []))
+    # 日本語は1文字あたり約1トークンとして保守的に見積もる
+    return chars + int(kwargs.get('max_tokens') or 500)
+
+
+def _estimate_embedding_tokens(kwargs: Dict) -> int:
+    """埋め込み対象テキストから消費トークン数を概算"""
+    texts = kwargs.get('input', [])
+    if isinstance(texts, str):
+        texts = [texts]
+    return sum(len(str(text)) for text in texts)
+
+
+class _ChatCompletions:
+    """client.chat.completions と同じ呼び出し方を提供するラッパー"""
+
+    def __init__(self, gateway: 'LLMGateway', client: OpenAI):
+        self._gateway = gateway
+        self._client = client
+
+    def create(self, **kwargs):
+        return self._gateway.chat_completion(self._client, **kwargs)
+
+
+class _Chat:
+    def __init__(self, completions: _ChatCompletions):
+        self.completions = completions
+
+
+class _Embeddings:
+    """client.embeddings と同じ呼び出し方を提供するラッパー"""
+
+    def __init__(self, gateway: 'LLMGateway', client: OpenAI):
+        self._gateway = gateway
+        self._client = client
+
+    def create(self, **kwargs):
+        return self._gateway.embedding(self._client, **kwargs)
+
+
+class GatewayClient:
+    """OpenAIクライアント互換のインターフェースでゲートウェイ経由の呼び出しを行う"""
+
+    def __init__(self, gateway: 'LLMGateway', client: OpenAI):
+        self.chat = _Chat(_ChatCompletions(gateway, client))
+        self.embeddings = _Embeddings(gateway, client)
+
+
+class LLMGateway:
+    """レート制限と再試行を一元管理するLLMゲートウェイ"""
+
+    def __init__(self, rate_limits: Optional[Dict] = None, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        if rate_limits:
+            self.rate_limits.update(rate_limits)
+        self.max_retries = max_retries
+        self._clients: Dict[Tuple[str, Optional[str]], OpenAI] = {}
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, settings: Dict):
+        """settings.jsonのレート制限・再試行設定を反映"""
+        with self._lock:
+            for model, limits in (settings.get('llm_rate_limits') or {}).items():
+                if self.rate_limits.get(model) != limits:
+                    self.rate_limits[model] = limits
+                    self._limiters.pop(model, None)
+            if settings.get('llm_max_retries') is not None:
+                self.max_retries = int(settings['llm_max_retries'])
+
+    def get_client(self, model: str, settings: Dict) -> GatewayClient:
+        """モデルに応じたクライアントを取得（同じAPIキー・接続先では共有）"""
+        if model == 'deepseek-chat':
+            api_key, base_url = settings.get('deepseek_api_key', ''), DEEPSEEK_BASE_URL
+        else:
+            api_key, base_url = settings.get('api_key', ''), None
+
+        key = (api_key, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # 再試行はゲートウェイ側で行うため、SDKの自動再試行は無効化する
+                client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+                self._clients[key] = client
+        return GatewayClient(self, client)
+
+    def _get_limiter(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limits = self.rate_limits.get(model, FALLBACK_RATE_LIMIT)
+                limiter = ModelLimiter(limits['rpm'], limits['tpm'])
+                self._limiters[model] = limiter
+            return limiter
+
+    def _backoff(self, attempt: int) -> float:
+        """フルジッター付きの指数バックオフ時間"""
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    def chat_completion(self, client: OpenAI, **kwargs):
+        """レート制限を守りながらチャット補完を実行し、一時的なエラーは再試行する"""
+        return self._request(
+            kwargs.get('model', ''), _estimate_tokens(kwargs),
+            lambda: client.chat.completions.with_raw_response.create(**kwargs)
+        )
+
+    def embedding(self, client: OpenAI, **kwargs):
+        """レート制限を守りながら埋め込みを取得し、一時的なエラーは再試行する"""
+        return self._request(
+            kwargs.get('model', ''), _estimate_embedding_tokens(kwargs),
+            lambda: client.embeddings.with_raw_response.create(**kwargs)
+        )
+
+    def _request(self, model: str, estimated_tokens: int, send):
+        """トークンバケットで待機してからリクエストを送信し、必要に応じて再試行する"""
+        limiter = self._get_limiter(model)
+
+        attempt = 0
+        while True:
+            limiter.acquire(estimated_tokens)
+            try:
+                raw = send()
+                limiter.update_from_headers(raw.headers)
+                return raw.parse()
+            except (RateLimitError, APIStatusError, APIConnectionError) as e:
+                status_code = getattr(e, 'status_code', None)
+                response = getattr(e, 'response', None)
+                headers = response.headers if response is not None else None
+
+                retryable = isinstance(e, APIConnectionError) or status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt >= self.max_retries:
+                    raise
+
+                limiter.update_from_headers(headers)
+                retry_after = _parse_retry_after(headers)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if status_code == 429:
+                    # 他のスレッドも含めてモデル単位で送信を止める
+                    limiter.pause(delay)
+                attempt += 1
+                logger.warning(
+                    f"LLMリクエストを再試行します（{attempt}/{self.max_retries}、{delay:.1f}秒後）: "
+                    f"model={model}, status={status_code}, error={str(e)}"
+                )
+                time.sleep(delay)
+
+
+# シングルトンインスタンス
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_gateway(settings: Optional[Dict] = None) -> LLMGateway:
+    """LLMGatewayのシングルトンインスタンスを取得"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = LLMGateway()
+    if settings:
+        _instance.configure(settings)
+    return _instance
+
+
+def get_client(model: str, settings: Dict) -> GatewayClient:
+    """ゲートウェイ経由のクライアントを取得（便利関数）"""
+    return get_gateway(settings).get_client(model, settings)
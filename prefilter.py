@@ -0,0 +1,185 @@
+"""
+LLM呼び出し前のルールベース事前フィルタ
+
+予算文字列を数値（円）に変換し、キーワード・正規表現・予算範囲のルールで
+判定できる案件をLLMに送る前に振り分ける。判定できなかった案件のみLLMで評価する。
+
+設定例（prompt.txt の "prefilter" キー）:
+{
+    "enabled": true,
+    "min_budget": 10000,
+    "max_budget": null,
+    "min_hourly_budget": 1500,
+    "exclude_unknown_budget": false,
+    "deny_keywords": ["データ入力", "アンケート"],
+    "deny_patterns": ["^【急募】.*1件"],
+    "allow_keywords": ["Python"],
+    "allow_patterns": []
+}
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# 予算の単位ごとの倍率
+_UNIT_MULTIPLIERS = {'万円': 10000, '千円': 1000, '円': 1, '万': 10000, '千': 1000, '': 1}
+# 金額表記（例: 10,000円 / 1.5万円 / 5千円 / ¥10,000 / ¥1.5万）
+_AMOUNT_PATTERN = re.compile(r'(¥\s*)?(\d+(?:\.\d+)?)\s*(万円|千円|円|万|千)?')
+# 範囲の区切り（〜 ~ －など）
+_RANGE_SEPARATOR = re.compile(r'[〜~～\-−－]')
+
+
+def parse_budget(budget: Optional[str]) -> Dict:
+    """
+    scrape_jobs が取得した予算文字列を数値に変換する
+
+    Returns:
+        {'min': int | None, 'max': int | None, 'type': 'fixed' | 'hourly' | 'unknown'}
+        例: "固定報酬制 10,000円 〜 50,000円" -> {'min': 10000, 'max': 50000, 'type': 'fixed'}
+            "〜 5,000円" -> {'min': None, 'max': 5000, ...}
+            "¥10,000 - ¥20,000" -> {'min': 10000, 'max': 20000, 'type': 'fixed'}
+            "予算未設定" -> {'min': None, 'max': None, 'type': 'unknown'}
+    """
+    result = {'min': None, 'max': None, 'type': 'unknown'}
+    if not budget:
+        return result
+
+    # NFKC で全角の ￥ は ¥ になる
+    text = unicodedata.normalize('NFKC', budget).replace(',', '')
+    if '時間' in text:
+        result['type'] = 'hourly'
+    elif '固定' in text or '円' in text or '¥' in text:
+        result['type'] = 'fixed'
+
+    amounts = []
+    for match in _AMOUNT_PATTERN.finditer(text):
+        yen, amount, unit = match.group(1), match.group(2), match.group(3) or ''
+        # 円記号も「円」もない数字（件数・時間など）は金額として扱わない
+        if not yen and not unit.endswith('円'):
+            continue
+        value = int(float(amount) * _UNIT_MULTIPLIERS[unit])
+        amounts.append((match.start(), value))
+    if not amounts:
+        return result
+
+    separator = _RANGE_SEPARATOR.search(text)
+    if len(amounts) >= 2:
+        result['min'] = min(value for _, value in amounts)
+        result['max'] = max(value for _, value in amounts)
+    elif separator and separator.start() < amounts[0][0]:
+        # "〜 5,000円" のように上限のみ
+        result['max'] = amounts[0][1]
+    elif separator and separator.start() > amounts[0][0]:
+        # "5,000円 〜" のように下限のみ
+        result['min'] = amounts[0][1]
+    else:
+        result['min'] = result['max'] = amounts[0][1]
+    return result
+
+
+class PreFilter:
+    """キーワード・正規表現・予算範囲で案件を振り分けるルールセット"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        self.enabled = bool(config.get('enabled', bool(config)))
+        self.min_budget = config.get('min_budget')
+        self.max_budget = config.get('max_budget')
+        # 時間単価制の案件には別の範囲を適用する
+        self.min_hourly_budget = config.get('min_hourly_budget')
+        self.max_hourly_budget = config.get('max_hourly_budget')
+        self.exclude_unknown_budget = bool(config.get('exclude_unknown_budget', False))
+        self.deny_keywords = [self._normalize(k) for k in config.get('deny_keywords', []) if k]
+        self.allow_keywords = [self._normalize(k) for k in config.get('allow_keywords', []) if k]
+        self.deny_patterns = self._compile(config.get('deny_patterns', []))
+        self.allow_patterns = self._compile(config.get('allow_patterns', []))
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return unicodedata.normalize('NFKC', str(text)).lower()
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> List[Tuple[str, re.Pattern]]:
+        compiled = []
+        for pattern in patterns:
+            try:
+                compiled.append((pattern, re.compile(pattern, re.IGNORECASE)))
+            except re.error as e:
+                logger.error(f"事前フィルタの正規表現が不正です: {pattern} - {str(e)}")
+        return compiled
+
+    def evaluate(self, job: Dict) -> Optional[Tuple[str, str, str]]:
+        """
+        1件の案件をルールで判定する
+
+        Returns:
+            判定できた場合は (decision, ルール名, 理由)、判定できない場合は None
+        """
+        title = job.get('title', '')
+        normalized_title = self._normalize(title)
+
+        for keyword in self.deny_keywords:
+            if keyword in normalized_title:
+                return 'no', f'deny_keyword:{keyword}', f'除外キーワード「{keyword}」を含むため'
+        for pattern, regex in self.deny_patterns:
+            if regex.search(title):
+                return 'no', f'deny_pattern:{pattern}', f'除外パターン「{pattern}」に一致するため'
+
+        budget = parse_budget(job.get('budget'))
+        if budget['min'] is None and budget['max'] is None:
+            if self.exclude_unknown_budget:
+                return 'no', 'unknown_budget', '予算が未設定のため'
+        else:
+            # 上限が下限値に届かない、または下限が上限値を超える場合は範囲外
+            upper = budget['max'] if budget['max'] is not None else budget['min']
+            lower = budget['min'] if budget['min'] is not None else budget['max']
+            if budget['type'] == 'hourly':
+                min_budget, max_budget, prefix = self.min_hourly_budget, self.max_hourly_budget, 'hourly_'
+            else:
+                min_budget, max_budget, prefix = self.min_budget, self.max_budget, ''
+            if min_budget is not None and upper < min_budget:
+                return 'no', f'{prefix}min_budget', f'予算（上限{upper:,}円）が{min_budget:,}円未満のため'
+            if max_budget is not None and lower > max_budget:
+                return 'no', f'{prefix}max_budget', f'予算（下限{lower:,}円）が{max_budget:,}円を超えるため'
+
+        for keyword in self.allow_keywords:
+            if keyword in normalized_title:
+                return 'yes', f'allow_keyword:{keyword}', f'採用キーワード「{keyword}」を含むため'
+        for pattern, regex in self.allow_patterns:
+            if regex.search(title):
+                return 'yes', f'allow_pattern:{pattern}', f'採用パターン「{pattern}」に一致するため'
+
+        return None
+
+    def apply(self, jobs: List[Dict]) -> Tuple[List[Dict], List[Dict], Dict[str, int]]:
+        """
+        案件リストにルールを適用する
+
+        Returns:
+            (ルールで採用された案件, LLMでの判定が必要な案件, ルールごとの判定件数)
+            除外された案件はどちらのリストにも含まれない。
+        """
+        if not self.enabled:
+            return [], list(jobs), {}
+
+        accepted = []
+        remaining = []
+        stats: Dict[str, int] = {}
+        for job in jobs:
+            decision = self.evaluate(job)
+            if decision is None:
+                remaining.append(job)
+                continue
+            result, rule, reason = decision
+            stats[rule] = stats.get(rule, 0) + 1
+            if result == 'yes':
+                job['gpt_reason'] = reason
+                accepted.append(job)
+
+        decided = len(jobs) - len(remaining)
+        logger.info(f"事前フィルタ: {decided}/{len(jobs)} 件をルールで判定（採用 {len(accepted)} 件、LLM判定へ {len(remaining)} 件）")
+        for rule, count in sorted(stats.items(), key=lambda item: -item[1]):
+            logger.info(f"  ルール {rule}: {count} 件")
+        return accepted, remaining, stats
@@ -0,0 +1,479 @@
+"""
+過去の案件データのバックグラウンド再フィルタリング
+
+再フィルタリングをジョブIDつきのバックグラウンドジョブとして実行する。
+複数のファイルを同時実行数の上限つきで並列に処理し、ファイルごとの進捗を
+購読者（SSE）に配信する。ジョブの状態は crawled_data/refilter_jobs/ に保存し、
+アプリの再起動などで中断した場合は未処理のファイルから再開できる。
+同じ _filtered.json と評価メタデータを書き換えるため、同時に実行できるジョブは1つのみ。
+終了したジョブの状態は保持期間を過ぎると削除する。
+
+差分モードでは案件ごとの評価メタデータ（条件のハッシュ・モデル・評価日時）を
+crawled_data/eval_meta/ に保存し、内容や条件が変わった案件だけを再評価する。
+_filtered.json は採用される案件が変わった場合のみ書き換える。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from queue import Queue
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from llm_cache import get_decision_cache, job_fingerprint
+from job_store import get_job_store
+from llm_filter import DEFAULT_MAX_CONCURRENCY, create_client, filter_jobs_concurrently, get_max_concurrency
+from prefilter import PreFilter
+
+# 同時に処理するファイル数のデフォルト値
+DEFAULT_MAX_FILE_CONCURRENCY = 2
+
+# 終了状態
+FINISHED_STATUSES = ('completed', 'failed')
+
+# 終了したジョブの状態ファイルを保持する日数
+DEFAULT_STATE_RETENTION_DAYS = 7
+
+
+def list_raw_files(crawled_data_dir) -> List[str]:
+    """再フィルタリング対象の生データファイル（*_filtered.json 以外）を古い順に取得"""
+    raw_files = [str(path) for path in Path(crawled_data_dir).glob('jobs_*.json')
+                 if not path.name.endswith('_filtered.json')]
+    return sorted(raw_files)
+
+
+def write_json_atomic(path: str, data):
+    """一時ファイルに書き込んでから置き換える（中断時に壊れたファイルを残さない）"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_refilter_config(filter_prompt: str, model: str, prompt_config: Dict) -> Dict:
+    """再フィルタリング用の設定（バッチサイズや同時実行数はprompt.txtの設定を引き継ぐ）"""
+    return {
+        'model': model,
+        'prompt': filter_prompt,
+        'temperature': 0,
+        'max_tokens': 100,
+        'batch_size': prompt_config.get('batch_size', 1),
+        'max_concurrency': prompt_config.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
+    }
+
+
+def refilter_file(raw_file: str, client, config: Dict, prefilter: PreFilter,
+                  cache=None, max_concurrency: Optional[int] = None, store=None) -> int:
+    """
+    1つの生データファイルを再フィルタリングし、_filtered.json を書き換える
+
+    store（job_store.JobStore）が指定された場合は判断結果をストアにも反映する。
+
+    Returns:
+        フィルタリング後の案件数
+    """
+    with open(raw_file, 'r', encoding='utf-8') as f:
+        jobs = json.load(f)
+
+    # ルールで判定できる案件はLLMに送らずに振り分ける
+    accepted_jobs, llm_jobs, _ = prefilter.apply(jobs)
+    selected = {id(job) for job in accepted_jobs}
+
+    results = filter_jobs_concurrently(client, llm_jobs, config, max_concurrency, cache=cache)
+    for job, result in zip(llm_jobs, results):
+        if result['error']:
+            logger.error(f"案件フィルタリング中にエラー: {result['error']}")
+            # エラーの場合は安全のため含める
+            selected.add(id(job))
+        elif result['decision'] == 'yes':
+            job['gpt_reason'] = result['reason']
+            selected.add(id(job))
+    filtered_jobs = [job for job in jobs if id(job) in selected]
+
+    write_json_atomic(raw_file.replace('.json', '_filtered.json'), filtered_jobs)
+    if store is not None:
+        store.record_filtered(raw_file, filtered_jobs)
+    return len(filtered_jobs)
+
+
+def criteria_hash(config: Dict, prefilter_config: Optional[Dict]) -> str:
+    """判断条件（モデル・フィルター条件・事前フィルタのルール）のハッシュ"""
+    payload = json.dumps([config['model'], config['prompt'], prefilter_config or {}],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _job_key(job: Dict) -> str:
+    """ファイル内で案件を識別するキー（URLがない場合は内容のハッシュ）"""
+    return job.get('url') or job_fingerprint(job)
+
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def refilter_file_incremental(raw_file: str, client, config: Dict, prefilter: PreFilter,
+                              prefilter_config: Optional[Dict], meta_dir,
+                              cache=None, max_concurrency: Optional[int] = None,
+                              store=None) -> Tuple[int, Dict]:
+    """
+    前回の評価から変わった案件のみを再評価し、採用案件が変わった場合のみ _filtered.json を書き換える
+
+    Returns:
+        (フィルタリング後の案件数, {'evaluated', 'reused', 'rewritten', 'skipped'})
+    """
+    filtered_file = raw_file.replace('.json', '_filtered.json')
+    meta_path = Path(meta_dir) / os.path.basename(raw_file)
+    meta = _load_json(meta_path, {})
+    current_hash = criteria_hash(config, prefilter_config)
+    raw_stat = os.stat(raw_file)
+    file_signature = [raw_stat.st_size, raw_stat.st_mtime]
+
+    # 生データも条件も前回から変わっていなければファイルを開かずに終了
+    if (meta.get('file_signature') == file_signature and meta.get('criteria_hash') == current_hash
+            and os.path.exists(filtered_file)):
+        return meta.get('filtered_count', 0), {'evaluated': 0, 'reused': meta.get('job_count', 0),
+                                               'rewritten': False, 'skipped': True}
+
+    with open(raw_file, 'r', encoding='utf-8') as f:
+        jobs = json.load(f)
+
+    previous = meta.get('jobs', {})
+    evaluations = {}
+    pending = []
+    for job in jobs:
+        key = _job_key(job)
+        entry = previous.get(key)
+        if (entry and entry.get('input_hash') == job_fingerprint(job)
+                and entry.get('criteria_hash') == current_hash):
+            evaluations[key] = entry
+        else:
+            pending.append(job)
+
+    now = time.time()
+
+    def _record(job, decision, reason):
+        evaluations[_job_key(job)] = {
+            'input_hash': job_fingerprint(job),
+            'criteria_hash': current_hash,
+            'model': config['model'],
+            'evaluated_at': now,
+            'decision': decision,
+            'reason': reason
+        }
+
+    # 変更された案件のみ事前フィルタとLLMで評価する
+    errored = set()
+    if pending:
+        accepted_jobs, llm_jobs, _ = prefilter.apply(pending)
+        accepted_ids = {id(job) for job in accepted_jobs}
+        llm_ids = {id(job) for job in llm_jobs}
+        for job in pending:
+            if id(job) in accepted_ids:
+                _record(job, 'yes', job.get('gpt_reason', ''))
+            elif id(job) not in llm_ids:
+                _record(job, 'no', '')
+        results = filter_jobs_concurrently(client, llm_jobs, config, max_concurrency, cache=cache)
+        for job, result in zip(llm_jobs, results):
+            if result['error']:
+                logger.error(f"案件フィルタリング中にエラー: {result['error']}")
+                # エラーの場合は安全のため含め、次回再評価する
+                errored.add(_job_key(job))
+            else:
+                _record(job, result['decision'], result['reason'])
+
+    filtered_jobs = []
+    for job in jobs:
+        key = _job_key(job)
+        entry = evaluations.get(key)
+        if key in errored:
+            filtered_jobs.append(job)
+        elif entry and entry['decision'] == 'yes':
+            if entry.get('reason'):
+                job['gpt_reason'] = entry['reason']
+            filtered_jobs.append(job)
+
+    # 採用される案件の集合が変わった場合のみ書き換える
+    previous_filtered = _load_json(filtered_file, None)
+    rewritten = (previous_filtered is None
+                 or [_job_key(job) for job in previous_filtered] != [_job_key(job) for job in filtered_jobs])
+    if rewritten:
+        write_json_atomic(filtered_file, filtered_jobs)
+        if store is not None:
+            store.record_filtered(raw_file, filtered_jobs)
+
+    os.makedirs(meta_dir, exist_ok=True)
+    write_json_atomic(str(meta_path), {
+        # 評価エラーが残る場合は次回もファイルを開いて再評価する
+        'file_signature': file_signature if not errored else None,
+        'criteria_hash': current_hash,
+        'job_count': len(jobs),
+        'filtered_count': len(filtered_jobs),
+        'jobs': evaluations
+    })
+    return len(filtered_jobs), {'evaluated': len(pending), 'reused': len(jobs) - len(pending),
+                                'rewritten': rewritten, 'skipped': False}
+
+
+def prune_eval_meta(meta_dir, raw_files: List[str]):
+    """削除された生データファイルの評価メタデータを削除する"""
+    names = {os.path.basename(raw_file) for raw_file in raw_files}
+    for path in Path(meta_dir).glob('jobs_*.json'):
+        if path.name not in names:
+            path.unlink(missing_ok=True)
+
+
+class RefilterManager:
+    """再フィルタリングジョブの実行・状態保存・進捗配信を管理する"""
+
+    def __init__(self, data_dir, retention_days: float = DEFAULT_STATE_RETENTION_DAYS):
+        self.data_dir = Path(data_dir)
+        self.retention_days = retention_days
+        self.crawled_data_dir = self.data_dir / 'crawled_data'
+        self.state_dir = self.crawled_data_dir / 'refilter_jobs'
+        self.meta_dir = self.crawled_data_dir / 'eval_meta'
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._jobs: Dict[str, Dict] = {}
+        self._subscribers: Dict[str, List[Queue]] = {}
+        # このプロセスで実行中のジョブID
+        self._running = set()
+        self._lock = threading.Lock()
+        self._load_states()
+        with self._lock:
+            self._prune_states()
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.state_dir / f'{job_id}.json'
+
+    def _load_states(self):
+        """保存済みのジョブ状態を読み込む"""
+        for path in self.state_dir.glob('*.json'):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self._jobs[state['job_id']] = state
+            except Exception as e:
+                logger.error(f"再フィルタリングジョブの状態の読み込みに失敗: {path} - {str(e)}")
+
+    def _save_state(self, state: Dict):
+        write_json_atomic(str(self._state_path(state['job_id'])), state)
+
+    def _prune_states(self):
+        """保持期間を過ぎた終了済みジョブの状態を削除する（ロック内で呼び出す）"""
+        expires_at = time.time() - self.retention_days * 86400
+        expired = [job_id for job_id, state in self._jobs.items()
+                   if state['status'] in FINISHED_STATUSES and job_id not in self._running
+                   and state.get('updated_at', 0) < expires_at]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._subscribers.pop(job_id, None)
+            self._state_path(job_id).unlink(missing_ok=True)
+        if expired:
+            logger.info(f"古い再フィルタリングジョブの状態を {len(expired)} 件削除しました")
+
+    def _snapshot(self, state: Dict) -> Dict:
+        """進捗イベント用の状態（ファイル一覧を除く）"""
+        return {
+            'job_id': state['job_id'],
+            'status': state['status'],
+            'total_files': len(state['files']),
+            'processed_files': len(state['completed_files']) + len(state['failed_files']),
+            'failed_files': len(state['failed_files']),
+            'total_filtered': sum(state['completed_files'].values()),
+            'message': state.get('message', ''),
+            'completed': state['status'] in FINISHED_STATUSES
+        }
+
+    def _publish(self, state: Dict, **extra):
+        """状態を保存し、購読者に進捗を配信する（ロック内で呼び出す）"""
+        state['updated_at'] = time.time()
+        self._save_state(state)
+        event = {**self._snapshot(state), **extra}
+        for queue in self._subscribers.get(state['job_id'], []):
+            queue.put(event)
+
+    def start(self, filter_prompt: str, model: str, settings: Dict, prompt_config: Dict,
+              incremental: bool = True) -> Optional[str]:
+        """
+        再フィルタリングジョブを開始し、ジョブIDを返す（処理はバックグラウンドで実行）
+
+        incremental が True の場合は前回から変わった案件のみを再評価する。
+        実行中のジョブがある場合は開始せずに None を返す（実行中のジョブは current で取得）。
+        """
+        job_id = uuid.uuid4().hex
+        state = {
+            'job_id': job_id,
+            'status': 'pending',
+            'filter_prompt': filter_prompt,
+            'model': model,
+            'incremental': incremental,
+            'files': list_raw_files(self.crawled_data_dir),
+            'completed_files': {},
+            'failed_files': {},
+            'message': '',
+            'created_at': time.time(),
+            'updated_at': time.time()
+        }
+        with self._lock:
+            if self._running:
+                return None
+            self._prune_states()
+            self._jobs[job_id] = state
+            self._running.add(job_id)
+            self._save_state(state)
+        self._launch(job_id, settings, prompt_config)
+        return job_id
+
+    def current(self) -> Optional[str]:
+        """実行中のジョブID"""
+        with self._lock:
+            return next(iter(self._running), None)
+
+    def resume(self, job_id: str, settings: Dict, prompt_config: Dict) -> bool:
+        """中断したジョブを未処理のファイルから再開する（他のジョブの実行中は再開しない）"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None or state['status'] == 'completed' or self._running:
+                return False
+            # 失敗したファイルも再試行の対象にする
+            state['failed_files'] = {}
+            self._running.add(job_id)
+        self._launch(job_id, settings, prompt_config)
+        return True
+
+    def resume_interrupted(self, settings: Dict, prompt_config: Dict) -> List[str]:
+        """
+        前回の起動時に終了しなかったジョブを再開する
+
+        同時に実行できるのは1つのため、最後に更新されたジョブのみを再開し、
+        それ以外は失敗として終了させる（resume で個別に再開できる）。
+        """
+        with self._lock:
+            interrupted = sorted((state for state in self._jobs.values()
+                                  if state['status'] in ('pending', 'running')),
+                                 key=lambda state: state.get('updated_at', 0), reverse=True)
+            for state in interrupted[1:]:
+                state['status'] = 'failed'
+                state['message'] = '再フィルタリングが中断されました。'
+                self._publish(state)
+        job_ids = [state['job_id'] for state in interrupted[:1]]
+        for job_id in job_ids:
+            logger.info(f"中断された再フィルタリングジョブを再開します: {job_id}")
+            self.resume(job_id, settings, prompt_config)
+        return job_ids
+
+    def _launch(self, job_id: str, settings: Dict, prompt_config: Dict):
+        threading.Thread(target=self._run, args=(job_id, settings, prompt_config), daemon=True).start()
+
+    def _run(self, job_id: str, settings: Dict, prompt_config: Dict):
+        with self._lock:
+            state = self._jobs[job_id]
+            state['status'] = 'running'
+            pending_files = [f for f in state['files'] if f not in state['completed_files']]
+            self._publish(state)
+
+        try:
+            config = build_refilter_config(state['filter_prompt'], state['model'], prompt_config)
+            client = create_client(state['model'], settings)
+            cache = get_decision_cache(self.data_dir, settings)
+            prefilter = PreFilter(prompt_config.get('prefilter'))
+            store = get_job_store(self.data_dir)
+
+            # ファイル単位の並列数とファイル内の並列数の積が全体の上限を超えないようにする
+            max_concurrency = get_max_concurrency(config, settings.get('llm_max_concurrency'))
+            file_workers = max(1, min(int(prompt_config.get('refilter_file_concurrency', DEFAULT_MAX_FILE_CONCURRENCY)),
+                                      len(pending_files) or 1, max_concurrency))
+            per_file_concurrency = max(1, max_concurrency // file_workers)
+            logger.info(f"再フィルタリングジョブ {job_id} を開始: {len(pending_files)} ファイル"
+                        f"（ファイル並列数: {file_workers}、ファイル内の同時実行数: {per_file_concurrency}）")
+
+            incremental = state.get('incremental', False)
+            if incremental:
+                prune_eval_meta(self.meta_dir, state['files'])
+
+            def _process(raw_file):
+                if incremental:
+                    return refilter_file_incremental(raw_file, client, config, prefilter,
+                                                     prompt_config.get('prefilter'), self.meta_dir,
+                                                     cache, per_file_concurrency, store)
+                return refilter_file(raw_file, client, config, prefilter, cache,
+                                     per_file_concurrency, store), {}
+
+            with ThreadPoolExecutor(max_workers=file_workers) as executor:
+                futures = {executor.submit(_process, raw_file): raw_file for raw_file in pending_files}
+                for future in as_completed(futures):
+                    raw_file = futures[future]
+                    file_name = os.path.basename(raw_file)
+                    try:
+                        filtered, file_stats = future.result()
+                        with self._lock:
+                            state['completed_files'][raw_file] = filtered
+                            self._publish(state, file=file_name, filtered=filtered, **file_stats)
+                    except Exception as e:
+                        logger.error(f"ファイル {raw_file} の再フィルタリング中にエラー: {str(e)}")
+                        with self._lock:
+                            state['failed_files'][raw_file] = str(e)
+                            self._publish(state, file=file_name, error=str(e))
+
+            with self._lock:
+                state['status'] = 'completed'
+                state['message'] = f"再フィルタリングが完了しました。{sum(state['completed_files'].values())}件の案件がフィルタリングされました。"
+                if state['failed_files']:
+                    state['message'] += f"（{len(state['failed_files'])}ファイルでエラー）"
+                self._running.discard(job_id)
+                self._publish(state)
+            logger.info(f"再フィルタリングジョブ {job_id} が完了しました")
+        except Exception as e:
+            logger.error(f"再フィルタリングジョブ {job_id} でエラー: {str(e)}")
+            with self._lock:
+                state['status'] = 'failed'
+                state['message'] = f"再フィルタリングに失敗しました: {str(e)}"
+                self._running.discard(job_id)
+                self._publish(state)
+
+    def get_status(self, job_id: str) -> Optional[Dict]:
+        """ジョブの現在の状態を取得"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            return self._snapshot(state) if state else None
+
+    def subscribe(self, job_id: str) -> Optional[Queue]:
+        """進捗イベントを受け取るキューを登録する（最初に現在の状態が入る）"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None:
+                return None
+            queue = Queue()
+            queue.put(self._snapshot(state))
+            self._subscribers.setdefault(job_id, []).append(queue)
+            return queue
+
+    def unsubscribe(self, job_id: str, queue: Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+
+
+# データディレクトリごとのマネージャーインスタンス
+_instances: Dict[str, RefilterManager] = {}
+_instances_lock = threading.Lock()
+
+
+def get_refilter_manager(data_dir) -> RefilterManager:
+    """データディレクトリの再フィルタリングマネージャーを取得する"""
+    with _instances_lock:
+        manager = _instances.get(str(data_dir))
+        if manager is None:
+            manager = RefilterManager(data_dir)
+            _instances[str(data_dir)] = manager
+        return manager
@@ -0,0 +1,204 @@
+"""
+Seleniumの待機処理
+
+固定の time.sleep の代わりに、各処理の完了条件（要素の表示、URLの変化、
+通信の収束など）を WebDriverWait で待つ。待機にかかった時間は記録し、
+処理の終わりに集計をログに出力できる。
+
+サイトへの負荷を抑えたい場合は、politeness_pause で処理間の最小間隔を設定する
+（待機が終わった時点で間隔を満たしていれば待たない）。
+crawler.py と bulk_apply.py から共通で利用する。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# 待機時間の上限のデフォルト値（秒）
+DEFAULT_TIMEOUT = 20
+# 通信が収束したとみなすまでの無通信時間（秒）
+DEFAULT_IDLE_TIME = 0.5
+# 条件を確認する間隔（秒）
+POLL_FREQUENCY = 0.1
+
+Locator = Tuple[str, str]
+
+
+class WaitStats:
+    """待機時間の記録"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, timed_out: bool = False):
+        with self._lock:
+            entry = self._stats.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            if timed_out:
+                entry['timeouts'] += 1
+
+    def summary(self) -> Dict[str, Dict]:
+        """待機の種類ごとの回数・合計・最大・タイムアウト回数"""
+        with self._lock:
+            return {name: {**entry, 'total': round(entry['total'], 2), 'max': round(entry['max'], 2)}
+                    for name, entry in self._stats.items()}
+
+    def log_summary(self):
+        for name, entry in self.summary().items():
+            logger.info(f"待機時間 [{name}]: {entry['count']}回, 合計 {entry['total']}秒, "
+                        f"最大 {entry['max']}秒, タイムアウト {entry['timeouts']}回")
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+wait_stats = WaitStats()
+
+
+@contextmanager
+def _timed(name: str):
+    started = time.monotonic()
+    try:
+        yield
+    except TimeoutException:
+        elapsed = time.monotonic() - started
+        wait_stats.record(name, elapsed, timed_out=True)
+        logger.warning(f"待機がタイムアウトしました [{name}]: {elapsed:.2f}秒")
+        raise
+    elapsed = time.monotonic() - started
+    wait_stats.record(name, elapsed)
+    logger.debug(f"待機 [{name}]: {elapsed:.2f}秒")
+
+
+def _wait(driver, timeout: float) -> WebDriverWait:
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY)
+
+
+# document.readyState の段階（後の段階ほど大きい）
+_READY_STATES = {'loading': 0, 'interactive': 1, 'complete': 2}
+
+
+def wait_for_document_ready(driver, timeout: float = DEFAULT_TIMEOUT, name: str = 'document_ready',
+                            state: str = 'complete'):
+    """
+    document.readyState が state 以降の段階になるまで待つ
+
+    Args:
+        state: 'complete'（画像などのリソースを含めて読み込み済み）または 'interactive'（DOMの構築済み）。
+            pageLoadStrategy=eager のページで complete を待つと、リソースの読み込みを待たない効果がなくなる
+    """
+    target = _READY_STATES[state]
+    with _timed(name):
+        _wait(driver, timeout).until(
+            lambda d: _READY_STATES.get(d.execute_script("return document.readyState"), 0) >= target
+        )
+
+
+def wait_for_element(driver, locator: Locator, timeout: float = DEFAULT_TIMEOUT,
+                     clickable: bool = False, name: Optional[str] = None):
+    """要素が存在する（clickable の場合はクリックできる）まで待ち、要素を返す"""
+    condition = EC.element_to_be_clickable(locator) if clickable else EC.presence_of_element_located(locator)
+    with _timed(name or f"element:{locator[1]}"):
+        return _wait(driver, timeout).until(condition)
+
+
+def wait_for_any_element(driver, locators: Sequence[Locator], timeout: float = DEFAULT_TIMEOUT,
+                         name: str = 'any_element'):
+    """
+    いずれかの要素が存在するまで待つ（候補ごとに待ち時間を重ねない）
+
+    Returns:
+        (見つかった要素, その locator)
+    """
+    def _find(d):
+        for locator in locators:
+            elements = d.find_elements(*locator)
+            if elements:
+                return elements[0], locator
+        return False
+
+    with _timed(name):
+        return _wait(driver, timeout).until(_find)
+
+
+def wait_for_elements(driver, locator: Locator, timeout: float = DEFAULT_TIMEOUT,
+                      name: Optional[str] = None) -> List:
+    """要素が1つ以上描画されるまで待ち、要素のリストを返す"""
+    with _timed(name or f"elements:{locator[1]}"):
+        return _wait(driver, timeout).until(EC.presence_of_all_elements_located(locator))
+
+
+def wait_for_staleness(driver, element, timeout: float = DEFAULT_TIMEOUT, name: str = 'staleness'):
+    """要素がDOMから外れる（ページが切り替わる）まで待つ"""
+    with _timed(name):
+        _wait(driver, timeout).until(EC.staleness_of(element))
+
+
+def wait_for_content_change(driver, element, timeout: float = DEFAULT_TIMEOUT, name: str = 'content_change'):
+    """
+    要素がDOMから外れるか、要素のテキストが変わるまで待つ
+
+    Vue などで要素が再利用され、ページ遷移後も同じ要素が残る場合に使う。
+    """
+    previous_text = element.text
+
+    def _changed(d):
+        try:
+            return element.text != previous_text
+        except StaleElementReferenceException:
+            return True
+
+    with _timed(name):
+        _wait(driver, timeout).until(_changed)
+
+
+def wait_for_url_change(driver, previous_url: str, timeout: float = DEFAULT_TIMEOUT, name: str = 'url_change'):
+    """URLが previous_url から変わるまで待つ"""
+    with _timed(name):
+        _wait(driver, timeout).until(EC.url_changes(previous_url))
+
+
+def wait_for_network_idle(driver, idle_time: float = DEFAULT_IDLE_TIME, timeout: float = DEFAULT_TIMEOUT,
+                          name: str = 'network_idle'):
+    """
+    ページの読み込みが完了し、新しいリソースの取得が idle_time 秒間発生しなくなるまで待つ
+
+    Resource Timing のエントリ数の変化で通信の有無を判定する。
+    """
+    state = {'count': -1, 'since': time.monotonic()}
+
+    def _idle(d):
+        ready, count = d.execute_script(
+            "return [document.readyState, performance.getEntriesByType('resource').length];"
+        )
+        now = time.monotonic()
+        if ready != 'complete' or count != state['count']:
+            state['count'] = count
+            state['since'] = now
+            return False
+        return now - state['since'] >= idle_time
+
+    with _timed(name):
+        _wait(driver, timeout).until(_idle)
+
+
+def politeness_pause(started_at: float, min_interval: float):
+    """
+    処理の開始から min_interval 秒が経つまで待つ（サイトへの負荷を抑えるための最小間隔）
+
+    Args:
+        started_at: 処理の開始時刻（time.monotonic() の値）
+        min_interval: 最小間隔（0以下の場合は待たない）
+    """
+    remaining = min_interval - (time.monotonic() - started_at)
+    if remaining > 0:
+        time.sleep(remaining)
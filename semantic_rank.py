@@ -0,0 +1,191 @@
+"""
+埋め込みベクトルによる案件の事前ランキング
+
+案件のタイトル・詳細をまとめて埋め込み、フィルター条件と自己紹介文との
+コサイン類似度を1回の行列演算で計算する。上位K件または閾値以上の案件のみを
+LLMフィルタリングに渡すことで、大量のクロール結果でもチャット呼び出しを減らす。
+
+埋め込みバックエンド:
+- hashing: 文字n-gramをハッシュしたTF-IDFベクトル（オフライン・追加依存なし）
+- openai: OpenAIの埋め込みAPI（llm_gateway経由）
+
+設定例（prompt.txt の "semantic_rank" キー）:
+{
+    "enabled": true,
+    "backend": "hashing",
+    "top_k": 50,
+    "threshold": null,
+    "prompt_weight": 0.7
+}
+"""
+import unicodedata
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+# ハッシュ埋め込みの次元数
+DEFAULT_HASHING_DIM = 4096
+# OpenAI埋め込みのデフォルトモデルと1リクエストあたりの件数
+DEFAULT_EMBEDDING_MODEL = 'text-embedding-3-small'
+EMBEDDING_BATCH_SIZE = 64
+
+
+def job_to_text(job: Dict) -> str:
+    """埋め込み対象のテキストを案件から作成"""
+    parts = [job.get('title', ''), job.get('detail_description') or job.get('description') or '']
+    return '\n'.join(part for part in parts if part)
+
+
+class HashingEmbedder:
+    """文字n-gramのハッシュによるTF-IDF埋め込み（日本語向けに単語分割を使わない）"""
+
+    name = 'hashing'
+
+    def __init__(self, dim: int = DEFAULT_HASHING_DIM, ngram_range: Tuple[int, int] = (2, 3)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.idf = None
+
+    def _counts(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = unicodedata.normalize('NFKC', text or '').lower()
+            indices = []
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(text) - n + 1):
+                    gram = text[i:i + n]
+                    if not gram.strip():
+                        continue
+                    # Pythonのhash()はプロセスごとに変わるためcrc32を使用
+                    indices.append(zlib.crc32(gram.encode('utf-8')) % self.dim)
+            if indices:
+                np.add.at(matrix[row], np.asarray(indices, dtype=np.int64), 1.0)
+        return matrix
+
+    def fit(self, texts: List[str]):
+        """コーパス（今回の案件群）から文書頻度を求めIDFを設定する"""
+        counts = self._counts(texts)
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = self._counts(texts)
+        # 出現回数はサブリニアに抑える
+        np.log1p(matrix, out=matrix)
+        if self.idf is not None:
+            matrix *= self.idf
+        return _l2_normalize(matrix)
+
+
+class OpenAIEmbedder:
+    """OpenAIの埋め込みAPIを使用するバックエンド"""
+
+    name = 'openai'
+
+    def __init__(self, settings: Dict, model: str = DEFAULT_EMBEDDING_MODEL):
+        from llm_gateway import get_client
+        self.model = model
+        self.client = get_client(model, settings)
+
+    def fit(self, texts: List[str]):
+        return self
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = [text or ' ' for text in texts[i:i + EMBEDDING_BATCH_SIZE]]
+            response = self.client.embeddings.create(model=self.model, input=batch)
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return _l2_normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def create_embedder(config: Dict, settings: Dict):
+    """設定に応じた埋め込みバックエンドを作成（APIが使えない場合はハッシュ埋め込み）"""
+    backend = config.get('backend', 'hashing')
+    if backend == 'openai' and settings.get('api_key'):
+        try:
+            return OpenAIEmbedder(settings, config.get('embedding_model', DEFAULT_EMBEDDING_MODEL))
+        except Exception as e:
+            logger.warning(f"OpenAI埋め込みを利用できないためハッシュ埋め込みを使用します: {str(e)}")
+    return HashingEmbedder(dim=int(config.get('dim', DEFAULT_HASHING_DIM)))
+
+
+def embeddings_path(base_filename: str) -> str:
+    """クロール結果ファイルに対応する埋め込みベクトルの保存先"""
+    return base_filename.replace('.json', '_embeddings.npy')
+
+
+def rank_jobs(jobs: List[Dict], config: Dict, settings: Dict,
+              base_filename: Optional[str] = None) -> List[Dict]:
+    """
+    フィルター条件と自己紹介文との類似度で案件を絞り込む
+
+    Args:
+        jobs: 案件リスト
+        config: semantic_rank の設定（enabled, backend, top_k, threshold, prompt_weight）
+        settings: 設定（filter_prompt / self_introduction / APIキー）
+        base_filename: クロール結果ファイル名（指定時は埋め込みを .npy で保存）
+
+    Returns:
+        上位K件・閾値以上の案件（元の順序を維持）。各案件に 'semantic_score' を付与する。
+    """
+    if not config or not config.get('enabled', False) or not jobs:
+        return jobs
+
+    prompt = config.get('prompt') or settings.get('filter_prompt', '')
+    self_intro = settings.get('self_introduction', '')
+    if not prompt and not self_intro:
+        logger.warning("フィルター条件と自己紹介文が空のため、セマンティック事前ランキングをスキップします")
+        return jobs
+
+    try:
+        embedder = create_embedder(config, settings)
+        texts = [job_to_text(job) for job in jobs]
+        embedder.fit(texts)
+        job_vectors = embedder.embed(texts)
+        query_vectors = embedder.embed([prompt, self_intro])
+
+        if base_filename:
+            np.save(embeddings_path(base_filename), job_vectors)
+
+        # (案件数, 2) の類似度行列を1回の行列積で計算
+        similarities = job_vectors @ query_vectors.T
+        prompt_weight = float(config.get('prompt_weight', 0.7))
+        if not prompt:
+            prompt_weight = 0.0
+        elif not self_intro:
+            prompt_weight = 1.0
+        scores = prompt_weight * similarities[:, 0] + (1 - prompt_weight) * similarities[:, 1]
+    except Exception as e:
+        # ランキングは最適化のための段階なので、失敗時は全件をLLMに渡す
+        logger.error(f"セマンティック事前ランキングに失敗したため全件を対象にします: {str(e)}")
+        return jobs
+
+    keep = np.ones(len(jobs), dtype=bool)
+    threshold = config.get('threshold')
+    if threshold is not None:
+        keep &= scores >= float(threshold)
+    top_k = config.get('top_k')
+    if top_k is not None and int(top_k) < int(keep.sum()):
+        candidates = np.flatnonzero(keep)
+        best = candidates[np.argsort(-scores[candidates], kind='stable')[:int(top_k)]]
+        keep = np.zeros(len(jobs), dtype=bool)
+        keep[best] = True
+
+    ranked_jobs = []
+    for job, score, selected in zip(jobs, scores, keep):
+        job['semantic_score'] = round(float(score), 4)
+        if selected:
+            ranked_jobs.append(job)
+
+    logger.info(f"セマンティック事前ランキング（{embedder.name}）: {len(ranked_jobs)}/{len(jobs)} 件をLLMフィルタリングの対象にしました")
+    return ranked_jobs
@@ -313,6 +313,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
                 return response.json();
             })
+            .then(data => {
+                // クロールはバックグラウンドで実行されるため、終了を待って結果を取得する
+                if (data.job_id && typeof waitForCrawlJob === 'function') {
+                    return waitForCrawlJob(data.job_id);
+                }
+                return data;
+            })
             .then(data => {
                 // ダミープログレスを停止
                 if (progressInterval) {
@@ -0,0 +1,221 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import pytest
+
+import auth_cache
+from auth_cache import TokenVerificationError, TokenVerifier, decode_claims, verify_hs256
+
+SECRET = 'test-secret'
+NOW = 1_700_000_000
+
+
+def _segment(data) -> str:
+    raw = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _token(claims, secret=SECRET, alg='HS256') -> str:
+    signing_input = f"{_segment({'alg': alg, 'typ': 'JWT'})}.{_segment(claims)}"
+    signature = hmac.new(secret.encode('utf-8'), signing_input.encode('ascii'), hashlib.sha256).digest()
+    return f"{signing_input}.{_segment(signature)}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {'value': NOW}
+    monkeypatch.setattr(auth_cache.time, 'time', lambda: now['value'])
+    return now
+
+
+def _claims(**extra):
+    return {'sub': 'user-1', 'email': 'a@example.com', 'exp': NOW + 3600, **extra}
+
+
+def test_verify_hs256_accepts_valid_token(clock):
+    claims = verify_hs256(_token(_claims()), SECRET)
+    assert claims['sub'] == 'user-1'
+    assert decode_claims(_token(_claims()))['exp'] == NOW + 3600
+
+
+def test_verify_hs256_rejects_bad_signature(clock):
+    with pytest.raises(TokenVerificationError, match='署名'):
+        verify_hs256(_token(_claims(), secret='other-secret'), SECRET)
+    # ペイロードだけを書き換えたトークン
+    header, _, signature = _token(_claims()).split('.')
+    tampered = f"{header}.{_segment(_claims(sub='admin'))}.{signature}"
+    with pytest.raises(TokenVerificationError, match='署名'):
+        verify_hs256(tampered, SECRET)
+
+
+@pytest.mark.parametrize('alg', ['none', 'HS512', 'RS256'])
+def test_verify_hs256_rejects_other_algorithms(clock, alg):
+    header = _segment({'alg': alg, 'typ': 'JWT'})
+    unsigned = f"{header}.{_segment(_claims())}."
+    with pytest.raises(TokenVerificationError, match='アルゴリズム'):
+        verify_hs256(unsigned, SECRET)
+    with pytest.raises(TokenVerificationError):
+        verify_hs256(_token(_claims(), alg=alg), SECRET)
+
+
+@pytest.mark.parametrize('token', ['', 'abc', 'a.b', 'a.b.c.d', '!!!.###.$$$'])
+def test_verify_hs256_rejects_malformed_tokens(clock, token):
+    with pytest.raises(TokenVerificationError, match='形式'):
+        verify_hs256(token, SECRET)
+
+
+def test_verify_hs256_expiry_and_leeway(clock):
+    token = _token(_claims(exp=NOW))
+    clock['value'] = NOW + 30
+    assert verify_hs256(token, SECRET, leeway=30)['sub'] == 'user-1'
+    clock['value'] = NOW + 31
+    with pytest.raises(TokenVerificationError, match='有効期限'):
+        verify_hs256(token, SECRET, leeway=30)
+    with pytest.raises(TokenVerificationError, match='有効期限'):
+        verify_hs256(_token({'sub': 'user-1'}), SECRET)
+
+
+def test_local_verification_builds_user(clock):
+    verifier = TokenVerifier(lambda token: pytest.fail('fetch_user must not be called'), jwt_secret=SECRET)
+    user = verifier.verify(_token(_claims(user_metadata={'name': 'A'})))
+    assert (user.id, user.email, user.user_metadata) == ('user-1', 'a@example.com', {'name': 'A'})
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(_token(_claims(), secret='other-secret'))
+    with pytest.raises(TokenVerificationError):
+        verifier.verify('')
+
+
+def test_cached_result_expires_at_token_exp(clock):
+    calls = []
+
+    def fetch_user(token):
+        calls.append(token)
+        return {'id': 'user-1'}
+
+    verifier = TokenVerifier(fetch_user, max_ttl=300)
+    token = _token(_claims(exp=NOW + 60))
+    assert verifier.verify(token) == {'id': 'user-1'}
+    clock['value'] = NOW + 59
+    verifier.verify(token)
+    assert len(calls) == 1
+    # max_ttl（300秒）より前でも exp を過ぎたら問い合わせ直す
+    clock['value'] = NOW + 60
+    verifier.verify(token)
+    assert len(calls) == 2
+
+
+def test_cached_result_expires_after_max_ttl(clock):
+    calls = []
+    verifier = TokenVerifier(lambda token: calls.append(token) or {'id': 'user-1'}, max_ttl=300)
+    token = _token(_claims())
+    verifier.verify(token)
+    clock['value'] = NOW + 299
+    verifier.verify(token)
+    clock['value'] = NOW + 300
+    verifier.verify(token)
+    assert len(calls) == 2
+
+
+def test_invalid_session_is_not_cached(clock):
+    results = [None, {'id': 'user-1'}]
+    verifier = TokenVerifier(lambda token: results.pop(0))
+    token = _token(_claims())
+    with pytest.raises(TokenVerificationError, match='無効なセッション'):
+        verifier.verify(token)
+    assert verifier.verify(token) == {'id': 'user-1'}
+
+
+def test_invalidate(clock):
+    calls = []
+    verifier = TokenVerifier(lambda token: calls.append(token) or {'id': token[-4:]})
+    first, second = _token(_claims(sub='a')), _token(_claims(sub='b'))
+    verifier.verify(first)
+    verifier.verify(second)
+    verifier.invalidate(first)
+    verifier.verify(first)
+    verifier.verify(second)
+    assert calls == [first, second, first]
+    verifier.invalidate()
+    verifier.verify(second)
+    assert calls[-1] == second and len(calls) == 4
+
+
+def test_max_entries_evicts_least_recently_used(clock):
+    calls = []
+    verifier = TokenVerifier(lambda token: calls.append(token) or {'id': token}, max_entries=2)
+    tokens = [_token(_claims(sub=str(i))) for i in range(3)]
+    verifier.verify(tokens[0])
+    verifier.verify(tokens[1])
+    verifier.verify(tokens[0])
+    verifier.verify(tokens[2])
+    verifier.verify(tokens[0])
+    assert calls == tokens
+    verifier.verify(tokens[1])
+    assert calls == tokens + [tokens[1]]
+
+
+def _concurrent_verify(verifier, token, callers=5):
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(verifier.verify(token))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_verifications_share_one_fetch():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch_user(token):
+        calls.append(token)
+        started.set()
+        release.wait(5)
+        return {'id': 'user-1'}
+
+    verifier = TokenVerifier(fetch_user)
+    token = _token({'sub': 'user-1', 'exp': time.time() + 3600})
+    threads, outcomes = _concurrent_verify(verifier, token)
+    assert started.wait(5)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert outcomes == [{'id': 'user-1'}] * 5
+
+
+def test_concurrent_verifications_share_error():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch_user(token):
+        calls.append(token)
+        started.set()
+        release.wait(5)
+        raise TokenVerificationError('expired')
+
+    verifier = TokenVerifier(fetch_user)
+    token = _token({'sub': 'user-1', 'exp': time.time() + 3600})
+    threads, outcomes = _concurrent_verify(verifier, token)
+    assert started.wait(5)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert len(outcomes) == 5
+    assert all(isinstance(outcome, TokenVerificationError) for outcome in outcomes)
+    # 失敗は共有のみでキャッシュしない
+    assert verifier._inflight == {}
+    assert verifier._cache == {}
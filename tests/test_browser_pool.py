@@ -0,0 +1,74 @@
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.window_handles = ['home']
+        self.current_window_handle = 'home'
+        self.quit_called = False
+
+    def open_tab(self, handle):
+        self.window_handles.append(handle)
+        self.current_window_handle = handle
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _pool(tmp_path, **options):
+    return BrowserPool('test', FakeDriver, tmp_path, **options)
+
+
+def test_reuses_browser_until_page_limit(tmp_path):
+    pool = _pool(tmp_path, max_pages=2, max_rss_mb=None)
+    browser = pool.acquire()
+    browser.pages = 1
+    pool.release(browser)
+    assert pool.acquire() is browser
+    browser.pages = 2
+    pool.release(browser)
+    recycled = pool.acquire()
+    assert recycled is not browser
+    assert browser.driver.quit_called
+
+
+def test_discard_quits_browser(tmp_path):
+    pool = _pool(tmp_path)
+    browser = pool.acquire()
+    pool.release(browser, discard=True)
+    assert browser.driver.quit_called
+    assert pool.acquire() is not browser
+
+
+def test_keep_user_tabs_skips_recycle_and_close(tmp_path):
+    pool = _pool(tmp_path, max_pages=1, max_rss_mb=None, keep_user_tabs=True)
+    browser = pool.acquire()
+    browser.home_handle = 'home'
+    browser.driver.open_tab('form-1')
+    browser.pages = 5
+    pool.release(browser, discard=True)
+    assert pool.acquire() is browser
+    pool.release(browser)
+    pool.close()
+    assert not browser.driver.quit_called
+
+
+def test_keep_user_tabs_recycles_after_tabs_are_closed(tmp_path):
+    pool = _pool(tmp_path, max_pages=1, max_rss_mb=None, keep_user_tabs=True)
+    browser = pool.acquire()
+    browser.home_handle = 'home'
+    browser.pages = 1
+    pool.release(browser)
+    assert pool.acquire() is not browser
+    assert browser.driver.quit_called
+
+
+def test_user_tabs_counted_when_home_tab_closed(tmp_path):
+    pool = _pool(tmp_path, keep_user_tabs=True)
+    browser = pool.acquire()
+    browser.home_handle = 'home'
+    browser.driver.window_handles = ['form-1']
+    assert browser.has_user_tabs()
+    pool.close()
+    assert not browser.driver.quit_called
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from check_store import CheckStore
+from job_store import JobStore
+
+
+class FakeJobStore:
+    def __init__(self, checks=None, failures=0):
+        self.checks = dict(checks or {})
+        self.writes = []
+        self.failures = failures
+        self.written = threading.Event()
+
+    def load_checks(self):
+        return {url: dict(value) for url, value in self.checks.items()}
+
+    def set_checks(self, checks):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('database is locked')
+        self.writes.append(checks)
+        self.checks.update(checks)
+        self.written.set()
+
+
+def test_updates_are_coalesced_into_one_write():
+    job_store = FakeJobStore()
+    store = CheckStore(job_store, flush_delay=0.2)
+    store.set_many({'u1': True, 'u2': True})
+    store.set('u3', True)
+    store.set_many({'u1': False})
+    assert job_store.writes == []
+
+    assert job_store.written.wait(5)
+    assert len(job_store.writes) == 1
+    assert {url: value['checked'] for url, value in job_store.writes[0].items()} == \
+        {'u1': False, 'u2': True, 'u3': True}
+
+
+def test_flush_persists_pending_checks():
+    job_store = FakeJobStore({'old': {'checked': True, 'updated_at': 't'}})
+    store = CheckStore(job_store, flush_delay=60)
+    assert store.set_urls(['u1', 'u2', ''], True) == 2
+    store.flush()
+    assert sorted(job_store.writes[0]) == ['u1', 'u2']
+    assert store.get_all()['old'] == {'checked': True, 'updated_at': 't'}
+    # 変更がなければ書き込まない
+    store.flush()
+    assert len(job_store.writes) == 1
+
+
+def test_failed_write_keeps_pending_checks():
+    job_store = FakeJobStore(failures=1)
+    store = CheckStore(job_store, flush_delay=60)
+    store.set_many({'u1': True, 'u2': False})
+    store.flush()
+    assert job_store.writes == []
+
+    store.set('u3', True)
+    store.flush()
+    assert len(job_store.writes) == 1
+    assert sorted(job_store.writes[0]) == ['u1', 'u2', 'u3']
+
+
+def test_get_all_returns_copies():
+    store = CheckStore(FakeJobStore({'u1': {'checked': True, 'updated_at': 't'}}), flush_delay=60)
+    store.get_all()['u1']['checked'] = False
+    assert store.get_all()['u1']['checked'] is True
+
+
+def test_apply_update_request_formats():
+    job_store = FakeJobStore()
+    store = CheckStore(job_store, flush_delay=60)
+    assert store.apply_update({'checks': {'u1': True, 'u2': False}}) == 2
+    assert store.apply_update({'urls': ['u3', 'u4'], 'checked': False}) == 2
+    assert store.apply_update({'urls': ['u5']}) == 1
+    for data in ({}, {'urls': 'u1'}, {'checks': ['u1']}, ['u1']):
+        with pytest.raises(ValueError):
+            store.apply_update(data)
+    store.flush()
+    assert {url: value['checked'] for url, value in job_store.writes[0].items()} == \
+        {'u1': True, 'u2': False, 'u3': False, 'u4': False, 'u5': True}
+
+
+def test_checks_survive_restart_with_job_store(tmp_path):
+    job_store = JobStore(tmp_path / 'jobs.db')
+    store = CheckStore(job_store, flush_delay=60)
+    store.apply_update({'urls': ['u1', 'u2'], 'checked': True})
+    store.set('u2', False)
+    store.flush()
+    reloaded = CheckStore(JobStore(tmp_path / 'jobs.db'), flush_delay=60)
+    assert {url: value['checked'] for url, value in reloaded.get_all().items()} == {'u1': True, 'u2': False}
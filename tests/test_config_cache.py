@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+import config_cache
+
+
+@pytest.fixture
+def opens(monkeypatch):
+    """config_cache がファイルを開いた回数"""
+    calls = []
+    real_open = open
+
+    def counting_open(path, mode='r', *args, **kwargs):
+        calls.append((str(path), mode))
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(config_cache, 'open', counting_open, raising=False)
+    config_cache.invalidate()
+    yield calls
+    config_cache.invalidate()
+
+
+def _reads(calls):
+    return [call for call in calls if call[1] == 'r']
+
+
+def _write_external(path, data, mtime_ns=None):
+    """別プロセスによる書き換え（キャッシュを通さない）"""
+    path.write_text(json.dumps(data), encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_unchanged_file_is_read_once(tmp_path, opens):
+    path = tmp_path / 'settings.json'
+    _write_external(path, {'model': 'gpt-4o'})
+    assert config_cache.load_json(path) == {'model': 'gpt-4o'}
+    assert config_cache.load_json(str(path)) == {'model': 'gpt-4o'}
+    assert len(_reads(opens)) == 1
+
+
+def test_reloads_when_mtime_changes(tmp_path, opens):
+    path = tmp_path / 'settings.json'
+    _write_external(path, {'model': 'a'}, mtime_ns=1_000_000_000)
+    assert config_cache.load_json(path) == {'model': 'a'}
+    # 同じサイズの書き換えでも更新日時の変化で検知する
+    _write_external(path, {'model': 'b'}, mtime_ns=2_000_000_000)
+    assert config_cache.load_json(path) == {'model': 'b'}
+    assert len(_reads(opens)) == 2
+
+
+def test_reloads_when_size_changes(tmp_path, opens):
+    path = tmp_path / 'settings.json'
+    _write_external(path, {'model': 'a'}, mtime_ns=1_000_000_000)
+    config_cache.load_json(path)
+    # 更新日時の分解能より短い間隔の書き換えでもサイズの変化で検知する
+    _write_external(path, {'model': 'gpt-4o-mini'}, mtime_ns=1_000_000_000)
+    assert config_cache.load_json(path) == {'model': 'gpt-4o-mini'}
+
+
+def test_missing_file_returns_default_copy(tmp_path, opens):
+    path = tmp_path / 'missing.json'
+    default = {'items': []}
+    value = config_cache.load_json(path, default=default)
+    value['items'].append(1)
+    assert default == {'items': []}
+    assert config_cache.load_json(path) is None
+    assert config_cache.load_text(tmp_path / 'missing.txt') == ''
+
+    _write_external(path, {'items': [1]})
+    assert config_cache.load_json(path, default=default) == {'items': [1]}
+
+
+def test_returned_values_are_isolated(tmp_path, opens):
+    path = tmp_path / 'prompt.txt'
+    _write_external(path, {'prefilter': {'exclude': ['a']}})
+    value = config_cache.load_json(path)
+    value['prefilter']['exclude'].append('b')
+    assert config_cache.load_json(path) == {'prefilter': {'exclude': ['a']}}
+
+    data = {'rules': ['x']}
+    config_cache.write_json(path, data)
+    data['rules'].append('y')
+    assert config_cache.load_json(path) == {'rules': ['x']}
+
+
+def test_write_refreshes_cache_without_reading(tmp_path, opens):
+    json_path = tmp_path / 'settings.json'
+    _write_external(json_path, {'model': 'a'})
+    config_cache.load_json(json_path)
+    config_cache.write_json(json_path, {'model': 'b', 'max_items': 20})
+    assert config_cache.load_json(json_path) == {'model': 'b', 'max_items': 20}
+    assert json.loads(json_path.read_text(encoding='utf-8')) == {'model': 'b', 'max_items': 20}
+
+    text_path = tmp_path / 'SelfIntroduction.txt'
+    config_cache.write_text(text_path, '自己紹介')
+    assert config_cache.load_text(text_path) == '自己紹介'
+    assert len(_reads(opens)) == 1
+
+
+def test_invalid_json_raises_and_is_not_cached(tmp_path, opens):
+    path = tmp_path / 'settings.json'
+    path.write_text('{"model": ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        config_cache.load_json(path)
+    _write_external(path, {'model': 'a'})
+    assert config_cache.load_json(path) == {'model': 'a'}
+
+
+def test_invalidate_forces_reload(tmp_path, opens):
+    path = tmp_path / 'settings.json'
+    _write_external(path, {'model': 'a'})
+    config_cache.load_json(path)
+    config_cache.invalidate(path)
+    config_cache.load_json(path)
+    assert len(_reads(opens)) == 2
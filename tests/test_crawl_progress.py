@@ -0,0 +1,151 @@
+import json
+import sys
+import time
+
+from crawl_jobs import CrawlJobManager
+from crawl_progress import ProgressWriter, finalize, follow, get_progress_file, read_latest
+
+
+def _lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_writer_records_snapshots(tmp_path):
+    path = tmp_path / 'progress.jsonl'
+    writer = ProgressWriter(path)
+    writer.start()
+    writer.update('scraping', page=2)
+    writer.increment('jobs_scraped', 5)
+    writer.finish()
+    phases = [event['phase'] for event in _lines(path)]
+    assert phases == ['starting', 'scraping', 'scraping', 'completed']
+    assert read_latest(path)['jobs_scraped'] == 5
+
+
+def test_read_latest_ignores_partial_last_line(tmp_path):
+    path = tmp_path / 'progress.jsonl'
+    lines = [json.dumps({'phase': 'scraping', 'padding': 'x' * 5000}), json.dumps({'phase': 'details'})]
+    path.write_text('\n'.join(lines) + '\n{"phase": "sav', encoding='utf-8')
+    assert read_latest(path)['phase'] == 'details'
+    assert read_latest(tmp_path / 'missing.jsonl') is None
+
+
+def test_follow_reads_only_appended_lines(tmp_path):
+    path = tmp_path / 'progress.jsonl'
+    path.write_text('{"phase": "starting"}\n{"phase": "log', encoding='utf-8')
+    events, offset = follow(path)
+    assert [event['phase'] for event in events] == ['starting']
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('in"}\n')
+    events, offset = follow(path, offset)
+    assert [event['phase'] for event in events] == ['login']
+    # ファイルが作り直された場合は先頭から読む
+    path.write_text('{"phase": "starting"}\n', encoding='utf-8')
+    assert [event['phase'] for event in follow(path, offset)[0]] == ['starting']
+
+
+def test_finalize_appends_terminal_record_once(tmp_path):
+    path = tmp_path / 'progress.jsonl'
+    writer = ProgressWriter(path)
+    writer.start()
+    writer.update('details', details_total=3, details_fetched=1)
+
+    assert finalize(path, 'cancelled')
+    latest = read_latest(path)
+    assert latest['phase'] == 'cancelled' and latest['details_fetched'] == 1
+    assert latest['eta_seconds'] is None
+    assert not finalize(path, 'failed')
+    assert not finalize(tmp_path / 'missing.jsonl', 'failed')
+
+
+_CRAWLER = """
+import sys, time
+sys.path.insert(0, {root!r})
+from crawl_progress import ProgressWriter
+writer = ProgressWriter({path!r})
+writer.start()
+writer.update('scraping', page=1)
+print('started', flush=True)
+time.sleep(60)
+"""
+
+
+def _wait(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_cancelled_crawl_is_recorded_as_cancelled(tmp_path):
+    manager = CrawlJobManager(tmp_path)
+    script = _CRAWLER.format(root=str(__import__('pathlib').Path(__file__).parent.parent),
+                             path=manager.progress_file)
+    job = manager.start([sys.executable, '-c', script])
+    assert _wait(lambda: 'started' in job.output)
+    assert read_latest(manager.progress_file)['phase'] == 'scraping'
+
+    assert manager.cancel(job.job_id)
+    manager.wait(job.job_id, timeout=15)
+    assert job.status == 'cancelled'
+    assert read_latest(get_progress_file(tmp_path / 'logs'))['phase'] == 'cancelled'
+
+
+_POOLED_CRAWLER = """
+import sys, time
+sys.path.insert(0, {root!r})
+from browser_pool import get_browser_pool
+from crawl_jobs import install_stop_handler
+
+
+class FakeDriver:
+    window_handles = ['home']
+    current_window_handle = 'home'
+
+    def __init__(self, profile_dir):
+        pass
+
+    def quit(self):
+        open({marker!r}, 'w').close()
+
+
+install_stop_handler()
+pool = get_browser_pool('crawler', FakeDriver, {profiles!r})
+browser = pool.acquire()
+try:
+    print('started', flush=True)
+    time.sleep(60)
+finally:
+    pool.release(browser)
+"""
+
+
+def test_cancelled_crawl_closes_browser_pool(tmp_path):
+    manager = CrawlJobManager(tmp_path)
+    marker = tmp_path / 'quit'
+    script = _POOLED_CRAWLER.format(root=str(__import__('pathlib').Path(__file__).parent.parent),
+                                    marker=str(marker), profiles=str(tmp_path / 'profiles'))
+    job = manager.start([sys.executable, '-c', script])
+    assert _wait(lambda: 'started' in job.output)
+
+    assert manager.cancel(job.job_id)
+    manager.wait(job.job_id, timeout=15)
+    assert job.status == 'cancelled'
+    # 停止要求で atexit の close_all が実行され、ブラウザが終了している
+    assert marker.exists()
+
+
+def test_queued_and_starting_crawls_can_be_cancelled(tmp_path):
+    manager = CrawlJobManager(tmp_path)
+    running = manager.start([sys.executable, '-c', 'import time; time.sleep(60)'])
+    queued = manager.start([sys.executable, '-c', 'pass'])
+    assert manager.queued() == [queued.job_id]
+    assert manager.start([sys.executable, '-c', 'pass'], queue_if_busy=False) is None
+
+    assert manager.cancel(queued.job_id) and queued.status == 'cancelled'
+    manager.cancel(running.job_id)
+    manager.wait(running.job_id, timeout=15)
+    assert running.status == 'cancelled'
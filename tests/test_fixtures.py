@@ -0,0 +1,77 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from crowdworks_selectors import (APPLY_PAGE, DETAIL_PAGE, LIST_PAGE, LOGIN_PAGE, check_page, detect_page,
+                                  get_selector, reset_selectors)
+from extractors import available_extractors, get_extractor
+from http_scraper import parse_embedded_jobs
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / 'benchmarks' / 'fixtures'
+BASE_URL = 'https://crowdworks.jp'
+
+PAGES = {
+    'search_result_page.html': LIST_PAGE,
+    'job_detail_page.html': DETAIL_PAGE,
+    'proposal_form_page.html': APPLY_PAGE,
+    'login_page.html': LOGIN_PAGE,
+}
+
+
+def _read(name):
+    return (FIXTURE_DIR / name).read_text(encoding='utf-8')
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    reset_selectors()
+    yield
+    reset_selectors()
+
+
+@pytest.mark.parametrize('name,page', PAGES.items())
+def test_fixture_pages_match_required_selectors(name, page):
+    html = _read(name)
+    assert detect_page(html) == page
+    missing = [r['name'] for r in check_page(html, page) if r['required'] and r['matched'] is None]
+    assert missing == []
+
+
+@pytest.mark.parametrize('name', available_extractors())
+def test_extractors_read_fixture_list_page(name):
+    html = _read('search_result_page.html')
+    cards = get_extractor(name).job_cards(html, BASE_URL)
+    embedded = parse_embedded_jobs(html, BASE_URL, get_extractor(name))
+    assert len(cards) == 10
+    key = ('title', 'url', 'budget', 'client')
+    assert [[job[k] for k in key] for job in cards] == [[job[k] for k in key] for job in embedded]
+    assert all(job['posted_date'] for job in cards)
+
+
+@pytest.mark.parametrize('name', available_extractors())
+def test_extractors_read_fixture_detail_page(name):
+    detail = get_extractor(name).job_detail(_read('job_detail_page.html'))
+    lines = detail['detail_description'].split('\n')
+    assert lines[:2] == ['概要', '社内で利用している売上データの集計ツール（Python 3 / pandas）の改修をお願いします。']
+    assert '' not in lines
+
+
+def test_selector_use_from_threads():
+    selector = get_selector('job_card')
+    barrier = threading.Barrier(8)
+    orders = []
+
+    def worker(index):
+        barrier.wait()
+        for _ in range(200):
+            selector.use(index % len(selector.candidates))
+            orders.append(selector.order())
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expected = list(range(len(selector.candidates)))
+    assert all(sorted(order) == expected for order in orders)
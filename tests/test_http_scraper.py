@@ -0,0 +1,86 @@
+import html
+import json
+
+import pytest
+
+from extractors import DEFAULT_BUDGET, DEFAULT_CLIENT, available_extractors, get_extractor
+from http_scraper import page_url, parse_embedded_jobs, parse_job_cards, parse_job_list
+
+BASE_URL = 'https://crowdworks.jp/public/jobs/search?order=new'
+
+EMBEDDED = {'searchResult': {'job_offers': [
+    {'job_offer': {'id': 101, 'title': ' Pythonでのデータ収集 ', 'last_released_at': '2024-05-01T10:00:00+09:00'},
+     'client': {'username': 'client_a'},
+     'payment': {'fixed_price_payment': {'min_budget': 10000, 'max_budget': 50000}}},
+    {'job_offer': {'id': 102, 'title': '時給案件', 'created_at': '2024-05-01T09:00:00+09:00'},
+     'payment': {'hourly_payment': {'min_hourly_wage': 1500, 'max_hourly_wage': 1500}}},
+    {'job_offer': {'id': 103, 'title': 'タスク'}, 'client': None,
+     'payment': {'task_payment': {'task_price': '300.0'}}},
+    {'job_offer': {'id': 104, 'title': '予算なし'}, 'client': {'name': 'B'}, 'payment': {}},
+    {'job_offer': {'title': 'IDなし'}},
+    'broken',
+]}}
+
+CARD = """
+<div class="UNzN7">
+  <h3 class="iCeus"><a href="/public/jobs/{id}">{title}</a></h3>
+  <span class="Yh37y">{budget}</span>
+  <a class="uxHdW" href="/public/employers/1">クライアント</a>
+  <time datetime="2024-05-01T10:00:00+09:00">1時間前</time>
+</div>
+"""
+
+
+def _page(embedded=None, cards=''):
+    data = f' data="{html.escape(json.dumps(embedded, ensure_ascii=False))}"' if embedded is not None else ''
+    return f'<html><body><div id="vue-container"{data}>{cards}</div></body></html>'
+
+
+@pytest.fixture(params=available_extractors())
+def extractor(request):
+    return get_extractor(request.param)
+
+
+def test_parse_embedded_jobs(extractor):
+    jobs = parse_embedded_jobs(_page(EMBEDDED), BASE_URL, extractor)
+    assert [job['url'] for job in jobs] == [f'https://crowdworks.jp/public/jobs/{i}' for i in (101, 102, 103, 104)]
+    assert jobs[0]['title'] == 'Pythonでのデータ収集'
+    assert jobs[0]['budget'] == '10,000円 〜 50,000円'
+    assert jobs[0]['client'] == 'client_a'
+    assert jobs[0]['posted_date'] == '2024-05-01T10:00:00+09:00'
+    assert jobs[1]['budget'] == '時給 1,500円'
+    assert jobs[1]['client'] == DEFAULT_CLIENT
+    assert jobs[1]['posted_date'] == '2024-05-01T09:00:00+09:00'
+    assert jobs[2]['budget'] == '単価 300円'
+    assert (jobs[3]['budget'], jobs[3]['client']) == (DEFAULT_BUDGET, 'B')
+
+
+@pytest.mark.parametrize('page', [
+    _page(),
+    _page({'other': []}),
+    '<html><body><div id="vue-container" data="{not json"></div></body></html>',
+])
+def test_parse_embedded_jobs_without_data(extractor, page):
+    assert parse_embedded_jobs(page, BASE_URL, extractor) is None
+
+
+def test_parse_job_cards(extractor):
+    cards = CARD.format(id=1, title='カード案件 &amp; 改修', budget='5,000円') + \
+        '<div class="UNzN7"><h3 class="iCeus"><a href="/public/jobs/2">予算なし</a></h3></div>'
+    jobs = parse_job_cards(_page(cards=cards), BASE_URL, extractor)
+    assert [(job['title'], job['budget'], job['client']) for job in jobs] == [
+        ('カード案件 & 改修', '5,000円', 'クライアント'), ('予算なし', DEFAULT_BUDGET, DEFAULT_CLIENT)]
+    assert jobs[0]['url'] == 'https://crowdworks.jp/public/jobs/1'
+    assert jobs[0]['posted_date'] == '2024-05-01T10:00:00+09:00'
+
+
+def test_parse_job_list_prefers_embedded_data(extractor):
+    page = _page(EMBEDDED, CARD.format(id=1, title='カード', budget='1円'))
+    assert len(parse_job_list(page, BASE_URL, extractor)) == 4
+    page = _page(cards=CARD.format(id=1, title='カード', budget='1円'))
+    assert [job['title'] for job in parse_job_list(page, BASE_URL, extractor)] == ['カード']
+
+
+def test_page_url():
+    assert page_url(BASE_URL, 3) == 'https://crowdworks.jp/public/jobs/search?order=new&page=3'
+    assert page_url(BASE_URL + '&page=2', 5) == 'https://crowdworks.jp/public/jobs/search?order=new&page=5'
@@ -0,0 +1,154 @@
+import json
+import os
+
+import pytest
+
+from job_store import JobStore, crawled_at_from_run_key, is_newer, run_key_from_path
+
+
+def _job(url, title='案件', posted_date=None):
+    return {'url': url, 'title': title, 'budget': '10,000円', 'client': 'A', 'posted_date': posted_date}
+
+
+def _write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    crawled = tmp_path / 'crawled_data'
+    crawled.mkdir()
+    return crawled
+
+
+@pytest.fixture
+def store(data_dir):
+    return JobStore(data_dir / 'jobs.db')
+
+
+def test_run_key_helpers():
+    assert run_key_from_path('/x/jobs_20240102_030405_filtered.json') == 'jobs_20240102_030405'
+    assert run_key_from_path('jobs_20240102_030405.json') == 'jobs_20240102_030405'
+    assert crawled_at_from_run_key('jobs_20240102_030405') == '2024-01-02 03:04:05'
+    assert crawled_at_from_run_key('other') is None
+
+
+def test_import_json_files_runs_once(data_dir, store):
+    _write(data_dir / 'jobs_20240101_000000.json', [_job('u1'), _job('u2')])
+    _write(data_dir / 'jobs_20240101_000000_filtered.json', [_job('u2')])
+    _write(data_dir / 'jobs_20240102_000000.json', [_job('u3')])
+    _write(data_dir / 'checked_jobs.json', {'u2': {'checked': True, 'updated_at': 't'}})
+
+    assert store.import_json_files(data_dir, data_dir / 'checked_jobs.json') == 2
+    assert store.filtered_jobs('jobs_20240101_000000') == [_job('u2')]
+    assert store.load_checks() == {'u2': {'checked': True, 'updated_at': 't'}}
+
+    _write(data_dir / 'jobs_20240103_000000.json', [_job('u4')])
+    assert store.import_json_files(data_dir) == 0
+    assert store.import_json_files(data_dir, force=True) == 1
+
+
+def test_import_keeps_existing_checks(data_dir, store):
+    store.set_checks({'u1': {'checked': False, 'updated_at': 'new'}})
+    _write(data_dir / 'checked_jobs.json', {'u1': {'checked': True, 'updated_at': 'old'},
+                                            'u2': {'checked': True, 'updated_at': 'old'}})
+    store.import_json_files(data_dir, data_dir / 'checked_jobs.json')
+    assert store.load_checks()['u1']['updated_at'] == 'new'
+    assert store.load_checks()['u2']['checked'] is True
+
+
+def test_list_runs_only_includes_files_on_disk(data_dir, store):
+    for key in ('jobs_20240101_000000', 'jobs_20240102_000000'):
+        _write(data_dir / f'{key}.json', [_job(f'{key}/1')])
+        _write(data_dir / f'{key}_filtered.json', [_job(f'{key}/1')])
+    store.import_json_files(data_dir)
+    assert [run['name'] for run in store.list_runs()] == ['jobs_20240102_000000_filtered.json',
+                                                           'jobs_20240101_000000_filtered.json']
+
+    os.remove(data_dir / 'jobs_20240102_000000_filtered.json')
+    assert [run['date'] for run in store.list_runs()] == ['2024-01-01 00:00:00']
+
+
+def test_import_resolves_relative_checks_file(tmp_path, monkeypatch):
+    crawled = tmp_path / 'app' / 'crawled_data'
+    crawled.mkdir(parents=True)
+    _write(crawled / 'checked_jobs.json', {'u1': {'checked': True, 'updated_at': 't'}})
+    # アプリのディレクトリ以外から起動した場合
+    monkeypatch.chdir(tmp_path)
+    store = JobStore(crawled / 'jobs.db')
+    store.import_json_files(crawled, checks_file='crawled_data/checked_jobs.json')
+    assert store.load_checks() == {'u1': {'checked': True, 'updated_at': 't'}}
+
+    other = JobStore(tmp_path / 'other.db')
+    other.import_json_files(crawled)
+    assert other.load_checks() == {'u1': {'checked': True, 'updated_at': 't'}}
+
+
+def test_list_runs_without_validation_uses_catalog(data_dir, store, monkeypatch):
+    _write(data_dir / 'jobs_20240101_000000.json', [_job('u1')])
+    _write(data_dir / 'jobs_20240101_000000_filtered.json', [_job('u1')])
+    store.import_json_files(data_dir)
+    os.remove(data_dir / 'jobs_20240101_000000_filtered.json')
+
+    def fail_stat(*args, **kwargs):
+        raise AssertionError('list_runs(validate=False) must not stat files')
+
+    monkeypatch.setattr('pathlib.Path.stat', fail_stat)
+    monkeypatch.setattr('pathlib.Path.glob', fail_stat)
+    assert [run['name'] for run in store.list_runs(validate=False)] == ['jobs_20240101_000000_filtered.json']
+
+
+def test_list_runs_reloads_modified_files(data_dir, store):
+    raw = data_dir / 'jobs_20240101_000000.json'
+    _write(raw, [_job('u1'), _job('u2')])
+    _write(data_dir / 'jobs_20240101_000000_filtered.json', [_job('u1')])
+    store.import_json_files(data_dir)
+
+    _write(data_dir / 'jobs_20240101_000000_filtered.json', [_job('u1'), _job('u2')])
+    assert store.list_runs()[0]['job_count'] == 2
+    assert [job['url'] for job in store.latest_filtered_jobs()] == ['u1', 'u2']
+
+
+def test_find_filtered_job_by_url_uses_latest_run(data_dir, store):
+    store.record_run(str(data_dir / 'jobs_20240101_000000.json'), [_job('u1', '古い')], [_job('u1', '古い')])
+    store.record_run(str(data_dir / 'jobs_20240102_000000.json'), [_job('u1', '新しい')], [_job('u1', '新しい')])
+    assert store.find_filtered_job_by_url('u1')['title'] == '新しい'
+
+    # 返り値を変更してもキャッシュには影響しない
+    store.find_filtered_job_by_url('u1')['title'] = '変更'
+    assert store.find_filtered_job_by_url('u1')['title'] == '新しい'
+    assert store.find_filtered_job_by_url('missing') is None
+
+
+def test_record_filtered_updates_decisions(data_dir, store):
+    raw = str(data_dir / 'jobs_20240101_000000.json')
+    store.record_run(raw, [_job('u1'), _job('u2')], [_job('u1')])
+    store.record_filtered(raw, [_job('u2')])
+    assert [job['url'] for job in store.filtered_jobs('jobs_20240101_000000')] == ['u2']
+    assert store.find_filtered_job_by_url('u1') is None
+
+
+def test_is_newer():
+    assert is_newer('2024-01-02T00:00:00', '2024-01-01 23:59:59')
+    assert not is_newer('2024-01-01T00:00:00', '2024-01-01T00:00:00')
+    assert not is_newer(None, '2024-01-01T00:00:00')
+    assert not is_newer('2024-01-02T00:00:00', 'invalid')
+
+
+def test_seen_watermark_tracks_newest_posted_date(data_dir, store):
+    assert store.seen_watermark() is None
+    store.record_run(str(data_dir / 'jobs_20240102_000000.json'),
+                     [_job('u1', posted_date='2024-01-02T10:00:00'), _job('u2', posted_date='2024-01-01T10:00:00')])
+    assert store.seen_watermark() == '2024-01-02T10:00:00'
+    # 古い案件だけの実行ではウォーターマークは戻らない
+    store.record_run(str(data_dir / 'jobs_20240103_000000.json'), [_job('u3', posted_date='2023-12-31T10:00:00')])
+    assert store.seen_watermark() == '2024-01-02T10:00:00'
+
+
+def test_is_seen_treats_reposted_jobs_as_new(data_dir, store):
+    store.record_run(str(data_dir / 'jobs_20240102_000000.json'), [_job('u1', posted_date='2024-01-02T10:00:00')])
+    assert store.is_seen('u1', '2024-01-02T10:00:00')
+    assert store.is_seen('u1')
+    assert not store.is_seen('u1', '2024-01-05T10:00:00')
+    assert not store.is_seen('u2', '2024-01-02T10:00:00')
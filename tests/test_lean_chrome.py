@@ -0,0 +1,86 @@
+from lean_chrome import (APPLY, BLOCKED_URL_PATTERNS, FULL_WINDOW_SIZE, LEAN_ARGUMENTS, apply_lean_options,
+                         blocked_urls, enable_resource_blocking, lean_options, window_size)
+
+
+class FakeChromeOptions:
+    def __init__(self):
+        self.arguments = []
+        self.page_load_strategy = 'normal'
+
+    def add_argument(self, argument):
+        self.arguments.append(argument)
+
+
+class FakeDriver:
+    def __init__(self, fail=False):
+        self.commands = []
+        self.fail = fail
+
+    def execute_cdp_cmd(self, command, params):
+        if self.fail:
+            raise RuntimeError('CDP is not available')
+        self.commands.append((command, params))
+
+
+def test_lean_options_defaults():
+    options = lean_options({})
+    assert options['enabled']
+    assert options['block_images']
+    assert '*.woff2' in options['blocked_urls']
+    assert window_size(options) == options['window_size']
+
+
+def test_lean_options_from_settings():
+    options = lean_options({'lean_browser': {'enabled': False, 'block': ['fonts', 'unknown'],
+                                             'extra_blocked_urls': ['*example.com*']}})
+    assert not options['block_images']
+    assert options['blocked_urls'] == BLOCKED_URL_PATTERNS['fonts'] + ['*example.com*']
+    assert window_size(options) == FULL_WINDOW_SIZE
+
+
+def test_apply_browser_is_not_lean_by_default():
+    options = lean_options({}, APPLY)
+    assert not options['enabled']
+    assert window_size(options) == FULL_WINDOW_SIZE
+
+    chrome_options = FakeChromeOptions()
+    apply_lean_options(chrome_options, options)
+    assert chrome_options.arguments == []
+    driver = FakeDriver()
+    enable_resource_blocking(driver, options)
+    assert driver.commands == []
+
+
+def test_apply_browser_keeps_images_and_fonts_when_enabled():
+    options = lean_options({'lean_browser': {'apply_enabled': True}}, APPLY)
+    assert options['enabled']
+    assert not options['block_images']
+    assert options['blocked_urls'] == BLOCKED_URL_PATTERNS['media'] + BLOCKED_URL_PATTERNS['trackers']
+    assert options['window_size'] == FULL_WINDOW_SIZE
+
+
+def test_blocked_urls_skips_unknown_kinds():
+    assert blocked_urls(['media', 'unknown']) == BLOCKED_URL_PATTERNS['media']
+
+
+def test_apply_lean_options():
+    chrome_options = FakeChromeOptions()
+    apply_lean_options(chrome_options, lean_options({}))
+    assert chrome_options.arguments[:len(LEAN_ARGUMENTS)] == LEAN_ARGUMENTS
+    assert '--blink-settings=imagesEnabled=false' in chrome_options.arguments
+    assert chrome_options.page_load_strategy == 'eager'
+
+    disabled = FakeChromeOptions()
+    apply_lean_options(disabled, lean_options({'lean_browser': {'enabled': False}}))
+    assert disabled.arguments == []
+    assert disabled.page_load_strategy == 'normal'
+
+
+def test_enable_resource_blocking():
+    options = lean_options({'lean_browser': {'block': ['fonts']}})
+    driver = FakeDriver()
+    enable_resource_blocking(driver, options)
+    assert driver.commands == [('Network.enable', {}),
+                               ('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS['fonts']})]
+    # CDP が使えない場合も例外にしない
+    enable_resource_blocking(FakeDriver(fail=True), options)
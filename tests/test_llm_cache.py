@@ -0,0 +1,104 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_cache import DecisionCache, job_fingerprint
+from llm_filter import filter_jobs_concurrently
+
+JOB = {'title': 'Pythonでのスクレイピング', 'budget': '10,000円', 'client': 'テスト株式会社'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DecisionCache(tmp_path / 'crawled_data' / 'llm_decisions.db', max_entries=3)
+
+
+def test_make_key_uses_job_fingerprint():
+    key = DecisionCache.make_key('gpt-4o-mini', '条件', JOB)
+    assert key == DecisionCache.make_key('gpt-4o-mini', '条件', dict(JOB))
+    assert key != DecisionCache.make_key('gpt-4o', '条件', JOB)
+    assert key != DecisionCache.make_key('gpt-4o-mini', '別の条件', JOB)
+    assert key != DecisionCache.make_key('gpt-4o-mini', '条件', {**JOB, 'budget': '20,000円'})
+
+
+def test_key_ignores_fields_not_sent_to_llm():
+    edited = {**JOB, 'description': '説明', 'detail_description': '詳細', 'crawled_at': 'now'}
+    assert job_fingerprint(edited) == job_fingerprint(JOB)
+    assert DecisionCache.make_key('m', 'p', edited) == DecisionCache.make_key('m', 'p', JOB)
+
+
+def test_fingerprint_normalizes_width_and_spaces():
+    assert job_fingerprint({**JOB, 'title': 'Python　での  スクレイピング'}) == \
+        job_fingerprint({**JOB, 'title': 'Python での スクレイピング'})
+    assert job_fingerprint({**JOB, 'budget': '１０,０００円'}) == job_fingerprint(JOB)
+
+
+def test_put_and_get(cache):
+    cache.put_many([('a', 'm', 'yes', '理由')])
+    assert cache.get_many(['a', 'b']) == {'a': {'decision': 'yes', 'reason': '理由'}}
+
+
+def test_evicts_least_recently_used(cache):
+    for key in 'abc':
+        cache.put_many([(key, 'm', 'no', '')])
+        time.sleep(0.01)
+    cache.get_many(['a'])
+    cache.put_many([('d', 'm', 'no', '')])
+    assert set(cache.get_many('abcd')) == {'a', 'c', 'd'}
+
+
+def test_expired_entries_are_ignored(cache):
+    cache.put_many([('a', 'm', 'yes', '')])
+    cache.max_age_days = -1
+    assert cache.get_many(['a']) == {}
+    assert cache.evict() == 1
+
+
+class _Client:
+    """decisions の値を順に返すOpenAI互換クライアント"""
+
+    def __init__(self, decisions):
+        self.decisions = list(decisions)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        decision = self.decisions[self.calls]
+        self.calls += 1
+        content = f'{{"decision": "{decision}", "reason": "r"}}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                        finish_reason='stop')])
+
+
+def test_invalid_decisions_are_not_cached(cache):
+    config = {'model': 'm', 'prompt': 'p'}
+    jobs = [JOB, {**JOB, 'title': '別の案件'}]
+    results = filter_jobs_concurrently(_Client(['yes', 'maybe']), jobs, config, max_concurrency=1, cache=cache)
+    assert [r['decision'] for r in results] == ['yes', 'maybe']
+
+    client = _Client(['no'])
+    results = filter_jobs_concurrently(client, jobs, config, max_concurrency=1, cache=cache)
+    assert client.calls == 1
+    assert [r['decision'] for r in results] == ['yes', 'no']
+
+
+def test_key_includes_request_params():
+    key = DecisionCache.make_key('m', 'p', JOB, {'temperature': 0.0, 'mode': 'single'})
+    assert key == DecisionCache.make_key('m', 'p', JOB, {'mode': 'single', 'temperature': 0.0})
+    assert key != DecisionCache.make_key('m', 'p', JOB, {'temperature': 0.7, 'mode': 'single'})
+    assert key != DecisionCache.make_key('m', 'p', JOB, {'temperature': 0.0, 'mode': 'batch'})
+
+
+def test_changed_temperature_or_mode_is_not_served_from_cache(cache):
+    config = {'model': 'm', 'prompt': 'p', 'temperature': 0}
+    filter_jobs_concurrently(_Client(['yes']), [JOB], config, max_concurrency=1, cache=cache)
+
+    client = _Client(['no'])
+    results = filter_jobs_concurrently(client, [JOB], {**config, 'temperature': 0.7}, max_concurrency=1,
+                                       cache=cache)
+    assert client.calls == 1 and results[0]['decision'] == 'no'
+
+    client = _Client([])
+    filter_jobs_concurrently(client, [JOB], dict(config), max_concurrency=1, cache=cache)
+    assert client.calls == 0
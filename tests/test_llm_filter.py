@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+from llm_filter import _evaluate_batch_with_split, filter_jobs_concurrently, get_batch_size
+
+CONFIG = {'model': 'm', 'prompt': 'p', 'batch_size': 4}
+
+
+def _response(content, finish_reason='stop'):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                    finish_reason=finish_reason)])
+
+
+class _Client:
+    """バッチ評価のレスポンスを replies から順に返し、単体評価には yes を返すクライアント"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.batch_sizes = []
+        self.single_calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, **kwargs):
+        if 'results' in messages[0]['content']:
+            self.batch_sizes.append(messages[1]['content'].count('タイトル:'))
+            return self.replies.pop(0)
+        self.single_calls += 1
+        return _response('{"decision": "yes", "reason": "single"}')
+
+
+def _batch(count):
+    return [(i, {'title': f'案件{i}'}) for i in range(count)]
+
+
+def _results(*items):
+    return _response(json.dumps({'results': [
+        {'index': index, 'decision': decision, 'reason': ''} for index, decision in items
+    ]}))
+
+
+def test_complete_batch_uses_one_request():
+    client = _Client([_results((0, 'yes'), (1, 'no'), (2, 'YES'))])
+    results = _evaluate_batch_with_split(client, _batch(3), CONFIG)
+    assert [r['decision'] for r in results] == ['yes', 'no', 'yes']
+    assert client.batch_sizes == [3] and client.single_calls == 0
+
+
+def test_missing_items_are_reevaluated_individually():
+    client = _Client([_results((0, 'no'), (2, 'no'))])
+    results = _evaluate_batch_with_split(client, _batch(3), CONFIG)
+    assert [(r['index'], r['decision']) for r in results] == [(0, 'no'), (1, 'yes'), (2, 'no')]
+    assert client.single_calls == 1
+
+
+def test_truncated_response_is_split_in_half():
+    client = _Client([
+        _response('{"results": [', finish_reason='length'),
+        _results((0, 'no'), (1, 'no')),
+        _results((0, 'no'), (1, 'no')),
+    ])
+    results = _evaluate_batch_with_split(client, _batch(4), CONFIG)
+    assert client.batch_sizes == [4, 2, 2]
+    assert [r['index'] for r in results] == [0, 1, 2, 3]
+    assert all(r['decision'] == 'no' and r['error'] is None for r in results)
+
+
+def test_out_of_range_indexes_are_ignored():
+    client = _Client([_results((0, 'no'), (5, 'no'), (1, 'no'))])
+    results = _evaluate_batch_with_split(client, _batch(2), CONFIG)
+    assert [r['decision'] for r in results] == ['no', 'no']
+
+
+def test_api_error_fails_whole_batch_without_split():
+    class _Failing(_Client):
+        def _create(self, messages, **kwargs):
+            self.batch_sizes.append(len(messages))
+            raise RuntimeError('boom')
+
+    client = _Failing([])
+    results = _evaluate_batch_with_split(client, _batch(3), CONFIG)
+    assert len(client.batch_sizes) == 1
+    assert [r['error'] for r in results] == ['boom'] * 3
+
+
+def test_filter_keeps_input_order():
+    client = _Client([_results((0, 'no'), (1, 'yes'), (2, 'no'), (3, 'yes'))])
+    jobs = [job for _, job in _batch(5)]
+    results = filter_jobs_concurrently(client, jobs, CONFIG, max_concurrency=2)
+    assert [r['index'] for r in results] == [0, 1, 2, 3, 4]
+    # 最後の1件だけのバッチは単体評価になる
+    assert [r['decision'] for r in results] == ['no', 'yes', 'no', 'yes', 'yes']
+    assert client.single_calls == 1
+
+
+def test_batch_size_falls_back_to_single_mode():
+    assert get_batch_size({}) == 1
+    assert get_batch_size({'batch_size': 0}) == 1
+    assert get_batch_size({'batch_size': 'x'}) == 1
+    assert get_batch_size({'batch_size': '10'}) == 10
@@ -0,0 +1,93 @@
+import pytest
+
+import llm_gateway
+from llm_gateway import ModelLimiter, TokenBucket, _parse_duration, _parse_retry_after
+
+
+class _Clock:
+    """time.monotonic / time.sleep の代わりに進める時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_gateway.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(llm_gateway.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_acquire_within_capacity_does_not_wait(clock):
+    bucket = TokenBucket(60, 1)
+    for _ in range(60):
+        bucket.acquire()
+    assert clock.sleeps == []
+    assert bucket.tokens == 0
+
+
+def test_acquire_waits_for_refill(clock):
+    bucket = TokenBucket(10, 2)
+    bucket.acquire(10)
+    bucket.acquire(4)
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+
+
+def test_request_larger_than_capacity_is_capped(clock):
+    bucket = TokenBucket(5, 5)
+    bucket.acquire(100)
+    assert clock.sleeps == []
+    assert bucket.tokens == 0
+
+
+def test_refill_never_exceeds_capacity(clock):
+    bucket = TokenBucket(10, 1)
+    bucket.acquire(10)
+    clock.now += 3600
+    bucket.acquire(0)
+    assert bucket.tokens == 10
+
+
+def test_pause_blocks_until_deadline(clock):
+    bucket = TokenBucket(10, 1)
+    bucket.pause(7)
+    bucket.acquire()
+    assert sum(clock.sleeps) == pytest.approx(7.0)
+
+
+def test_headers_adjust_limit_and_remaining(clock):
+    limiter = ModelLimiter(500, 30000)
+    limiter.update_from_headers({
+        'x-ratelimit-limit-requests': '100',
+        'x-ratelimit-remaining-requests': '0',
+        'x-ratelimit-reset-requests': '1m30s',
+        'x-ratelimit-remaining-tokens': '1200',
+    })
+    assert limiter.requests.capacity == 100
+    assert limiter.requests.tokens == 0
+    assert limiter.requests.paused_until == clock.now + 90
+    assert limiter.tokens.capacity == 30000
+    assert limiter.tokens.tokens == 1200
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('1s', 1.0), ('6m0s', 360.0), ('20ms', 0.02), ('1h2m', 3720.0), ('2.5', 2.5), ('', None), ('x', None)
+])
+def test_parse_duration(value, seconds):
+    assert _parse_duration(value) == seconds
+
+
+def test_parse_retry_after_prefers_milliseconds():
+    assert _parse_retry_after({'retry-after-ms': '1500', 'retry-after': '10'}) == 1.5
+    assert _parse_retry_after({'retry-after': '10'}) == 10.0
+    assert _parse_retry_after({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0.0
+    assert _parse_retry_after({}) is None
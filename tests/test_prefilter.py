@@ -0,0 +1,68 @@
+import pytest
+
+from prefilter import PreFilter, parse_budget
+
+
+@pytest.mark.parametrize('budget, expected', [
+    ('固定報酬制 10,000円 〜 50,000円', (10000, 50000, 'fixed')),
+    ('〜 5,000円', (None, 5000, 'fixed')),
+    ('5,000円 〜', (5000, None, 'fixed')),
+    ('30,000円', (30000, 30000, 'fixed')),
+    ('1.5万円 〜 3万円', (15000, 30000, 'fixed')),
+    ('５千円', (5000, 5000, 'fixed')),
+    ('時間単価制 1,500円 〜 3,000円 / 時間', (1500, 3000, 'hourly')),
+    ('¥10,000 - ¥20,000', (10000, 20000, 'fixed')),
+    ('￥10,000 〜 ￥20,000', (10000, 20000, 'fixed')),
+    ('¥1.5万 〜', (15000, None, 'fixed')),
+    ('〜 ¥8,000', (None, 8000, 'fixed')),
+    ('予算未設定', (None, None, 'unknown')),
+    ('', (None, None, 'unknown')),
+    (None, (None, None, 'unknown')),
+])
+def test_parse_budget(budget, expected):
+    result = parse_budget(budget)
+    assert (result['min'], result['max'], result['type']) == expected
+
+
+def test_numbers_without_currency_are_not_amounts():
+    assert parse_budget('固定報酬制 3件 10,000円') == {'min': 10000, 'max': 10000, 'type': 'fixed'}
+
+
+@pytest.fixture
+def prefilter():
+    return PreFilter({
+        'enabled': True,
+        'min_budget': 10000,
+        'min_hourly_budget': 1500,
+        'deny_keywords': ['データ入力'],
+        'deny_patterns': ['^【急募】'],
+        'allow_keywords': ['python'],
+    })
+
+
+@pytest.mark.parametrize('job, decision', [
+    ({'title': '簡単なデータ入力', 'budget': '50,000円'}, ('no', 'deny_keyword:データ入力')),
+    ({'title': '【急募】Python開発', 'budget': '50,000円'}, ('no', 'deny_pattern:^【急募】')),
+    ({'title': 'Python開発', 'budget': '〜 5,000円'}, ('no', 'min_budget')),
+    ({'title': 'Python開発', 'budget': '¥1,000 - ¥9,000'}, ('no', 'min_budget')),
+    ({'title': 'サイト制作', 'budget': '1,000円 / 時間'}, ('no', 'hourly_min_budget')),
+    ({'title': 'Ｐｙｔｈｏｎ開発', 'budget': '予算未設定'}, ('yes', 'allow_keyword:python')),
+    ({'title': 'サイト制作', 'budget': '50,000円'}, None),
+])
+def test_evaluate(prefilter, job, decision):
+    result = prefilter.evaluate(job)
+    assert (result[:2] if result else None) == decision
+
+
+def test_apply_splits_jobs(prefilter):
+    jobs = [{'title': 'Python開発', 'budget': '50,000円'}, {'title': 'データ入力', 'budget': ''},
+            {'title': 'サイト制作', 'budget': '50,000円'}]
+    accepted, remaining, stats = prefilter.apply(jobs)
+    assert accepted == [jobs[0]] and remaining == [jobs[2]]
+    assert 'gpt_reason' in jobs[0]
+    assert stats == {'allow_keyword:python': 1, 'deny_keyword:データ入力': 1}
+
+
+def test_disabled_prefilter_passes_everything():
+    jobs = [{'title': 'データ入力'}]
+    assert PreFilter({'enabled': False}).apply(jobs) == ([], jobs, {})
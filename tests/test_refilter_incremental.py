@@ -0,0 +1,122 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from prefilter import PreFilter
+from refilter import criteria_hash, prune_eval_meta, refilter_file_incremental
+
+CONFIG = {'model': 'm', 'prompt': 'Pythonの案件'}
+
+
+class _Client:
+    """タイトルに Python を含む案件だけを採用するクライアント（評価した案件を記録する）"""
+
+    def __init__(self, fail_titles=()):
+        self.titles = []
+        self.fail_titles = set(fail_titles)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, **kwargs):
+        title = messages[1]['content'].split('タイトル: ')[1].split('\n')[0]
+        self.titles.append(title)
+        if title in self.fail_titles:
+            raise RuntimeError('boom')
+        decision = 'yes' if 'Python' in title else 'no'
+        content = json.dumps({'decision': decision, 'reason': f'{title}の理由'})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                        finish_reason='stop')])
+
+
+def _job(title, url):
+    return {'title': title, 'url': url, 'budget': '50,000円', 'client': 'A'}
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    path = tmp_path / 'jobs_20240101_000000.json'
+    _write(path, [_job('Python開発', 'u1'), _job('デザイン', 'u2')])
+    return path
+
+
+def _write(path, jobs):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(jobs, f, ensure_ascii=False)
+
+
+def _filtered(raw_file):
+    with open(str(raw_file).replace('.json', '_filtered.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _run(raw_file, client, tmp_path, config=CONFIG, prefilter=None):
+    return refilter_file_incremental(str(raw_file), client, config, prefilter or PreFilter(),
+                                     None, tmp_path / 'eval_meta', max_concurrency=1)
+
+
+def test_first_run_evaluates_all_jobs(raw_file, tmp_path):
+    client = _Client()
+    count, stats = _run(raw_file, client, tmp_path)
+    assert count == 1
+    assert stats == {'evaluated': 2, 'reused': 0, 'rewritten': True, 'skipped': False}
+    assert [job['url'] for job in _filtered(raw_file)] == ['u1']
+    assert _filtered(raw_file)[0]['gpt_reason'] == 'Python開発の理由'
+
+
+def test_unchanged_file_is_skipped(raw_file, tmp_path):
+    _run(raw_file, _Client(), tmp_path)
+    client = _Client()
+    count, stats = _run(raw_file, client, tmp_path)
+    assert client.titles == []
+    assert count == 1 and stats['skipped']
+
+
+def test_only_changed_jobs_are_reevaluated(raw_file, tmp_path):
+    _run(raw_file, _Client(), tmp_path)
+    filtered_mtime = os.stat(str(raw_file).replace('.json', '_filtered.json')).st_mtime_ns
+    _write(raw_file, [_job('Python開発', 'u1'), _job('ロゴ作成', 'u2'), _job('ライティング', 'u3')])
+
+    client = _Client()
+    count, stats = _run(raw_file, client, tmp_path)
+    assert sorted(client.titles) == ['ライティング', 'ロゴ作成']
+    assert stats == {'evaluated': 2, 'reused': 1, 'rewritten': False, 'skipped': False}
+    # 採用される案件が変わらないため _filtered.json は書き換えない
+    assert os.stat(str(raw_file).replace('.json', '_filtered.json')).st_mtime_ns == filtered_mtime
+    assert count == 1
+
+
+def test_changed_criteria_reevaluates_everything(raw_file, tmp_path):
+    _run(raw_file, _Client(), tmp_path)
+    client = _Client()
+    _run(raw_file, client, tmp_path, config={**CONFIG, 'prompt': '別の条件'})
+    assert sorted(client.titles) == ['Python開発', 'デザイン']
+
+
+def test_errored_jobs_are_kept_and_retried(raw_file, tmp_path):
+    count, _ = _run(raw_file, _Client(fail_titles={'デザイン'}), tmp_path)
+    assert count == 2
+
+    client = _Client()
+    count, stats = _run(raw_file, client, tmp_path)
+    assert client.titles == ['デザイン']
+    assert not stats['skipped'] and count == 1
+
+
+def test_prefilter_decisions_are_recorded(raw_file, tmp_path):
+    prefilter = PreFilter({'enabled': True, 'deny_keywords': ['デザイン']})
+    client = _Client()
+    _run(raw_file, client, tmp_path, prefilter=prefilter)
+    assert client.titles == ['Python開発']
+
+
+def test_criteria_hash_depends_on_prefilter_rules():
+    assert criteria_hash(CONFIG, None) == criteria_hash(CONFIG, {})
+    assert criteria_hash(CONFIG, {'min_budget': 1}) != criteria_hash(CONFIG, None)
+
+
+def test_prune_eval_meta(tmp_path):
+    (tmp_path / 'jobs_a.json').write_text('{}')
+    (tmp_path / 'jobs_b.json').write_text('{}')
+    prune_eval_meta(tmp_path, ['/data/jobs_a.json'])
+    assert os.listdir(tmp_path) == ['jobs_a.json']
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+import pytest
+
+import refilter
+from refilter import RefilterManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # ジョブのスレッドは起動しない
+    monkeypatch.setattr(RefilterManager, '_launch', lambda self, *args: None)
+    return RefilterManager(tmp_path)
+
+
+def _start(manager):
+    return manager.start('条件', 'gpt-4o-mini', {}, {})
+
+
+def test_second_start_is_rejected_while_running(manager):
+    job_id = _start(manager)
+    assert job_id is not None
+    assert _start(manager) is None
+    assert manager.current() == job_id
+    assert not manager.resume(job_id, {}, {})
+
+
+def test_start_is_allowed_after_job_finishes(manager):
+    job_id = _start(manager)
+    manager._running.discard(job_id)
+    assert _start(manager) not in (None, job_id)
+
+
+def _write_state(manager, job_id, status, age_days):
+    state = {'job_id': job_id, 'status': status, 'files': [], 'completed_files': {},
+             'failed_files': {}, 'updated_at': time.time() - age_days * 86400}
+    with open(manager.state_dir / f'{job_id}.json', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+
+def test_expired_finished_states_are_pruned(tmp_path, manager):
+    _write_state(manager, 'old_done', 'completed', 30)
+    _write_state(manager, 'old_failed', 'failed', 30)
+    _write_state(manager, 'recent_done', 'completed', 1)
+    _write_state(manager, 'old_running', 'running', 30)
+
+    reloaded = RefilterManager(tmp_path)
+    assert sorted(os.listdir(reloaded.state_dir)) == ['old_running.json', 'recent_done.json']
+    assert reloaded.get_status('old_done') is None
+    assert reloaded.get_status('recent_done') is not None
+
+
+def test_only_latest_interrupted_job_is_resumed(tmp_path, manager):
+    _write_state(manager, 'older', 'running', 2)
+    _write_state(manager, 'newer', 'pending', 1)
+
+    reloaded = RefilterManager(tmp_path)
+    assert reloaded.resume_interrupted({}, {}) == ['newer']
+    assert reloaded.current() == 'newer'
+    assert reloaded.get_status('older')['status'] == 'failed'
+
+
+def test_manager_is_shared_per_data_dir(tmp_path):
+    assert refilter.get_refilter_manager(tmp_path) is refilter.get_refilter_manager(tmp_path)